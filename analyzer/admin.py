@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import AnalysisJob
+
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ("job_id", "status", "zip_name", "threshold", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("job_id", "zip_name")
@@ -1,5 +1,8 @@
 from django import forms
 
+from .services.corpus_index import check_slug
+from .services.engines import DEFAULT_ENGINE, ENGINES
+
 class UploadZipForm(forms.Form):
     # Input utama: file ZIP
     zip_file = forms.FileField(
@@ -41,4 +44,61 @@ class UploadZipForm(forms.Form):
         initial=0.75,
         label="Threshold Kemiripan (0,0 - 1,0)"
     )
+    dedup_clones = forms.BooleanField(
+        required=False,
+        initial=False,
+        label="Gabungkan klon struktural (lebih cepat, file yang hanya beda komentar/format dihitung sekali)"
+    )
+    fingerprint_blocks = forms.BooleanField(
+        required=False,
+        initial=False,
+        label="Cocokkan blok via fingerprint AST (lebih cepat, hanya blok berstruktur mirip)"
+    )
+    lsh = forms.BooleanField(
+        required=False,
+        initial=False,
+        label="Mode perkiraan LSH untuk kelas besar (hanya pasangan kandidat yang dinilai)"
+    )
+    sparse_pairs = forms.BooleanField(
+        required=False,
+        initial=False,
+        label="Simpan hanya pasangan di atas threshold (tanpa matriks penuh)"
+    )
+    # korpus historis lintas job (MEDIA_ROOT/corpus/<mata kuliah>/<semester>)
+    corpus_course = forms.CharField(
+        required=False,
+        max_length=64,
+        label="Bandingkan dengan korpus mata kuliah (kosongkan jika tidak)"
+    )
+    corpus_term = forms.CharField(
+        required=False,
+        max_length=64,
+        label="Simpan job ini ke korpus sebagai semester (mis. 2025-ganjil)"
+    )
+    # engine pembanding (bobot & threshold bawaan masing-masing), parse dipakai bersama
+    extra_engines = forms.MultipleChoiceField(
+        required=False,
+        choices=[(name, spec["label"]) for name, spec in ENGINES.items() if name != DEFAULT_ENGINE],
+        widget=forms.CheckboxSelectMultiple,
+        label="Bandingkan juga dengan engine lain"
+    )
+
+    def clean(self):
+        cleaned = super().clean()
+        course = cleaned.get("corpus_course", "").strip()
+        term = cleaned.get("corpus_term", "").strip()
+        if term and not course:
+            self.add_error("corpus_course", "Isi mata kuliah untuk menyimpan job ke korpus.")
+        try:
+            cleaned["corpus_course"] = check_slug(course, "Mata kuliah") if course else ""
+            cleaned["corpus_term"] = check_slug(term, "Semester") if term else ""
+        except RuntimeError as e:
+            raise forms.ValidationError(str(e))
+        return cleaned
 
+
+class AppendZipForm(forms.Form):
+    # ZIP berisi kiriman terlambat untuk ditambahkan ke job yang sudah ada
+    zip_file = forms.FileField(
+        label="Berkas .zip berisi file .py tambahan"
+    )
@@ -0,0 +1,266 @@
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.services.corpus_index import CorpusIndex, check_slug, check_state_against_corpus, source_slug
+from analyzer.services.engines import DEFAULT_ENGINE, ENGINES, check_engines, run_engines
+from analyzer.services.feature_cache import FeatureCache
+from analyzer.services.lsh import DEFAULT_LSH, lsh_params
+from analyzer.services.pair_graph import check_pair_floor
+from analyzer.services.similarity_engine import (
+    BLOCKS_TXT_FILENAME, BLOCKS_XLSX_FILENAME, FEATURE_EXTRACTOR_VERSION, HEATMAP_FILENAME,
+    MATRIX_CSV_FILENAME, load_state,
+)
+from analyzer.utils.zip_utils import read_py_sources
+
+EXPORT_CHOICES = {
+    "csv": MATRIX_CSV_FILENAME,
+    "txt": BLOCKS_TXT_FILENAME,
+    "xlsx": BLOCKS_XLSX_FILENAME,
+    "png": HEATMAP_FILENAME,
+}
+PHASES = ("read", "features", "pairs", "write", "corpus")
+
+
+# =========================================================
+# PENCARIAN TUGAS (FOLDER BERISI .py ATAU FILE .zip)
+# =========================================================
+def find_assignments(paths) -> list:
+    """
+    [(nama, path)] untuk setiap folder yang langsung berisi *.py dan
+    setiap file .zip, dicari rekursif. Nama = path relatif terhadap
+    induk argumen, mis. "semester/tugas1" atau "semester/tugas2.zip" -> "semester/tugas2".
+    """
+    found = []
+    for arg in paths:
+        root = Path(arg)
+        if root.is_file() and root.suffix == ".zip":
+            found.append((root.stem, root))
+            continue
+        if not root.is_dir():
+            raise CommandError(f"Bukan folder atau file .zip: {arg}")
+
+        base = root.resolve().parent
+        dirs = [root, *(d for d in root.rglob("*") if d.is_dir())]
+        for d in sorted(dirs):
+            if any(d.glob("*.py")):
+                found.append((d.resolve().relative_to(base).as_posix(), d))
+        for z in sorted(root.rglob("*.zip")):
+            found.append((z.resolve().relative_to(base).with_suffix("").as_posix(), z))
+
+    names = [name for name, _ in found]
+    dupes = sorted({name for name in names if names.count(name) > 1})
+    if dupes:
+        raise CommandError(f"Nama tugas ganda: {', '.join(dupes)}")
+    return found
+
+
+def analyze_assignment(task: dict):
+    """Jalankan satu tugas (dipanggil di proses terpisah). -> (nama, file, error, stats)."""
+    stats = Counter()
+    try:
+        sources = None
+        if task["path"].suffix == ".zip":
+            t0 = time.perf_counter()
+            sources = read_py_sources(task["path"], **task["zip_limits"])
+            stats["time_read"] += time.perf_counter() - t0
+        results = run_engines(
+            None if sources is not None else task["path"], task["out"], task["engines"],
+            threshold=task["threshold"], stats=stats, workers=task["workers"],
+            feature_cache=task["cache"], sources=sources,
+            dedup_clones=task["dedup_clones"], fingerprint_blocks=task["fingerprint_blocks"],
+            lsh=task["lsh"], exports=task["exports"], pair_floor=task["pair_floor"],
+        )
+        corpus = task["corpus"]
+        if corpus:
+            check_state_against_corpus(
+                CorpusIndex(corpus["root"]), load_state(task["out"]), task["out"],
+                corpus["course"], corpus["term"], source_slug(task["name"]), stats=stats,
+            )
+    except Exception as e:
+        return task["name"], 0, str(e), stats
+    return task["name"], int(stats["files"]), None, stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Analisis similaritas tanpa web: setiap folder berisi .py atau file .zip "
+        "(dicari rekursif) dianalisis sebagai satu tugas, beberapa tugas paralel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Folder dan/atau file .zip.")
+        parser.add_argument(
+            "--out", default="hasil_analisis",
+            help="Folder output; tiap tugas ditulis ke <out>/<nama tugas>/.",
+        )
+        parser.add_argument(
+            "--jobs", type=int, default=1,
+            help="Jumlah tugas yang dianalisis bersamaan (satu proses per tugas).",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=settings.ANALYZER_WORKERS,
+            help="Proses skor pasangan per tugas (lihat ANALYZER_WORKERS).",
+        )
+        parser.add_argument(
+            "--engines", default=DEFAULT_ENGINE,
+            help="Engine dipisah koma: " + ",".join(ENGINES) + ". Engine pertama ditulis ke "
+                 "<out>/<nama tugas>/, lainnya ke subfolder engines/<engine>/; parse dipakai bersama.",
+        )
+        parser.add_argument(
+            "--threshold", type=float, default=None,
+            help="Threshold engine pertama (default: bawaan engine).",
+        )
+        parser.add_argument("--dedup-clones", action="store_true")
+        parser.add_argument(
+            "--fingerprint-blocks", action="store_true",
+            help="Hanya cocokkan blok yang berbagi fingerprint subtree AST (lebih cepat, lossy).",
+        )
+        parser.add_argument(
+            "--lsh", action="store_true",
+            help="Mode perkiraan untuk korpus besar: hanya pasangan file kandidat LSH yang "
+                 "dinilai, hasil disimpan jarang.",
+        )
+        parser.add_argument(
+            "--lsh-bands", type=int, default=DEFAULT_LSH["bands"],
+            help="Jumlah band MinHash (lebih banyak = recall naik, lebih lambat).",
+        )
+        parser.add_argument(
+            "--lsh-rows", type=int, default=DEFAULT_LSH["rows"],
+            help="Baris per band MinHash (lebih sedikit = recall naik, lebih lambat).",
+        )
+        parser.add_argument(
+            "--lsh-numeric-tables", type=int, default=DEFAULT_LSH["numeric_tables"],
+            help="Jumlah grid acak fitur numerik (0 = hanya MinHash).",
+        )
+        parser.add_argument(
+            "--lsh-numeric-width", type=float, default=DEFAULT_LSH["numeric_width"],
+            help="Lebar sel grid fitur numerik (skala log; lebih lebar = recall naik, lebih lambat).",
+        )
+        parser.add_argument(
+            "--pair-floor", type=float, default=None,
+            help="Simpan hanya pasangan dengan skor >= nilai ini (0..1) sebagai daftar "
+                 "pasangan jarang, tanpa matriks n x n.",
+        )
+        parser.add_argument(
+            "--corpus-course",
+            help="Cocokkan setiap tugas dengan korpus historis mata kuliah ini "
+                 "(MEDIA_ROOT/corpus, hasil di kemiripan_korpus.json).",
+        )
+        parser.add_argument(
+            "--corpus-term",
+            help="Simpan juga file setiap tugas ke korpus sebagai semester ini.",
+        )
+        parser.add_argument(
+            "--exports", default="csv,txt,xlsx",
+            help="Format yang langsung ditulis: " + ",".join(EXPORT_CHOICES) + " (kosong = biner saja).",
+        )
+        parser.add_argument(
+            "--no-cache", action="store_true",
+            help="Jangan memakai cache fitur bersama (MEDIA_ROOT/cache/features).",
+        )
+
+    def handle(self, *args, **options):
+        exports = [e for e in options["exports"].split(",") if e]
+        unknown = [e for e in exports if e not in EXPORT_CHOICES]
+        if unknown:
+            raise CommandError(f"Format tidak dikenal: {', '.join(unknown)}")
+
+        try:
+            engines = check_engines([e for e in options["engines"].split(",") if e])
+            lsh = None
+            if options["lsh"]:
+                lsh = lsh_params({
+                    "bands": options["lsh_bands"],
+                    "rows": options["lsh_rows"],
+                    "numeric_tables": options["lsh_numeric_tables"],
+                    "numeric_width": options["lsh_numeric_width"],
+                })
+            pair_floor = check_pair_floor(options["pair_floor"])
+            corpus = None
+            if options["corpus_course"]:
+                corpus = {
+                    "root": Path(settings.MEDIA_ROOT) / "corpus",
+                    "course": check_slug(options["corpus_course"], "Mata kuliah"),
+                    "term": check_slug(options["corpus_term"], "Semester")
+                    if options["corpus_term"] else None,
+                }
+            elif options["corpus_term"]:
+                raise RuntimeError("--corpus-term memerlukan --corpus-course.")
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        assignments = find_assignments(options["paths"])
+        if not assignments:
+            raise CommandError("Tidak ada folder berisi .py atau file .zip.")
+
+        cache = None
+        if not options["no_cache"]:
+            cache = FeatureCache(
+                Path(settings.MEDIA_ROOT) / "cache" / "features",
+                max_bytes=settings.ANALYZER_FEATURE_CACHE_MB * 1024 * 1024,
+                version=FEATURE_EXTRACTOR_VERSION,
+            )
+        zip_limits = {
+            "max_member_bytes": settings.ANALYZER_ZIP_MAX_MEMBER_MB * 1024 * 1024,
+            "max_total_bytes": settings.ANALYZER_ZIP_MAX_TOTAL_MB * 1024 * 1024,
+            "max_ratio": settings.ANALYZER_ZIP_MAX_RATIO,
+            "max_members": settings.ANALYZER_ZIP_MAX_MEMBERS,
+        }
+        out_root = Path(options["out"])
+        tasks = [
+            {
+                "name": name, "path": path, "out": out_root / name, "engines": engines,
+                "threshold": options["threshold"], "workers": options["workers"],
+                "dedup_clones": options["dedup_clones"],
+                "fingerprint_blocks": options["fingerprint_blocks"], "lsh": lsh, "cache": cache,
+                "exports": [EXPORT_CHOICES[e] for e in exports], "zip_limits": zip_limits,
+                "corpus": corpus, "pair_floor": pair_floor,
+            }
+            for name, path in assignments
+        ]
+
+        self.stdout.write(f"{len(tasks)} tugas, {options['jobs']} proses paralel.")
+        start = time.perf_counter()
+        totals = Counter()
+        failed = 0
+
+        def report(name, n_files, error, stats):
+            nonlocal failed
+            totals.update(stats)
+            elapsed = sum(stats[f"time_{p}"] for p in PHASES)
+            if error:
+                failed += 1
+                self.stderr.write(f"GAGAL {name}: {error}")
+            else:
+                self.stdout.write(f"OK    {name} ({n_files} file, {elapsed:.2f} dtk)")
+
+        if options["jobs"] <= 1:
+            for task in tasks:
+                report(*analyze_assignment(task))
+        else:
+            with ProcessPoolExecutor(max_workers=options["jobs"]) as pool:
+                futures = [pool.submit(analyze_assignment, task) for task in tasks]
+                for fut in as_completed(futures):
+                    report(*fut.result())
+
+        wall = time.perf_counter() - start
+        self.stdout.write("")
+        self.stdout.write("Waktu per fase (total seluruh tugas):")
+        for phase in PHASES:
+            self.stdout.write(f"  {phase:<10} {totals[f'time_{phase}']:9.2f} dtk")
+        self.stdout.write(
+            f"  file {totals['files']}, parse {totals['parses']}, "
+            f"pasangan blok {totals['block_pairs']}, difflib file/blok "
+            f"{totals['comment_calls']}/{totals['ratio_calls']}, "
+            f"cache hit/miss {totals['cache_hits']}/{totals['cache_misses']}, "
+            f"byte ditulis {totals['bytes_written']}"
+        )
+        self.stdout.write(f"Waktu total: {wall:.2f} dtk untuk {len(tasks) - failed}/{len(tasks)} tugas.")
+
+        if failed:
+            raise CommandError(f"{failed} tugas gagal.")
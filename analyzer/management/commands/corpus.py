@@ -0,0 +1,94 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.management.commands.analyze import find_assignments
+from analyzer.services.corpus_index import check_slug, source_slug
+from analyzer.services.job_runner import (
+    corpus_index, feature_cache, job_paths, read_upload_sources,
+)
+from analyzer.services.similarity_engine import load_sources, load_state, prepare_sources
+
+
+class Command(BaseCommand):
+    help = (
+        "Kelola korpus historis (MEDIA_ROOT/corpus) yang dipakai untuk mencocokkan "
+        "job baru dengan semester sebelumnya."
+    )
+
+    def add_arguments(self, parser):
+        actions = parser.add_subparsers(dest="action", required=True)
+
+        listing = actions.add_parser("list", help="Daftar semester di korpus.")
+        listing.add_argument("--course", help="Hanya mata kuliah ini.")
+
+        add = actions.add_parser(
+            "add", help="Tambahkan tugas (folder/.zip) atau hasil job ke satu semester.",
+        )
+        add.add_argument("course")
+        add.add_argument("term")
+        add.add_argument(
+            "paths", nargs="*",
+            help="Folder berisi .py dan/atau file .zip (dicari rekursif); tiap tugas = satu sumber.",
+        )
+        add.add_argument(
+            "--job", action="append", default=[], dest="jobs",
+            help="ID job yang hasilnya ditambahkan (boleh berulang).",
+        )
+
+        remove = actions.add_parser("remove", help="Hapus satu semester (atau satu sumbernya).")
+        remove.add_argument("course")
+        remove.add_argument("term")
+        remove.add_argument("--source", help="Hanya sumber ini (nama tugas atau ID job).")
+
+    def handle(self, *args, **options):
+        index = corpus_index()
+        try:
+            getattr(self, f"handle_{options['action']}")(index, options)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+    def handle_list(self, index, options):
+        terms = index.terms(options["course"])
+        if not terms:
+            self.stdout.write("Korpus kosong.")
+            return
+        for t in terms:
+            note = "  (versi lama, diabaikan)" if t["stale"] else ""
+            self.stdout.write(
+                f"{t['course']:<20} {t['term']:<12} {t['sources']:>4} sumber "
+                f"{t['files']:>7} file  {t['updated']}{note}"
+            )
+
+    def handle_add(self, index, options):
+        course = check_slug(options["course"], "Mata kuliah")
+        term = check_slug(options["term"], "Semester")
+        if not options["paths"] and not options["jobs"]:
+            raise CommandError("Berikan folder/.zip atau --job.")
+
+        for job_id in options["jobs"]:
+            state = load_state(job_paths(job_id)["out"])
+            source = source_slug(job_id)
+            added = index.add(course, term, source, state["names"], state["records"], state["hashes"])
+            self.stdout.write(f"OK    job {job_id}: {added} file -> {course}/{term}/{source}")
+
+        cache = feature_cache()
+        for name, path in find_assignments(options["paths"]) if options["paths"] else []:
+            if path.suffix == ".zip":
+                sources = read_upload_sources(path)
+            else:
+                sources = load_sources(path)
+            prepared = prepare_sources(sources, Counter(), cache)
+            source = source_slug(name)
+            added = index.add(
+                course, term, source, prepared["names"], prepared["records"], prepared["hashes"],
+            )
+            self.stdout.write(f"OK    {name}: {added} file -> {course}/{term}/{source}")
+
+    def handle_remove(self, index, options):
+        if not index.remove(options["course"], options["term"], options["source"]):
+            raise CommandError("Semester/sumber tidak ada di korpus.")
+        target = f"{options['course']}/{options['term']}"
+        if options["source"]:
+            target += f"/{options['source']}"
+        self.stdout.write(f"Dihapus: {target}")
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analyzer.services.job_runner import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Menjalankan job analisis yang masih menunggu di antrean (SQLite)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop", action="store_true",
+            help="Terus memantau antrean alih-alih berhenti setelah antrean kosong.",
+        )
+        parser.add_argument(
+            "--interval", type=float, default=2.0,
+            help="Jeda (detik) antar pengecekan antrean dalam mode --loop.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            done = run_pending_jobs()
+            if done:
+                self.stdout.write(f"{done} job selesai diproses.")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
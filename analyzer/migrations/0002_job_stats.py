@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-17 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='stats',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-17 01:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0002_job_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='kind',
+            field=models.CharField(choices=[('full', 'Analisis penuh'), ('append', 'Tambah kiriman')], default='full', max_length=16),
+        ),
+    ]
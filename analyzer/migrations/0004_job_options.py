@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-17 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0003_job_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='options',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
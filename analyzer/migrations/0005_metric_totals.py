@@ -0,0 +1,41 @@
+# Generated by Django 5.0.4 on 2026-10-17 03:34
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def seed_totals(apps, schema_editor):
+    """Total awal dari stats & durasi job yang sudah ada (sebelumnya dihitung per scrape)."""
+    AnalysisJob = apps.get_model("analyzer", "AnalysisJob")
+    MetricTotal = apps.get_model("analyzer", "MetricTotal")
+    totals = Counter()
+    for status, stats, started_at, finished_at in AnalysisJob.objects.values_list(
+        "status", "stats", "started_at", "finished_at"
+    ).iterator():
+        totals.update({k: v for k, v in (stats or {}).items() if isinstance(v, (int, float))})
+        if started_at and finished_at:
+            totals[f"duration_sum:{status}"] += (finished_at - started_at).total_seconds()
+            totals[f"duration_count:{status}"] += 1
+    MetricTotal.objects.bulk_create(
+        MetricTotal(key=key, value=value) for key, value in totals.items() if value
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0004_job_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('value', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_totals, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,66 @@
 from django.db import models
 
-# Create your models here.
+
+class AnalysisJob(models.Model):
+    """Satu pekerjaan analisis ZIP yang dijalankan di latar belakang."""
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Menunggu"),
+        (STATUS_RUNNING, "Diproses"),
+        (STATUS_DONE, "Selesai"),
+        (STATUS_FAILED, "Gagal"),
+    ]
+
+    KIND_FULL = "full"
+    KIND_APPEND = "append"
+    KIND_CHOICES = [
+        (KIND_FULL, "Analisis penuh"),
+        (KIND_APPEND, "Tambah kiriman"),
+    ]
+
+    job_id = models.CharField(max_length=32, unique=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    # jenis proses terakhir: analisis penuh atau append ke hasil sebelumnya
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES, default=KIND_FULL)
+    zip_name = models.CharField(max_length=255)
+    weights = models.JSONField(default=dict)
+    threshold = models.FloatField(default=0.75)
+    # opsi engine tambahan, mis. {"dedup_clones": true}
+    options = models.JSONField(default=dict, blank=True)
+    # nama file hasil per jenis: {"csv": ..., "txt": ..., "xlsx": ..., "png": ...}
+    outputs = models.JSONField(default=dict, blank=True)
+    # penghitung per job (hit/miss cache fitur, pasangan blok, dst.)
+    stats = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # diperbarui berkala oleh worker selama job 'running'; dasar requeue_stale_jobs
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.job_id} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+
+class MetricTotal(models.Model):
+    """
+    Total berjalan satu metrik /metrics (penghitung stats dan durasi semua
+    job), ditambah setiap kali stats baru dicatat sehingga tidak pernah turun.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    value = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.key}={self.value}"
@@ -0,0 +1,240 @@
+import ast
+import hashlib
+import zlib
+from collections import deque
+
+import numpy as np
+
+# node yang dianggap "blok kode" untuk pencocokan blok
+BLOCK_NODE_TYPES = (ast.FunctionDef, ast.For, ast.While, ast.If)
+
+
+# =========================================================
+# EKSTRAKTOR FITUR AST SATU KALI TRAVERSAL
+# =========================================================
+class AstFeatureVisitor(ast.NodeVisitor):
+    """
+    Mengumpulkan semua penghitung fitur AST dalam satu traversal
+    (menggantikan enam kali ast.walk), sekaligus mencatat node blok
+    FunctionDef/For/While/If untuk extract_code_blocks.
+
+    Traversal memakai antrean (BFS) seperti ast.walk, bukan rekursi,
+    sehingga urutan blok sama dengan ast.walk dan kode yang sangat
+    bersarang tidak memicu RecursionError.
+    """
+
+    def __init__(self):
+        self.node_count = 0
+        self.functions = 0
+        self.function_bodies = 0
+        self.loops = 0
+        self.conditionals = 0
+        self.assignments = 0
+        self.names = set()
+        self.blocks = []
+        self._queue = deque()
+
+    def run(self, tree: ast.AST) -> "AstFeatureVisitor":
+        self._queue.append(tree)
+        return self._drain()
+
+    def run_block(self, node: ast.AST) -> "AstFeatureVisitor":
+        """
+        Traversal satu subtree blok, dihitung seperti potongan kodenya
+        di-parse sendiri: dibungkus Module dan tanpa decorator (baris
+        decorator berada di atas `def` sehingga tidak ikut terpotong).
+        """
+        self.node_count += 1
+        self.visit(node)
+        decorators = getattr(node, "decorator_list", None)
+        if decorators:
+            self._queue = deque(
+                c for c in self._queue if not any(c is d for d in decorators)
+            )
+        return self._drain()
+
+    def _drain(self) -> "AstFeatureVisitor":
+        queue = self._queue
+        while queue:
+            self.visit(queue.popleft())
+        return self
+
+    def generic_visit(self, node):
+        self.node_count += 1
+        self._queue.extend(ast.iter_child_nodes(node))
+
+    def visit_FunctionDef(self, node):
+        self.functions += 1
+        if node.body:
+            self.function_bodies += 1
+        self.blocks.append(node)
+        self.generic_visit(node)
+
+    def visit_For(self, node):
+        self.loops += 1
+        self.blocks.append(node)
+        self.generic_visit(node)
+
+    visit_While = visit_For
+
+    def visit_If(self, node):
+        self.conditionals += 1
+        self.blocks.append(node)
+        self.generic_visit(node)
+
+    def visit_Assign(self, node):
+        self.assignments += 1
+        self.generic_visit(node)
+
+    def visit_Name(self, node):
+        self.names.add(node.id)
+        self.generic_visit(node)
+
+    def features(self) -> dict:
+        """Fitur numerik berbasis AST (tanpa formatting & komentar)."""
+        return {
+            "structure": self.functions + self.loops + self.conditionals,
+            "execution_order": self.node_count,
+            "hierarchy": self.function_bodies,
+            "variable_names": len(self.names),
+            "logic_modification": self.assignments,
+        }
+
+
+def visit_tree(tree: ast.AST) -> AstFeatureVisitor:
+    return AstFeatureVisitor().run(tree)
+
+
+def slice_block(lines: list, node: ast.AST) -> str:
+    return "\n".join(lines[node.lineno - 1: node.end_lineno])
+
+
+# =========================================================
+# HASH AST KANONIK (DETEKSI KLON STRUKTURAL)
+# =========================================================
+_CLOSE = object()
+
+
+def _is_string_statement(node) -> bool:
+    """Docstring / string lepas yang dipakai sebagai komentar."""
+    return (
+        isinstance(node, ast.Expr)
+        and isinstance(node.value, ast.Constant)
+        and isinstance(node.value.value, str)
+    )
+
+
+def canonical_ast_hash(tree: ast.AST) -> str:
+    """
+    Hash struktur AST tanpa posisi baris/kolom, komentar, dan docstring,
+    sehingga file yang hanya berbeda spasi/format/komentar mendapat hash
+    sama. Serialisasi memakai stack (bukan rekursi) seperti AstFeatureVisitor.
+    """
+    h = hashlib.sha1()
+    stack = [tree]
+    while stack:
+        item = stack.pop()
+        if item is _CLOSE:
+            h.update(b")")
+            continue
+        if not isinstance(item, ast.AST):
+            h.update(b"\0" + repr(item).encode("utf-8", "surrogatepass"))
+            continue
+
+        h.update(type(item).__name__.encode() + b"(")
+        children = []
+        for field, value in ast.iter_fields(item):
+            if field == "type_comment":
+                continue
+            if isinstance(value, list):
+                value = [v for v in value if not _is_string_statement(v)]
+                h.update(b"[%d" % len(value))
+                children.extend(value)
+            else:
+                children.append(value)
+        children.append(_CLOSE)
+        stack.extend(reversed(children))
+    return h.hexdigest()
+
+
+# =========================================================
+# FINGERPRINT SUBTREE AST (WINNOWING) UNTUK KANDIDAT BLOK
+# =========================================================
+# panjang k-gram token node & lebar jendela winnowing: setiap urutan token
+# sama sepanjang >= FINGERPRINT_K + FINGERPRINT_WINDOW - 1 pasti berbagi
+# minimal satu fingerprint
+FINGERPRINT_K = 5
+FINGERPRINT_WINDOW = 4
+_HASH_BASE = np.uint64(1000003)
+_TOKEN_IDS = {}
+
+
+def _token_id(token: str) -> int:
+    tid = _TOKEN_IDS.get(token)
+    if tid is None:
+        # crc32 stabil antar proses (hash() str diacak per proses)
+        tid = _TOKEN_IDS[token] = zlib.crc32(token.encode()) | 1
+    return tid
+
+
+def node_tokens(tree: ast.AST, blocks: list):
+    """
+    Token jenis node dalam urutan preorder, dengan nama variabel/atribut
+    dan nilai konstanta diabstraksikan (hanya tipe konstanta). Juga
+    mengembalikan rentang token [awal, akhir) setiap node di `blocks`.
+    """
+    wanted = {id(b) for b in blocks}
+    tokens, spans = [], {}
+    stack = [(tree, False)]
+    while stack:
+        node, closing = stack.pop()
+        if closing:
+            spans[id(node)] = (spans[id(node)], len(tokens))
+            continue
+        if isinstance(node, ast.expr_context):
+            continue
+        if id(node) in wanted:
+            spans[id(node)] = len(tokens)
+            stack.append((node, True))
+        if isinstance(node, ast.Constant):
+            tokens.append(_token_id(f"Constant:{type(node.value).__name__}"))
+        else:
+            tokens.append(_token_id(type(node).__name__))
+        stack.extend((child, False) for child in reversed(list(ast.iter_child_nodes(node))))
+    return np.array(tokens, dtype=np.uint64), [spans[id(b)] for b in blocks]
+
+
+def kgram_hashes(tokens: np.ndarray, k: int = FINGERPRINT_K) -> np.ndarray:
+    """Hash polinomial setiap k-gram token (aritmetika uint64, overflow dibiarkan)."""
+    n = len(tokens) - k + 1
+    if n <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    h = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        h = h * _HASH_BASE + tokens[j:j + n]
+    return h
+
+
+def winnow(hashes: np.ndarray, window: int = FINGERPRINT_WINDOW) -> np.ndarray:
+    """Nilai minimum tiap jendela `window` hash berturut-turut (unik, terurut)."""
+    if len(hashes) <= window:
+        return np.unique(hashes)
+    return np.unique(np.lib.stride_tricks.sliding_window_view(hashes, window).min(axis=1))
+
+
+def block_fingerprints(tree: ast.AST, blocks: list) -> list:
+    """
+    Fingerprint ter-winnow per blok: k-gram token dihitung sekali untuk
+    seluruh file, lalu setiap blok memakai k-gram yang sepenuhnya berada
+    di rentang subtree-nya. Blok yang lebih pendek dari k token memakai
+    satu hash dari seluruh tokennya.
+    """
+    tokens, spans = node_tokens(tree, blocks)
+    hashes = kgram_hashes(tokens)
+    fingerprints = []
+    for start, end in spans:
+        if end - start < FINGERPRINT_K:
+            fingerprints.append(kgram_hashes(tokens[start:end], end - start))
+        else:
+            fingerprints.append(winnow(hashes[start:end - FINGERPRINT_K + 1]))
+    return fingerprints
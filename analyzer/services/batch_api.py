@@ -0,0 +1,205 @@
+import base64
+import binascii
+import io
+import zipfile
+import zlib
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+
+from .job_runner import feature_cache, read_upload_sources
+from .lsh import lsh_params
+from .pair_graph import check_pair_floor, similar_groups
+from .result_store import SCORE_SCALE, decode_snippets, iter_row_chunks
+from .similarity_engine import (
+    DEFAULT_AST_WEIGHTS, analyze_sources, normalize_weights, similarity_pairs_from_state,
+    similarity_rows_from_state,
+)
+
+
+# galat yang hanya menggagalkan satu tugas (isi/ZIP rusak, kompresi tidak
+# didukung, teks bukan UTF-8, ...), bukan seluruh batch
+ASSIGNMENT_ERRORS = (
+    RuntimeError, ValueError, NotImplementedError, OSError, EOFError,
+    zipfile.BadZipFile, zlib.error,
+)
+
+
+# =========================================================
+# VALIDASI SATU TUGAS DALAM BATCH
+# =========================================================
+def parse_assignment(item: dict, index: int) -> dict:
+    """
+    Satu tugas: {"id", "zip_base64" | "sources": {nama: isi}, "weights",
+    "threshold", "dedup_clones", "fingerprint_blocks", "lsh", "pair_floor"}. Bobot yang tidak disebut memakai
+    DEFAULT_AST_WEIGHTS. "lsh" = true (DEFAULT_LSH) atau objek parameter LSH. "pair_floor" (0..1)
+    = hanya pasangan dengan skor >= nilai ini yang dikirim. Kesalahan isi dilaporkan sebagai RuntimeError
+    agar hanya tugas ini yang gagal.
+    """
+    if not isinstance(item, dict):
+        raise RuntimeError("Tugas harus berupa objek JSON.")
+
+    if "zip_base64" in item:
+        try:
+            data = base64.b64decode(item["zip_base64"], validate=True)
+        except (binascii.Error, TypeError, ValueError):
+            raise RuntimeError("zip_base64 bukan base64 yang valid.")
+        try:
+            sources = read_upload_sources(io.BytesIO(data))
+        except zipfile.BadZipFile:
+            raise RuntimeError("File zip tidak valid.")
+    elif "sources" in item:
+        sources = item["sources"]
+        if not isinstance(sources, dict) or not all(
+            isinstance(k, str) and isinstance(v, str) for k, v in sources.items()
+        ):
+            raise RuntimeError("sources harus berupa objek {nama file: isi}.")
+    else:
+        raise RuntimeError("Setiap tugas memerlukan zip_base64 atau sources.")
+
+    if len(sources) < 2:
+        raise RuntimeError("Minimal dua file .py diperlukan.")
+
+    weights = dict(DEFAULT_AST_WEIGHTS)
+    given = item.get("weights") or {}
+    if not isinstance(given, dict):
+        raise RuntimeError("weights harus berupa objek.")
+    for key, value in given.items():
+        if key not in DEFAULT_AST_WEIGHTS:
+            raise RuntimeError(f"Bobot tidak dikenal: {key}.")
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+            raise RuntimeError(f"Bobot {key} harus angka >= 0.")
+        weights[key] = float(value)
+
+    threshold = item.get("threshold", 0.75)
+    if not isinstance(threshold, (int, float)) or isinstance(threshold, bool) or not 0 <= threshold <= 1:
+        raise RuntimeError("threshold harus angka antara 0 dan 1.")
+
+    lsh = item.get("lsh")
+    if lsh is True:
+        lsh = lsh_params()
+    elif isinstance(lsh, dict):
+        lsh = lsh_params(lsh)
+    elif lsh not in (None, False):
+        raise RuntimeError("lsh harus boolean atau objek parameter.")
+    else:
+        lsh = None
+
+    pair_floor = item.get("pair_floor")
+    if isinstance(pair_floor, bool):
+        raise RuntimeError("pair_floor harus berupa angka.")
+
+    return {
+        "id": str(item.get("id", index)),
+        "sources": sources,
+        "weights": normalize_weights(weights),
+        "threshold": float(threshold),
+        "dedup_clones": bool(item.get("dedup_clones", False)),
+        "fingerprint_blocks": bool(item.get("fingerprint_blocks", False)),
+        "lsh": lsh,
+        "pair_floor": check_pair_floor(pair_floor),
+    }
+
+
+# =========================================================
+# HASIL RINGKAS (SEGITIGA ATAS + BLOK KOLOMNAR)
+# =========================================================
+def compact_result(state: dict) -> dict:
+    """
+    `matrix` = segitiga atas tanpa diagonal, baris demi baris (pasangan
+    (0,1), (0,2), ..., (1,2), ...). Pada mode LSH / pair_floor diganti `pairs`
+    {"file_a", "file_b", "score"} berisi pasangan tersimpan saja. `groups` =
+    kelompok file (indeks `names`) yang terhubung lewat pasangan skor >=
+    threshold, terbesar dulu. Blok mirip
+    dikirim per kolom; file_a/file_b mengacu ke `names`, type ke `types`,
+    snippet ke `snippets`.
+    """
+    names = state["names"]
+    blocks = state["blocks"].columns()
+
+    result = {
+        "names": names,
+        "invalid": [
+            name for name, record in zip(names, state["records"])
+            if record is None or record[0] is None
+        ],
+    }
+    if state.get("pairs") is not None:
+        rows, cols, scores, _ = similarity_pairs_from_state(state)
+        edges = rows, cols, scores
+        result["pairs"] = {
+            "file_a": rows.tolist(),
+            "file_b": cols.tolist(),
+            "score": np.round(scores, 4).tolist(),
+        }
+    else:
+        # segitiga atas dihitung per potongan baris, tanpa matriks n x n utuh
+        fill_rows = similarity_rows_from_state(state)
+        upper, above = [], []
+        for start, stop in iter_row_chunks(len(names)):
+            local, cols = np.triu_indices(stop - start, k=start + 1, m=len(names))
+            scores = fill_rows(start, stop)[local, cols]
+            keep = scores >= state["threshold"]
+            upper.append(scores)
+            above.append((local[keep] + start, cols[keep], scores[keep]))
+        edges = tuple(np.concatenate(column) for column in zip(*above))
+        result["matrix"] = np.round(np.concatenate(upper), 4).tolist()
+    result["groups"] = [
+        g["members"] for g in similar_groups(len(names), *edges, state["threshold"])
+    ]
+
+    return {
+        **result,
+        "blocks": {
+            "file_a": blocks["file_a"].tolist(),
+            "file_b": blocks["file_b"].tolist(),
+            "type": blocks["kind"].tolist(),
+            "score": (blocks["score"] / SCORE_SCALE).tolist(),
+            "snippet_a": blocks["snippet_a"].tolist(),
+            "snippet_b": blocks["snippet_b"].tolist(),
+        },
+        "types": blocks["types"].tolist(),
+        "snippets": decode_snippets(blocks["snippet_blob"], blocks["snippet_offsets"]),
+    }
+
+
+def run_batch(payload) -> list:
+    """
+    Jalankan semua tugas pada satu permintaan dengan engine & cache fitur
+    yang sama. Struktur permintaan yang salah -> ValueError (HTTP 400);
+    tugas yang gagal hanya diberi "error" tanpa menggagalkan batch.
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("assignments"), list):
+        raise ValueError("Body harus berupa objek dengan daftar 'assignments'.")
+    assignments = payload["assignments"]
+    if not assignments:
+        raise ValueError("Daftar 'assignments' kosong.")
+    if len(assignments) > settings.ANALYZER_API_MAX_ASSIGNMENTS:
+        raise ValueError(
+            f"Maksimal {settings.ANALYZER_API_MAX_ASSIGNMENTS} tugas per permintaan."
+        )
+
+    cache = feature_cache()
+    results = []
+    for index, item in enumerate(assignments):
+        item_id = str(item.get("id", index)) if isinstance(item, dict) else str(index)
+        try:
+            task = parse_assignment(item, index)
+            stats = Counter()
+            state = analyze_sources(
+                task["sources"], task["weights"], task["threshold"], stats=stats,
+                workers=settings.ANALYZER_WORKERS, feature_cache=cache,
+                dedup_clones=task["dedup_clones"], fingerprint_blocks=task["fingerprint_blocks"],
+                lsh=task["lsh"], pair_floor=task["pair_floor"],
+            )
+        except ASSIGNMENT_ERRORS as e:
+            results.append({"id": item_id, "error": str(e) or type(e).__name__})
+            continue
+        results.append({
+            "id": task["id"],
+            "threshold": task["threshold"],
+            **compact_result(state),
+            "stats": dict(stats),
+        })
+    return results
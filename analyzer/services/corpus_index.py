@@ -0,0 +1,378 @@
+import heapq
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+from django.core.files import locks
+
+from .lsh import file_keys, lsh_params
+from .similarity_engine import (
+    FEATURE_EXTRACTOR_VERSION, comment_similarity, file_similarity_pairs, table_from_records,
+)
+
+logger = logging.getLogger(__name__)
+
+CORPUS_MATCHES_FILENAME = "kemiripan_korpus.json"
+
+# mata kuliah / semester / sumber dipakai sebagai nama folder & file shard
+_SLUG = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+
+def check_slug(value: str, label: str) -> str:
+    value = str(value or "").strip()
+    if not _SLUG.match(value):
+        raise RuntimeError(
+            f"{label} hanya boleh huruf, angka, titik, garis bawah, dan tanda hubung "
+            "(maks. 64 karakter)."
+        )
+    return value
+
+
+def source_slug(name: str) -> str:
+    """Nama sumber shard dari nama job/tugas bebas, mis. "kelas A/t1" -> "kelas-A-t1"."""
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", str(name)).strip("-.")[:64] or "sumber"
+
+
+# =========================================================
+# PENYIMPANAN SHARD (KOLOM .npy TERPISAH DARI ISI RECORD)
+# =========================================================
+SHARD_META = "meta.json"
+# daftar shard per mata kuliah ({"shards": {"<term>/<source>": meta}}), diganti atomik
+COURSE_MANIFEST = "manifest.json"
+
+
+def _save_strings(folder: Path, name: str, values: list):
+    """Daftar teks sebagai blob UTF-8 + offset (<name>.npy, <name>_offsets.npy)."""
+    data = [str(v).encode("utf-8", "surrogatepass") for v in values]
+    offsets = np.zeros(len(data) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(d) for d in data])
+    np.save(folder / f"{name}.npy", np.frombuffer(b"".join(data), dtype=np.uint8))
+    np.save(folder / f"{name}_offsets.npy", offsets)
+
+
+def _load_strings(folder: Path, name: str, ids) -> list:
+    """Hanya teks ke-`ids` yang dibaca (blob & offset lewat mmap)."""
+    blob = np.load(folder / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+    offsets = np.load(folder / f"{name}_offsets.npy", mmap_mode="r", allow_pickle=False)
+    return [
+        bytes(blob[offsets[i]:offsets[i + 1]]).decode("utf-8", "surrogatepass") for i in ids
+    ]
+
+
+# =========================================================
+# INDEKS KORPUS HISTORIS LINTAS JOB (SHARD PER SEMESTER & SUMBER)
+# =========================================================
+class CorpusIndex:
+    """
+    Indeks di disk berisi fitur file dari job-job lama, dikelompokkan per
+    mata kuliah dan semester: satu folder shard <root>/<course>/<term>/<source>/
+    per job atau tugas asal. meta.json berisi versi, parameter LSH, dan
+    jumlah file; kunci bucket LSH (lsh.file_keys) terurut per kolom
+    disimpan di keys.npy + order.npy, terpisah dari isi record (fitur
+    numerik, teks komentar, nama, dan hash isi).
+
+    Menambah sumber hanya menulis satu shard dan menghapus semester hanya
+    menghapus foldernya; tidak ada indeks global yang dibangun ulang.
+    Daftar shard & meta-nya per mata kuliah ada di manifest.json (diperbarui
+    di bawah file lock saat add/remove), jadi daftar semester dan query
+    tidak menelusuri folder atau membuka meta.json setiap shard, dan shard
+    yang sedang ditulis (.tmp-*) tidak pernah terbaca. Query menghitung
+    kunci file kueri sekali per parameter LSH, mencari kandidat per kolom
+    kunci dengan binary search di atas memmap, lalu hanya membaca record
+    kandidat dan menilainya dengan skor file yang sama seperti engine.
+    """
+
+    def __init__(self, root: Path, version: str = FEATURE_EXTRACTOR_VERSION, lsh: dict | None = None):
+        self.root = Path(root)
+        self.version = str(version)
+        self.lsh = lsh_params(lsh)
+
+    def _term_dir(self, course: str, term: str) -> Path:
+        return self.root / check_slug(course, "Mata kuliah") / check_slug(term, "Semester")
+
+    def _course_dirs(self, course: str | None = None) -> list:
+        if course is not None:
+            return [self.root / check_slug(course, "Mata kuliah")]
+        return sorted(p for p in self.root.glob("*") if p.is_dir() and not p.name.startswith("."))
+
+    def _scan_course(self, course_dir: Path) -> dict:
+        """Meta shard dari folder (korpus lama tanpa manifest); .tmp-/.old- dilewati."""
+        shards = {}
+        for path in sorted(course_dir.glob(f"*/*/{SHARD_META}")):
+            term, source = path.parent.parent.name, path.parent.name
+            if term.startswith(".") or source.startswith("."):
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    shards[f"{term}/{source}"] = json.load(f)
+            except (OSError, ValueError):
+                logger.warning("Shard korpus rusak, diabaikan: %s", path.parent)
+        return shards
+
+    def _manifest(self, course_dir: Path) -> dict:
+        try:
+            with open(course_dir / COURSE_MANIFEST, encoding="utf-8") as f:
+                return json.load(f)["shards"]
+        except FileNotFoundError:
+            return self._scan_course(course_dir)
+
+    def _update_manifest(self, course_dir: Path, change):
+        """
+        Jalankan change(shards) (boleh mengubah folder shard) lalu tulis
+        ulang manifest; dikunci per mata kuliah agar add/remove bersamaan
+        tidak saling menimpa.
+        """
+        course_dir.mkdir(parents=True, exist_ok=True)
+        with open(course_dir / ".lock", "a") as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                shards = self._manifest(course_dir)
+                change(shards)
+                fd, tmp = tempfile.mkstemp(dir=course_dir, prefix=".tmp-", suffix=".json")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"shards": shards}, f)
+                os.replace(tmp, course_dir / COURSE_MANIFEST)
+            finally:
+                locks.unlock(lock)
+
+    def _shards(self, course: str | None = None) -> list:
+        """[(folder shard, meta)] dari manifest setiap mata kuliah."""
+        return [
+            (course_dir / key, meta)
+            for course_dir in self._course_dirs(course)
+            for key, meta in sorted(self._manifest(course_dir).items())
+        ]
+
+    def terms(self, course: str | None = None) -> list:
+        """Daftar semester: {"course", "term", "sources", "files", "updated", "stale"}."""
+        found = {}
+        for shard_dir, meta in self._shards(course):
+            key = (shard_dir.parent.parent.name, shard_dir.parent.name)
+            info = found.setdefault(key, {
+                "course": key[0], "term": key[1], "sources": 0, "files": 0,
+                "updated": "", "stale": False,
+            })
+            info["sources"] += 1
+            info["files"] += meta["files"]
+            info["updated"] = max(info["updated"], meta.get("created") or "")
+            info["stale"] |= meta.get("version") != self.version
+        return list(found.values())
+
+    def add(self, course: str, term: str, source: str, names: list, records: list,
+            hashes=None) -> int:
+        """
+        Simpan file satu sumber (record dari analyze_code, mis. state job)
+        di semester `term`, menggantikan shard sumber yang sama. File
+        kosong / SyntaxError tidak diindeks. -> jumlah file terindeks.
+        """
+        term_dir = self._term_dir(course, term)
+        shard_dir = term_dir / check_slug(source, "Sumber")
+        table = table_from_records(records)
+        ids = np.flatnonzero(table["valid"])
+        keys = file_keys([table["fingerprints"][i] for i in ids], table["numeric"][ids], self.lsh)
+        order = np.argsort(keys, axis=0, kind="stable")
+
+        shard_dir.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=shard_dir.parent, prefix=".tmp-"))
+        try:
+            # per kolom kunci: kunci terurut + posisi file asalnya (binary search)
+            np.save(tmp / "keys.npy", np.take_along_axis(keys, order, axis=0).T.copy())
+            np.save(tmp / "order.npy", order.T.astype(np.int32))
+            np.save(tmp / "numeric.npy", table["numeric"][ids])
+            _save_strings(tmp, "comments", [table["comments"][i] for i in ids])
+            _save_strings(tmp, "names", [names[i] for i in ids])
+            _save_strings(tmp, "hashes", [
+                (hashes[i] or "") if hashes is not None else "" for i in ids
+            ])
+            meta = {
+                "version": self.version,
+                "term": term,
+                "source": source,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "lsh": self.lsh,
+                "files": len(ids),
+            }
+            with open(tmp / SHARD_META, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+            def swap(shards):
+                # shard lama diganti dengan rename (pembaca tidak melihat shard setengah jadi)
+                old = None
+                if shard_dir.exists():
+                    old = Path(tempfile.mkdtemp(dir=shard_dir.parent, prefix=".old-"))
+                    os.replace(shard_dir, old / "shard")
+                os.replace(tmp, shard_dir)
+                shards[f"{term_dir.name}/{shard_dir.name}"] = meta
+                if old is not None:
+                    shutil.rmtree(old, ignore_errors=True)
+
+            self._update_manifest(term_dir.parent, swap)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        return len(ids)
+
+    def remove(self, course: str, term: str, source: str | None = None) -> bool:
+        """Hapus satu sumber, atau seluruh semester bila `source` kosong."""
+        term_dir = self._term_dir(course, term)
+        target = term_dir if source is None else term_dir / check_slug(source, "Sumber")
+        if not target.exists():
+            return False
+
+        def drop(shards):
+            shutil.rmtree(target)
+            for key in list(shards):
+                key_term, key_source = key.split("/")
+                if key_term == term_dir.name and (source is None or key_source == target.name):
+                    del shards[key]
+            # folder semester yang kosong ikut dihapus
+            try:
+                term_dir.rmdir()
+            except OSError:
+                pass
+
+        self._update_manifest(term_dir.parent, drop)
+        return True
+
+    def query(self, names: list, records: list, weights: dict, course: str,
+              exclude=(), top_k: int = 5, min_score: float = 0.0,
+              hashes=None, stats: Counter | None = None) -> list:
+        """
+        Kecocokan teratas setiap file (`names`/`records`, mis. state job)
+        di semua shard `course` kecuali pasangan (term, source) di
+        `exclude`. -> [{"file", "matches": [{"term", "source", "file",
+        "score", "identical"}]}], diurutkan dari skor tertinggi.
+        """
+        if stats is None:
+            stats = Counter()
+        table = table_from_records(records)
+        ids = np.flatnonzero(table["valid"])
+        best = {int(i): [] for i in ids}
+        excluded = {tuple(e) for e in exclude}
+        # kunci file kueri per parameter LSH (biasanya sama untuk semua shard)
+        query_keys = {}
+
+        for shard_dir, meta in self._shards(course):
+            if (shard_dir.parent.name, shard_dir.name) in excluded or not len(ids):
+                continue
+            if not meta["files"]:
+                continue
+            if meta.get("version") != self.version:
+                logger.warning("Shard korpus dari versi ekstraktor lain, diabaikan: %s", shard_dir)
+                continue
+
+            params = json.dumps(meta["lsh"], sort_keys=True)
+            if params not in query_keys:
+                query_keys[params] = file_keys(
+                    [table["fingerprints"][i] for i in ids], table["numeric"][ids], meta["lsh"]
+                )
+            keys = query_keys[params]
+
+            shard_keys = np.load(shard_dir / "keys.npy", mmap_mode="r", allow_pickle=False)
+            shard_order = np.load(shard_dir / "order.npy", mmap_mode="r", allow_pickle=False)
+            candidates = [set() for _ in ids]
+            for col in range(keys.shape[1]):
+                sorted_keys = shard_keys[col]
+                lo = np.searchsorted(sorted_keys, keys[:, col], side="left")
+                hi = np.searchsorted(sorted_keys, keys[:, col], side="right")
+                for q in np.flatnonzero(hi > lo):
+                    candidates[q].update(shard_order[col][lo[q]:hi[q]].tolist())
+
+            rows = np.array([q for q, found in enumerate(candidates) for _ in found], dtype=np.int64)
+            cols = np.array([c for found in candidates for c in sorted(found)], dtype=np.int64)
+            if not len(rows):
+                continue
+            stats["corpus_candidates"] += len(rows)
+
+            # hanya record kandidat yang dibaca dari shard
+            uniq, local = np.unique(cols, return_inverse=True)
+            numeric = np.load(shard_dir / "numeric.npy", mmap_mode="r", allow_pickle=False)[uniq]
+            shard_comments = _load_strings(shard_dir, "comments", uniq)
+            shard_names = _load_strings(shard_dir, "names", uniq)
+            shard_hashes = _load_strings(shard_dir, "hashes", uniq)
+
+            # kueri & kandidat digabung menjadi satu tabel agar skornya = file_similarity_pairs
+            combined = {
+                "numeric": np.vstack([table["numeric"][ids], numeric]),
+                "valid": np.ones(len(ids) + len(uniq), dtype=bool),
+            }
+            comments = np.array([
+                comment_similarity(table["comments"][ids[q]], shard_comments[c])
+                for q, c in zip(rows, local)
+            ])
+            scores = file_similarity_pairs(combined, weights, rows, len(ids) + local, comments)
+
+            for q, c, score in zip(rows.tolist(), local.tolist(), scores.tolist()):
+                if score < min_score:
+                    continue
+                i = int(ids[q])
+                # pada skor sama, salinan persis (hash isi sama) didahulukan
+                h = shard_hashes[c]
+                identical = hashes is not None and bool(h) and h == hashes[i]
+                match = (score, identical, meta["term"], meta["source"], shard_names[c])
+                if len(best[i]) < top_k:
+                    heapq.heappush(best[i], match)
+                else:
+                    heapq.heappushpop(best[i], match)
+
+        result = []
+        for i, heap in best.items():
+            if not heap:
+                continue
+            result.append({
+                "file": names[i],
+                "matches": [
+                    {
+                        "term": term,
+                        "source": source,
+                        "file": name,
+                        "score": round(score, 4),
+                        "identical": identical,
+                    }
+                    for score, identical, term, source, name in sorted(heap, reverse=True)
+                ],
+            })
+        result.sort(key=lambda r: (-r["matches"][0]["score"], r["file"]))
+        return result
+
+
+# =========================================================
+# KORPUS UNTUK SATU JOB (DIPANGGIL JOB RUNNER & CLI)
+# =========================================================
+def check_state_against_corpus(index: CorpusIndex, state: dict, out_dir: Path, course: str,
+                               term: str | None = None, source: str = "job", top_k: int = 5,
+                               stats: Counter | None = None) -> Path:
+    """
+    Bandingkan file state job dengan korpus `course` dan tulis hasilnya ke
+    kemiripan_korpus.json. Bila `term` diisi, file job ini lalu disimpan
+    sebagai sumber `source` di semester tersebut (shard lamanya sendiri
+    tidak ikut dicocokkan). Waktunya dicatat di stats["time_corpus"].
+    """
+    if stats is None:
+        stats = Counter()
+    t0 = time.perf_counter()
+    matches = index.query(
+        state["names"], state["records"], state["weights"], course,
+        exclude=[(term, source)] if term else (), top_k=top_k, hashes=state["hashes"],
+        stats=stats,
+    )
+    path = Path(out_dir) / CORPUS_MATCHES_FILENAME
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(matches, f, ensure_ascii=False)
+    if term:
+        index.add(course, term, source, state["names"], state["records"], state["hashes"])
+    stats["time_corpus"] += time.perf_counter() - t0
+    return path
+
+
+def load_corpus_matches(path) -> list:
+    if not path or not Path(path).exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,145 @@
+import time
+from collections import Counter
+from pathlib import Path
+
+from . import similarity_astfix, similarity_engine
+from .result_store import iter_blocks
+from .similarity_engine import (
+    discard_state, load_sources, load_state, normalize_weights, prepare_sources, save_state,
+    score_prepared, state_size, write_outputs,
+)
+
+# =========================================================
+# REGISTRI ENGINE (BOBOT, THRESHOLD, ATURAN BLOK MASING-MASING)
+# =========================================================
+ENGINES = {
+    "pymatch": {
+        "label": "PyMatch",
+        "weights": similarity_engine.DEFAULT_AST_WEIGHTS,
+        "threshold": 0.75,
+        "scoring": similarity_engine.DEFAULT_SCORING,
+    },
+    "astfix": {
+        "label": "AST fix",
+        "weights": similarity_astfix.DEFAULT_AST_WEIGHTS,
+        "threshold": similarity_astfix.DEFAULT_THRESHOLD,
+        "scoring": similarity_astfix.SCORING,
+    },
+}
+DEFAULT_ENGINE = "pymatch"
+
+# hasil engine tambahan disimpan di <out_dir>/engines/<nama>/
+EXTRA_ENGINES_DIRNAME = "engines"
+
+
+def check_engines(engines) -> list:
+    """Daftar nama engine tanpa duplikat; engine pertama = engine utama."""
+    names = list(dict.fromkeys(engines or [DEFAULT_ENGINE]))
+    unknown = [name for name in names if name not in ENGINES]
+    if unknown:
+        raise RuntimeError(f"Engine tidak dikenal: {', '.join(unknown)}")
+    return names
+
+
+def engine_out_dir(out_dir: Path, name: str, engines) -> Path:
+    """Folder hasil `name`: `out_dir` untuk engine utama, subfolder untuk lainnya."""
+    if name == engines[0]:
+        return Path(out_dir)
+    return Path(out_dir) / EXTRA_ENGINES_DIRNAME / name
+
+
+# =========================================================
+# ANALISIS BEBERAPA ENGINE DENGAN SATU TAHAP PARSE
+# =========================================================
+def _write_engine(state: dict, out_dir: Path, stats: Counter, exports):
+    t0 = time.perf_counter()
+    try:
+        result = write_outputs(state, out_dir, exports=exports, stats=stats)
+        save_state(state, out_dir)
+    except BaseException:
+        discard_state(state)
+        raise
+    stats["bytes_written"] += state_size(out_dir)
+    stats["time_write"] += time.perf_counter() - t0
+    return result
+
+
+def run_engines(src_dir: Path | None, out_dir: Path, engines=(DEFAULT_ENGINE,),
+                ast_weights=None, threshold: float | None = None,
+                stats: Counter | None = None, workers: int = 1, feature_cache=None,
+                sources: dict | None = None, dedup_clones: bool = False,
+                fingerprint_blocks: bool = False, lsh: dict | None = None, exports=(),
+                pair_floor: float | None = None) -> dict:
+    """
+    Seperti similarity_engine.run_analysis untuk beberapa engine sekaligus:
+    file dibaca, di-parse, dan diekstrak fiturnya sekali, lalu tiap engine
+    hanya menjalankan skornya sendiri. `ast_weights`/`threshold` berlaku
+    untuk engine utama (pertama); engine lain memakai default registri.
+    `lsh` (mode perkiraan) dan `pair_floor` (hasil jarang, lihat
+    score_prepared) berlaku untuk semua engine.
+    -> {nama engine: (matriks, outputs)}.
+    """
+    engines = check_engines(engines)
+    if stats is None:
+        stats = Counter()
+
+    t0 = time.perf_counter()
+    if sources is None:
+        sources = load_sources(src_dir)
+    stats["time_read"] += time.perf_counter() - t0
+    if len(sources) < 2:
+        raise RuntimeError("Minimal dua file .py diperlukan.")
+
+    prepared = prepare_sources(sources, stats, feature_cache)
+
+    results = {}
+    for name in engines:
+        spec = ENGINES[name]
+        primary = name == engines[0]
+        weights = (ast_weights if primary else None) or spec["weights"]
+        engine_dir = engine_out_dir(out_dir, name, engines)
+        engine_dir.mkdir(parents=True, exist_ok=True)
+        state = score_prepared(
+            prepared, normalize_weights(weights),
+            threshold if primary and threshold is not None else spec["threshold"],
+            stats=stats, workers=workers, dedup_clones=dedup_clones, scoring=spec["scoring"],
+            fingerprint_blocks=fingerprint_blocks, lsh=lsh, out_dir=engine_dir,
+            pair_floor=pair_floor,
+        )
+        results[name] = _write_engine(state, engine_dir, stats, exports)
+    return results
+
+
+def append_engines(src_dir: Path | None, out_dir: Path, engines=(DEFAULT_ENGINE,),
+                   stats: Counter | None = None, workers: int = 1, feature_cache=None,
+                   sources: dict | None = None, exports=()) -> dict:
+    """
+    append_analysis untuk semua engine job: record file lama diambil dari
+    state engine utama, file baru di-parse sekali, lalu tiap engine
+    menambahkan pasangan barunya ke hasilnya sendiri.
+    """
+    engines = check_engines(engines)
+    if stats is None:
+        stats = Counter()
+
+    t0 = time.perf_counter()
+    dirs = {name: engine_out_dir(out_dir, name, engines) for name in engines}
+    previous = {name: load_state(dirs[name]) for name in engines}
+    if sources is None:
+        sources = load_sources(src_dir)
+    stats["time_read"] += time.perf_counter() - t0
+    if not sources:
+        raise RuntimeError("Tidak ada file .py baru untuk ditambahkan.")
+
+    prepared = prepare_sources(sources, stats, feature_cache, previous[engines[0]])
+
+    results = {}
+    for name in engines:
+        prev = previous[name]
+        state = score_prepared(
+            prepared, prev["weights"], prev["threshold"], stats=stats, workers=workers,
+            previous=prev, previous_blocks=iter_blocks(dirs[name], prev["names"]),
+            out_dir=dirs[name],
+        )
+        results[name] = _write_engine(state, dirs[name], stats, exports)
+    return results
@@ -0,0 +1,145 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# perkiraan total ukuran entri (byte) di root cache, agar enforce_budget tidak
+# menelusuri seluruh cache setiap job
+USAGE_FILENAME = "ukuran.txt"
+
+
+# =========================================================
+# CACHE FITUR BERBASIS HASH ISI FILE (BERTAHAN ANTAR JOB)
+# =========================================================
+class FeatureCache:
+    """
+    Cache di disk untuk hasil ekstraksi fitur per file .py. Kunci =
+    sha256(versi ekstraktor + isi file), sehingga file starter, kiriman
+    ulang, dan ZIP yang diunggah ulang tidak perlu di-parse lagi.
+
+    Setiap hit memperbarui mtime entri; enforce_budget() menghapus entri
+    dengan mtime tertua (LRU) sampai total ukuran di bawah `max_bytes`.
+    Total ukuran dilacak bertahap (hasil penelusuran terakhir di ukuran.txt
+    + byte yang ditulis put()), jadi cache hanya ditelusuri bila
+    perkiraannya melewati batas.
+    """
+
+    def __init__(self, root: Path, max_bytes: int, version: str):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.version = str(version)
+        self.hits = 0
+        self.misses = 0
+        # byte entri baru sejak enforce_budget terakhir
+        self.added = 0
+
+    def key(self, code: str) -> str:
+        h = hashlib.sha256()
+        h.update(self.version.encode("utf-8"))
+        h.update(b"\0")
+        h.update(code.encode("utf-8", "surrogatepass"))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.pkl"
+
+    def get(self, code: str):
+        path = self._path(self.key(code))
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            logger.warning("Entri cache fitur rusak, diabaikan: %s", path)
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, code: str, value):
+        path = self._path(self.key(code))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                size = f.tell()
+            os.replace(tmp, path)
+            self.added += size
+        except Exception:
+            logger.warning("Gagal menulis cache fitur: %s", path)
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    def _read_usage(self) -> int | None:
+        try:
+            return int((self.root / USAGE_FILENAME).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_usage(self, total: int):
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(str(total))
+            os.replace(tmp, self.root / USAGE_FILENAME)
+        except OSError:
+            logger.warning("Gagal menulis ukuran cache fitur: %s", self.root)
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    def enforce_budget(self) -> int:
+        """
+        Hapus entri paling lama tidak dipakai sampai total <= max_bytes.
+        Cache hanya ditelusuri bila perkiraan ukurannya melewati batas
+        (atau belum pernah diukur). -> jumlah entri yang dihapus.
+        """
+        if not self.root.exists():
+            return 0
+
+        usage = self._read_usage()
+        added, self.added = self.added, 0
+        if usage is not None and usage + added <= self.max_bytes:
+            if added:
+                self._write_usage(usage + added)
+            return 0
+
+        entries = []
+        total = 0
+        for path in self.root.glob("*/*.pkl"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        self._write_usage(total)
+        return removed
@@ -0,0 +1,229 @@
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import AnalysisJob
+from ..utils.zip_utils import read_py_sources
+from .corpus_index import CorpusIndex, check_state_against_corpus, source_slug
+from .engines import DEFAULT_ENGINE, append_engines, run_engines
+from .feature_cache import FeatureCache
+from .metrics import duration_totals, format_summary, record_totals, stats_delta
+from .similarity_engine import FEATURE_EXTRACTOR_VERSION, load_state
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# =========================================================
+# LOKASI FOLDER KERJA PER JOB
+# =========================================================
+def job_paths(job_id: str) -> dict:
+    media = Path(settings.MEDIA_ROOT)
+    return {
+        "upload": media / "uploads" / job_id,
+        "out": media / "results" / job_id,
+    }
+
+
+def read_upload_sources(zip_path: Path) -> dict:
+    """Ambil file .py dari ZIP upload langsung ke memori (dengan batas ukuran)."""
+    return read_py_sources(
+        zip_path,
+        max_member_bytes=settings.ANALYZER_ZIP_MAX_MEMBER_MB * 1024 * 1024,
+        max_total_bytes=settings.ANALYZER_ZIP_MAX_TOTAL_MB * 1024 * 1024,
+        max_ratio=settings.ANALYZER_ZIP_MAX_RATIO,
+        max_members=settings.ANALYZER_ZIP_MAX_MEMBERS,
+    )
+
+
+def feature_cache() -> FeatureCache:
+    """Cache fitur bersama antar job, disimpan di MEDIA_ROOT/cache/features."""
+    return FeatureCache(
+        Path(settings.MEDIA_ROOT) / "cache" / "features",
+        max_bytes=settings.ANALYZER_FEATURE_CACHE_MB * 1024 * 1024,
+        version=FEATURE_EXTRACTOR_VERSION,
+    )
+
+
+def corpus_index() -> CorpusIndex:
+    """Korpus historis lintas job, disimpan di MEDIA_ROOT/corpus."""
+    return CorpusIndex(Path(settings.MEDIA_ROOT) / "corpus")
+
+
+# =========================================================
+# ANTREAN LOKAL (TANPA BROKER EKSTERNAL)
+# =========================================================
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ANALYZER_JOB_WORKERS,
+                thread_name_prefix="analyzer-job",
+            )
+        return _executor
+
+
+def enqueue_job(job_id: str):
+    """Jadwalkan job (status 'queued' di DB) ke pool worker lokal."""
+    _get_executor().submit(_run_in_thread, job_id)
+
+
+def _run_in_thread(job_id: str):
+    close_old_connections()
+    try:
+        process_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def claim_job(job_id: str) -> bool:
+    """Ubah queued -> running secara atomik; False jika sudah diambil worker lain."""
+    now = timezone.now()
+    updated = AnalysisJob.objects.filter(
+        job_id=job_id, status=AnalysisJob.STATUS_QUEUED
+    ).update(status=AnalysisJob.STATUS_RUNNING, started_at=now, heartbeat_at=now)
+    return updated == 1
+
+
+@contextmanager
+def job_heartbeat(job_id: str, interval: float):
+    """
+    Selama blok berjalan, thread latar memperbarui heartbeat_at job setiap
+    `interval` detik; job yang heartbeat-nya berhenti (worker mati) akan
+    diantrekan ulang oleh requeue_stale_jobs.
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                AnalysisJob.objects.filter(
+                    job_id=job_id, status=AnalysisJob.STATUS_RUNNING
+                ).update(heartbeat_at=timezone.now())
+        finally:
+            # koneksi DB milik thread ini
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"analyzer-heartbeat-{job_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def process_job(job_id: str) -> bool:
+    if not claim_job(job_id):
+        return False
+    with job_heartbeat(job_id, settings.ANALYZER_JOB_HEARTBEAT_SECONDS):
+        _process_claimed_job(job_id)
+    return True
+
+
+def _process_claimed_job(job_id: str):
+    job = AnalysisJob.objects.get(job_id=job_id)
+    paths = job_paths(job_id)
+    zip_path = paths["upload"] / job.zip_name
+    # mulai dari stats yang dicatat view saat upload (time_upload, bytes_uploaded)
+    stats = Counter(job.stats)
+    stats_before = dict(job.stats)
+
+    try:
+        t0 = time.perf_counter()
+        sources = read_upload_sources(zip_path)
+        stats["time_read"] += time.perf_counter() - t0
+        try:
+            zip_path.unlink(missing_ok=True)
+        except Exception:
+            logger.warning("Gagal menghapus ZIP: %s", zip_path)
+
+        # engine pertama = engine utama (bobot & threshold dari form)
+        engines = job.options.get("engines", [DEFAULT_ENGINE])
+        if job.kind == AnalysisJob.KIND_APPEND:
+            results = append_engines(
+                None, paths["out"], engines, workers=settings.ANALYZER_WORKERS,
+                stats=stats, feature_cache=feature_cache(), sources=sources,
+            )
+        else:
+            results = run_engines(
+                None, paths["out"], engines, ast_weights=job.weights, threshold=job.threshold,
+                workers=settings.ANALYZER_WORKERS, stats=stats, feature_cache=feature_cache(),
+                sources=sources, dedup_clones=job.options.get("dedup_clones", False),
+                fingerprint_blocks=job.options.get("fingerprint_blocks", False),
+                lsh=job.options.get("lsh"), pair_floor=job.options.get("pair_floor"),
+            )
+        _, outputs = results[engines[0]]
+
+        # bandingkan dengan semester lalu (dan simpan job ini ke semesternya)
+        corpus = job.options.get("corpus")
+        if corpus:
+            outputs["corpus"] = check_state_against_corpus(
+                corpus_index(), load_state(paths["out"]), paths["out"],
+                corpus["course"], corpus.get("term"), source_slug(job_id), stats=stats,
+            )
+    except Exception as e:
+        logger.exception("Job %s gagal", job_id)
+        if job.kind == AnalysisJob.KIND_APPEND:
+            # hasil sebelumnya masih utuh di disk: tetap tampilkan, catat galatnya
+            job.status = AnalysisJob.STATUS_DONE
+            job.error = f"Penambahan kiriman gagal: {e}"
+        else:
+            job.status = AnalysisJob.STATUS_FAILED
+            job.error = str(e)
+    else:
+        job.status = AnalysisJob.STATUS_DONE
+        job.outputs = {k: Path(v).name for k, v in outputs.items() if v}
+
+    logger.info("Job %s (%s): %s", job_id, job.status, format_summary(stats))
+    job.stats = dict(stats)
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "outputs", "stats", "finished_at"])
+    # stats upload sudah dicatat view; di sini hanya tambahan proses ini
+    record_totals({
+        **stats_delta(stats_before, job.stats),
+        **duration_totals(job.status, (job.finished_at - job.started_at).total_seconds()),
+    })
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Kembalikan job 'running' yang heartbeat-nya tidak diperbarui lebih dari
+    ANALYZER_JOB_STALE_MINUTES (worker-nya mati, mis. saat server restart)
+    ke 'queued'. Job lama tanpa heartbeat dinilai dari started_at.
+    """
+    cutoff = timezone.now() - timedelta(minutes=settings.ANALYZER_JOB_STALE_MINUTES)
+    stale = AnalysisJob.objects.filter(status=AnalysisJob.STATUS_RUNNING).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    requeued = stale.update(status=AnalysisJob.STATUS_QUEUED, started_at=None, heartbeat_at=None)
+    if requeued:
+        logger.warning("%d job 'running' yang macet diantrekan ulang", requeued)
+    return requeued
+
+
+def run_pending_jobs() -> int:
+    """
+    Proses semua job yang masih 'queued' (mis. tertinggal saat server restart),
+    termasuk job 'running' yang macet (requeue_stale_jobs).
+    """
+    requeue_stale_jobs()
+    done = 0
+    queued = AnalysisJob.objects.filter(status=AnalysisJob.STATUS_QUEUED).order_by("created_at")
+    for job_id in queued.values_list("job_id", flat=True):
+        if process_job(job_id):
+            done += 1
+    return done
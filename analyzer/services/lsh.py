@@ -0,0 +1,148 @@
+import numpy as np
+
+# =========================================================
+# PARAMETER LSH (TRADE-OFF RECALL / KECEPATAN)
+# =========================================================
+# bands x rows MinHash atas fingerprint AST file: pasangan dengan Jaccard s
+# menjadi kandidat dengan peluang 1 - (1 - s^rows)^bands. bands lebih banyak
+# atau rows lebih sedikit = recall naik, kandidat (dan waktu) bertambah.
+# numeric_tables = jumlah grid acak atas log fitur numerik (lebar sel
+# numeric_width) untuk pasangan yang mirip menurut fitur meski strukturnya
+# berbeda; 0 = hanya MinHash.
+DEFAULT_LSH = {
+    "bands": 16,
+    "rows": 4,
+    "numeric_tables": 8,
+    "numeric_width": 0.25,
+    "seed": 1,
+}
+
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def lsh_params(params=None) -> dict:
+    """DEFAULT_LSH ditimpa `params` (dict); nilai tidak valid -> RuntimeError."""
+    params = {**DEFAULT_LSH, **(params or {})}
+    unknown = set(params) - set(DEFAULT_LSH)
+    if unknown:
+        raise RuntimeError(f"Parameter LSH tidak dikenal: {', '.join(sorted(unknown))}")
+    try:
+        result = {
+            "bands": int(params["bands"]),
+            "rows": int(params["rows"]),
+            "numeric_tables": int(params["numeric_tables"]),
+            "numeric_width": float(params["numeric_width"]),
+            "seed": int(params["seed"]),
+        }
+    except (TypeError, ValueError):
+        raise RuntimeError("Parameter LSH harus berupa angka.")
+    if result["bands"] < 1 or result["rows"] < 1 or result["numeric_tables"] < 0:
+        raise RuntimeError("bands & rows LSH minimal 1, numeric_tables minimal 0.")
+    if result["numeric_width"] <= 0:
+        raise RuntimeError("numeric_width LSH harus lebih dari 0.")
+    return result
+
+
+# =========================================================
+# SIGNATURE & KUNCI BUCKET PER FILE
+# =========================================================
+def minhash_signatures(fingerprint_sets: list, num_perm: int, seed: int) -> np.ndarray:
+    """
+    Signature MinHash (n x num_perm, uint64) dari himpunan fingerprint AST
+    per file dengan permutasi a*x + b (mod 2^64).
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    signatures = np.full((len(fingerprint_sets), num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for i, fps in enumerate(fingerprint_sets):
+        if len(fps):
+            signatures[i] = (a[:, None] * fps[None, :] + b[:, None]).min(axis=1)
+    return signatures
+
+
+def _combine(columns: np.ndarray) -> np.ndarray:
+    """Satu kunci uint64 per baris dari kolom-kolom (n x k) bilangan bulat."""
+    keys = np.zeros(len(columns), dtype=np.uint64)
+    for col in columns.T:
+        keys = (keys ^ col.astype(np.uint64)) * _MIX
+    return keys
+
+
+def band_keys(signatures: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """Kunci bucket per band MinHash: n x bands."""
+    n = len(signatures)
+    grouped = signatures.reshape(n, bands, rows)
+    return np.stack([_combine(grouped[:, band]) for band in range(bands)], axis=1)
+
+
+def numeric_keys(numeric: np.ndarray, tables: int, width: float, seed: int) -> np.ndarray:
+    """
+    Kunci grid per tabel (n x tables): log1p setiap fitur numerik dibagi
+    `width` dan digeser acak per tabel, lalu dibulatkan ke bawah. Karena
+    numeric_similarity berbasis rasio, selisih log kecil = skor tinggi.
+    """
+    rng = np.random.default_rng(seed + 1)
+    logs = np.log1p(np.maximum(numeric, 0.0)) / width
+    keys = np.zeros((len(numeric), tables), dtype=np.uint64)
+    for t in range(tables):
+        cells = np.floor(logs + rng.random(numeric.shape[1])).astype(np.int64)
+        keys[:, t] = _combine(cells)
+    return keys
+
+
+# =========================================================
+# PASANGAN KANDIDAT DARI BUCKET YANG BERTABRAKAN
+# =========================================================
+def colliding_pairs(keys: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """
+    Pasangan (ids[a], ids[b]) dengan a < b yang berbagi kunci di minimal
+    satu kolom `keys`, dikodekan sebagai a_id * m + b_id (m = max(ids) + 1).
+    """
+    m = int(ids.max()) + 1 if len(ids) else 1
+    found = [np.zeros(0, dtype=np.int64)]
+    for col in keys.T:
+        order = np.argsort(col, kind="stable")
+        sorted_keys, sorted_ids = col[order], ids[order]
+        bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+        for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(col)]):
+            if end - start < 2:
+                continue
+            u, v = np.triu_indices(end - start, k=1)
+            a, b = sorted_ids[start + u], sorted_ids[start + v]
+            found.append(np.minimum(a, b) * m + np.maximum(a, b))
+    return np.unique(np.concatenate(found))
+
+
+def file_keys(fingerprint_sets: list, numeric: np.ndarray, params: dict) -> np.ndarray:
+    """
+    Semua kunci bucket per file: band MinHash lalu grid fitur numerik
+    (n x (bands + numeric_tables)). Dua file adalah kandidat bila sama di
+    minimal satu kolom.
+    """
+    signatures = minhash_signatures(
+        fingerprint_sets, params["bands"] * params["rows"], params["seed"]
+    )
+    keys = [band_keys(signatures, params["bands"], params["rows"])]
+    if params["numeric_tables"]:
+        keys.append(numeric_keys(
+            numeric, params["numeric_tables"], params["numeric_width"], params["seed"]
+        ))
+    return np.concatenate(keys, axis=1)
+
+
+def candidate_pairs(fingerprints: list, numeric: np.ndarray, ids, params: dict):
+    """
+    Pasangan kandidat di antara baris `ids`: bertabrakan di salah satu
+    band MinHash fingerprint AST, atau di salah satu grid fitur numerik.
+    -> (rows, cols) terurut dengan rows < cols.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if len(ids) < 2:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    keys = file_keys([fingerprints[i] for i in ids], numeric[ids], params)
+    codes = colliding_pairs(keys, ids)
+    m = int(ids.max()) + 1
+    return codes // m, codes % m
@@ -0,0 +1,159 @@
+from collections import Counter
+
+from django.db.models import F
+
+from ..models import MetricTotal
+
+# fase yang dicatat sebagai stats["time_<fase>"] (detik) beserta labelnya;
+# lsh, candidates, comments & blocks rincian pairs (dijumlah dari semua worker),
+# export bagian dari write atau dibuat saat diunduh
+PHASES = (
+    ("upload", "Simpan ZIP upload"),
+    ("read", "Baca ZIP"),
+    ("features", "Parse & ekstraksi fitur"),
+    ("pairs", "Skor pasangan file"),
+    ("lsh", "Kandidat pasangan LSH"),
+    ("candidates", "Indeks fingerprint blok"),
+    ("comments", "difflib komentar file"),
+    ("blocks", "Pencocokan blok"),
+    ("write", "Tulis hasil"),
+    ("corpus", "Kueri korpus historis"),
+    ("export", "Ekspor unduhan (CSV/TXT/XLSX/PNG)"),
+)
+SUB_PHASES = {"lsh", "candidates", "comments", "blocks", "export"}
+
+# penghitung per job: (kunci stats, label, deskripsi metrik)
+COUNTERS = (
+    ("files", "File dianalisis", "Jumlah file .py yang dianalisis."),
+    ("parses", "Parse AST", "Jumlah file yang benar-benar di-parse (bukan dari cache)."),
+    ("cache_hits", "Cache fitur hit", "Jumlah record fitur yang diambil dari cache."),
+    ("cache_misses", "Cache fitur miss", "Jumlah record fitur yang tidak ada di cache."),
+    ("cache_evicted", "Cache fitur dihapus", "Entri cache fitur yang dihapus karena melebihi batas ukuran."),
+    ("lsh_candidates", "Kandidat pasangan LSH", "Pasangan file kandidat dari bucket LSH."),
+    ("block_candidates", "Kandidat blok fingerprint", "Pasangan blok kandidat dari indeks fingerprint."),
+    ("block_pairs", "Pasangan blok dibandingkan", "Jumlah pasangan blok yang dibandingkan."),
+    ("comment_calls", "difflib komentar file", "Panggilan difflib untuk komentar level file."),
+    ("ratio_calls", "difflib ratio() blok", "Panggilan ratio() penuh pada pencocokan blok."),
+    ("corpus_candidates", "Kandidat korpus historis", "Pasangan file vs korpus historis yang dinilai."),
+    ("exports", "File ekspor dibuat", "Jumlah file unduhan yang dibuat."),
+    ("bytes_uploaded", "Byte diunggah", "Ukuran ZIP yang diunggah."),
+    ("bytes_written", "Byte ditulis", "Ukuran file hasil yang ditulis."),
+)
+
+METRIC_PREFIX = "analyzer"
+
+
+# =========================================================
+# RINGKASAN PER JOB (LOG & HALAMAN HASIL)
+# =========================================================
+def phase_rows(stats: dict) -> list:
+    """Baris tabel fase yang tercatat: {"label", "seconds", "sub"}."""
+    return [
+        {"label": label, "seconds": stats[f"time_{key}"], "sub": key in SUB_PHASES}
+        for key, label in PHASES
+        if f"time_{key}" in stats
+    ]
+
+
+def counter_rows(stats: dict) -> list:
+    return [
+        {"label": label, "value": int(stats[key])}
+        for key, label, _ in COUNTERS
+        if key in stats
+    ]
+
+
+def format_summary(stats: dict) -> str:
+    """Satu baris ringkas untuk log, mis. "read=0.01s features=0.20s ... files=40"."""
+    parts = [
+        f"{key}={stats[f'time_{key}']:.3f}s"
+        for key, _ in PHASES
+        if f"time_{key}" in stats
+    ]
+    parts += [f"{key}={int(stats[key])}" for key, _, _ in COUNTERS if key in stats]
+    return " ".join(parts)
+
+
+def merge_stats(stored: dict, extra: Counter) -> dict:
+    """Tambahkan penghitung `extra` ke stats job yang sudah tersimpan."""
+    merged = Counter(stored or {})
+    merged.update(extra)
+    return dict(merged)
+
+
+# =========================================================
+# TOTAL BERJALAN SEMUA JOB (FORMAT TEKS PROMETHEUS)
+# =========================================================
+def stats_delta(before: dict, after: dict) -> dict:
+    """Penghitung yang ditambahkan satu proses: `after` - `before`."""
+    before = before or {}
+    return {
+        k: v - before.get(k, 0)
+        for k, v in after.items()
+        if isinstance(v, (int, float)) and v != before.get(k, 0)
+    }
+
+
+def duration_totals(status: str, seconds: float) -> dict:
+    return {f"duration_sum:{status}": seconds, f"duration_count:{status}": 1}
+
+
+def record_totals(delta: dict):
+    """
+    Tambahkan `delta` (stats baru satu proses: upload, analisis, ekspor,
+    durasi) ke MetricTotal. Stats yang sama tidak boleh dicatat dua kali.
+    """
+    for key, value in delta.items():
+        if not isinstance(value, (int, float)) or not value:
+            continue
+        total, _ = MetricTotal.objects.get_or_create(key=key)
+        MetricTotal.objects.filter(pk=total.pk).update(value=F("value") + value)
+
+
+def summary_from_totals(status_counts: dict, totals: dict) -> dict:
+    """
+    Ringkasan untuk render_prometheus dari jumlah job per status dan
+    total berjalan ({kunci: nilai}, mis. dari MetricTotal).
+    """
+    totals = Counter(dict(totals))
+    durations = Counter()
+    for key, value in totals.items():
+        if key.startswith(("duration_sum:", "duration_count:")):
+            kind, status = key.split(":", 1)
+            durations[status, kind.removeprefix("duration_")] = value
+    return {"status": Counter(status_counts), "totals": totals, "durations": durations}
+
+
+def render_prometheus(summary: dict, statuses) -> str:
+    """Teks exposition format Prometheus 0.0.4 dari hasil summary_from_totals()."""
+    p = METRIC_PREFIX
+    lines = [
+        f"# HELP {p}_jobs Jumlah job analisis per status.",
+        f"# TYPE {p}_jobs gauge",
+    ]
+    for status in statuses:
+        lines.append(f'{p}_jobs{{status="{status}"}} {summary["status"][status]}')
+
+    lines += [
+        f"# HELP {p}_job_duration_seconds Durasi job (started_at s.d. finished_at).",
+        f"# TYPE {p}_job_duration_seconds summary",
+    ]
+    for status in statuses:
+        durations = summary["durations"]
+        lines.append(f'{p}_job_duration_seconds_sum{{status="{status}"}} {durations[status, "sum"]:.6f}')
+        lines.append(f'{p}_job_duration_seconds_count{{status="{status}"}} {int(durations[status, "count"])}')
+
+    lines += [
+        f"# HELP {p}_phase_seconds_total Total waktu per fase analisis.",
+        f"# TYPE {p}_phase_seconds_total counter",
+    ]
+    for key, _ in PHASES:
+        lines.append(f'{p}_phase_seconds_total{{phase="{key}"}} {summary["totals"][f"time_{key}"]:.6f}')
+
+    for key, _, help_text in COUNTERS:
+        lines += [
+            f"# HELP {p}_{key}_total {help_text}",
+            f"# TYPE {p}_{key}_total counter",
+            f"{p}_{key}_total {int(summary['totals'][key])}",
+        ]
+    return "\n".join(lines) + "\n"
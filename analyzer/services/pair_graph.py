@@ -0,0 +1,125 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .pair_ranking import iter_pair_scores, rank_edges, rank_pairs
+
+# kelompok kiriman yang saling terhubung lewat pasangan skor >= threshold
+SIMILAR_GROUPS_FILENAME = "kelompok_mirip.json"
+
+# jumlah hasil pasangan yang dinilai sekaligus terhadap pair_floor
+PAIR_FLOOR_BATCH = 65536
+
+
+def check_pair_floor(value) -> float | None:
+    """pair_floor sebagai float 0..1 (None = matriks penuh); selain itu RuntimeError."""
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise RuntimeError("pair_floor harus berupa angka.")
+    if not 0.0 <= value <= 1.0:
+        raise RuntimeError("pair_floor harus di antara 0 dan 1.")
+    return value
+
+
+# =========================================================
+# GRAF PASANGAN (EDGE LIST i < j) & KELOMPOK TERHUBUNG
+# =========================================================
+def edges_above(matrix: np.ndarray, threshold: float):
+    """(rows, cols, skor) pasangan i < j dengan skor >= threshold, dibaca per potongan baris."""
+    parts = []
+    for rows, cols, scores in iter_pair_scores(matrix, len(matrix)):
+        keep = np.nonzero(scores >= threshold)[0]
+        parts.append((rows[keep], cols[keep], scores[keep]))
+    if not parts:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp), np.zeros(0)
+    return tuple(np.concatenate(p) for p in zip(*parts))
+
+
+def similar_groups(n: int, rows: np.ndarray, cols: np.ndarray, scores: np.ndarray,
+                   threshold: float) -> list:
+    """
+    Komponen terhubung graf pasangan skor >= threshold (CSR, scipy csgraph)
+    yang berisi minimal dua file, terbesar dulu:
+    [{"members": [indeks file], "pairs": jumlah pasangan, "max_score"}].
+    """
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    keep = np.nonzero(np.asarray(scores) >= threshold)[0]
+    rows, cols, scores = np.asarray(rows)[keep], np.asarray(cols)[keep], np.asarray(scores)[keep]
+    if not len(keep):
+        return []
+    graph = csr_matrix((np.ones(len(keep), dtype=np.int8), (rows, cols)), shape=(n, n))
+    n_labels, labels = connected_components(graph, directed=False)
+
+    sizes = np.bincount(labels, minlength=n_labels)
+    edge_labels = labels[rows]
+    pair_counts = np.bincount(edge_labels, minlength=n_labels)
+    max_scores = np.zeros(n_labels)
+    np.maximum.at(max_scores, edge_labels, scores)
+
+    # anggota per label tanpa memindai semua file untuk tiap kelompok
+    order = np.argsort(labels, kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(sizes)])
+    groups = [
+        {
+            "members": order[bounds[label]:bounds[label + 1]].tolist(),
+            "pairs": int(pair_counts[label]),
+            "max_score": float(max_scores[label]),
+        }
+        for label in np.nonzero(sizes >= 2)[0]
+    ]
+    groups.sort(key=lambda g: (-len(g["members"]), -g["max_score"], g["members"][0]))
+    return groups
+
+
+def save_similar_groups(groups: list, names: list, path: Path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            [
+                {"files": [names[i] for i in g["members"]], "pairs": g["pairs"],
+                 "max_score": round(g["max_score"], 3)}
+                for g in groups
+            ],
+            f, ensure_ascii=False,
+        )
+
+
+def load_similar_groups(path) -> list:
+    """Kelompok dari kelompok_mirip.json ([] bila job lama tanpa file ini)."""
+    if not path or not Path(path).exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# =========================================================
+# AKSES HASIL TANPA MATRIKS PENUH (LIHAT result_store.open_result)
+# =========================================================
+def rank_result(result: dict, threshold: float, **kwargs):
+    """rank_pairs atas hasil open_result; hasil jarang diperingkat dari daftar pasangannya."""
+    if result["pairs"] is not None:
+        rows, cols, scores, _ = result["pairs"]
+        return rank_edges(rows, cols, scores, result["names"], threshold, **kwargs)
+    return rank_pairs(result["matrix"], result["names"], threshold, **kwargs)
+
+
+def result_tile(result: dict, row: int, col: int, size: int) -> np.ndarray:
+    """Ubin matriks [row:row+size, col:col+size]; untuk hasil jarang dibentuk dari pasangannya."""
+    if result["pairs"] is None:
+        return np.asarray(result["matrix"][row:row + size, col:col + size], dtype=np.float64)
+
+    rows, cols, scores, diagonal = result["pairs"]
+    n = len(diagonal)
+    height, width = max(min(size, n - row), 0), max(min(size, n - col), 0)
+    tile = np.zeros((height, width))
+    for a, b in ((rows, cols), (cols, rows)):
+        inside = np.nonzero((a >= row) & (a < row + height) & (b >= col) & (b < col + width))[0]
+        tile[a[inside] - row, b[inside] - col] = scores[inside]
+    ids = np.arange(max(row, col), min(row + height, col + width))
+    tile[ids - row, ids - col] = diagonal[ids]
+    return tile
@@ -0,0 +1,151 @@
+import numpy as np
+
+from .result_store import MATRIX_CHUNK_ROWS, iter_row_chunks
+
+# label, pesan, kelas badge per tingkat kemiripan
+TIERS = {
+    "rendah": ("Rendah", "Kemiripan di bawah threshold.", "badge-low"),
+    "sedang": ("Sedang", "Kemiripan melewati threshold, perlu ditinjau.", "badge-mid"),
+    "tinggi": ("Tinggi", "Kemiripan sangat tinggi, indikasi kuat.", "badge-high"),
+}
+
+
+# =========================================================
+# TINGKAT KEMIRIPAN BERDASARKAN THRESHOLD
+# =========================================================
+def tier_bounds(threshold: float):
+    """(batas bawah Sedang, batas bawah Tinggi) untuk threshold pengguna."""
+    t = float(threshold)
+    return t, t + (1.0 - t) / 2.0
+
+
+def tier_of(score: float, threshold: float) -> str:
+    mid, high = tier_bounds(threshold)
+    s = float(score)
+    if s < mid:
+        return "rendah"
+    if s < high:
+        return "sedang"
+    return "tinggi"
+
+
+def tier_mask(scores: np.ndarray, threshold: float, tier: str) -> np.ndarray:
+    mid, high = tier_bounds(threshold)
+    if tier == "rendah":
+        return scores < mid
+    if tier == "sedang":
+        return (scores >= mid) & (scores < high)
+    return scores >= high
+
+
+# =========================================================
+# PERINGKAT PASANGAN (TOP-K TANPA MENGURUTKAN SEMUA PASANGAN)
+# =========================================================
+def pair_indices(n: int, file_pos: int | None = None):
+    """Indeks (i, j), i < j, dalam urutan baris; hanya pasangan `file_pos` bila diberikan."""
+    if file_pos is None:
+        return np.triu_indices(n, k=1)
+    others = np.delete(np.arange(n), file_pos)
+    return np.minimum(others, file_pos), np.maximum(others, file_pos)
+
+
+def iter_pair_scores(matrix: np.ndarray, n: int, file_pos: int | None = None,
+                     chunk_rows: int = MATRIX_CHUNK_ROWS):
+    """
+    (rows, cols, skor) pasangan i < j dalam urutan baris, dibaca per
+    potongan baris sehingga matriks memmap tidak dimuat utuh.
+    """
+    if file_pos is not None:
+        rows, cols = pair_indices(n, file_pos)
+        scores = np.concatenate([matrix[:file_pos, file_pos], matrix[file_pos, file_pos + 1:]])
+        yield rows, cols, np.asarray(scores, dtype=np.float64)
+        return
+    for start, stop in iter_row_chunks(n, chunk_rows):
+        # segitiga atas potongan: kolom j > baris global start + a
+        local, cols = np.triu_indices(stop - start, k=start + 1, m=n)
+        block = np.asarray(matrix[start:stop], dtype=np.float64)
+        yield local + start, cols, block[local, cols]
+
+
+def top_candidates(scores: np.ndarray, k: int) -> np.ndarray:
+    """Posisi skor >= skor ke-k terbesar (seri di batas ikut), urutan asli."""
+    if k >= len(scores):
+        return np.arange(len(scores))
+    kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+    return np.nonzero(scores >= kth)[0]
+
+
+def rank_pairs(matrix: np.ndarray, names: list, threshold: float,
+               offset: int = 0, limit: int = 50, tier: str | None = None,
+               file: str | None = None):
+    """
+    Satu halaman pasangan file (segitiga atas matriks) urut skor menurun;
+    skor sama mengikuti urutan (i, j) seperti daftar lengkap semula.
+    Matriks dibaca per potongan baris dan hanya offset + limit teratas
+    tiap potongan yang disimpan dan diurutkan (argpartition).
+    Mengembalikan (jumlah pasangan setelah filter, list pasangan).
+    """
+    file_pos = None
+    if file is not None:
+        if file not in names:
+            return 0, []
+        file_pos = names.index(file)
+    chunks = iter_pair_scores(matrix, len(names), file_pos)
+    return rank_pair_chunks(chunks, names, threshold, offset, limit, tier)
+
+
+def rank_edges(rows: np.ndarray, cols: np.ndarray, scores: np.ndarray, names: list,
+               threshold: float, offset: int = 0, limit: int = 50,
+               tier: str | None = None, file: str | None = None):
+    """
+    rank_pairs untuk hasil jarang: hanya pasangan yang tersimpan (rows < cols,
+    urut (i, j)) yang diperingkat; pasangan lain tidak dihitung di total.
+    """
+    if file is not None:
+        if file not in names:
+            return 0, []
+        pos = names.index(file)
+        keep = np.nonzero((rows == pos) | (cols == pos))[0]
+        rows, cols, scores = rows[keep], cols[keep], scores[keep]
+    chunks = [(rows, cols, np.asarray(scores, dtype=np.float64))]
+    return rank_pair_chunks(chunks, names, threshold, offset, limit, tier)
+
+
+def rank_pair_chunks(chunks, names: list, threshold: float, offset: int = 0,
+                     limit: int = 50, tier: str | None = None):
+    """Inti rank_pairs/rank_edges atas potongan (rows, cols, skor) berurutan (i, j)."""
+    k = offset + limit
+    total = 0
+    best = (np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp), np.zeros(0))
+    for rows, cols, scores in chunks:
+        if tier is not None:
+            keep = np.nonzero(tier_mask(scores, threshold, tier))[0]
+            rows, cols, scores = rows[keep], cols[keep], scores[keep]
+        total += len(scores)
+        if k <= 0:
+            continue
+        cand = top_candidates(scores, k)
+        # kandidat lama mendahului potongan ini dalam urutan (i, j)
+        merged = [np.concatenate([old, new[cand]]) for old, new in zip(best, (rows, cols, scores))]
+        # k teratas (argsort stabil: seri tetap urut (i, j)), disimpan dalam urutan (i, j)
+        keep = np.sort(np.argsort(-merged[2], kind="stable")[:k])
+        best = tuple(m[keep] for m in merged)
+
+    if k <= 0 or offset >= total:
+        return total, []
+    rows, cols, scores = best
+    order = np.argsort(-scores, kind="stable")[offset:k]
+
+    pairs = []
+    for p in order:
+        score = float(scores[p])
+        label, msg, cls = TIERS[tier_of(score, threshold)]
+        pairs.append({
+            "file_a": names[rows[p]],
+            "file_b": names[cols[p]],
+            "score": score,
+            "tier_label": label,
+            "tier_message": msg,
+            "tier_class": cls,
+        })
+    return total, pairs
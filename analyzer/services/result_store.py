@@ -0,0 +1,396 @@
+import hashlib
+import json
+import os
+import tempfile
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+MATRIX_FILENAME = "matriks_similaritas.npy"
+LABELS_FILENAME = "label_file.json"
+# komponen komentar (difflib) level file per pasangan (float64), dipakai ulang saat append
+COMMENTS_FILENAME = "komponen_komentar.npy"
+BLOCKS_FILENAME = "blok_mirip.npz"
+# baris kecocokan blok (m x 6 int32, urut per pasangan) tanpa kompresi agar bisa di-memmap
+BLOCK_ROWS_FILENAME = "blok_mirip_baris.npy"
+# hasil jarang (mode LSH / pair_floor): hanya pasangan tersimpan, pengganti MATRIX_FILENAME
+PAIRS_FILENAME = "pasangan_similaritas.npz"
+
+# skor blok disimpan dalam seperseribu (skor sudah dibulatkan 3 desimal)
+SCORE_SCALE = 1000
+
+# jumlah baris matriks per potongan saat ditulis/dibaca (256 x 5.000 float32 = 5 MB)
+MATRIX_CHUNK_ROWS = 256
+
+# kecocokan blok per segmen BlockMatchWriter sebelum ditulis ke disk (6 x int32 = 24 MB);
+# juga jumlah baris per potongan saat baris blok dibaca ulang
+BLOCK_SEGMENT_ROWS = 1 << 20
+
+# urutan kolom baris kecocokan blok
+BLOCK_COLUMNS = (
+    ("file_a", np.int32), ("file_b", np.int32), ("kind", np.uint8),
+    ("score", np.uint16), ("snippet_a", np.int32), ("snippet_b", np.int32),
+)
+
+
+# =========================================================
+# PENYIMPANAN HASIL BINER RINGKAS (MATRIKS + BLOK KOLOMNAR)
+# =========================================================
+def temp_path_for(path: Path) -> Path:
+    """File sementara di folder yang sama (untuk tulis lalu os.replace)."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=path.suffix)
+    os.close(fd)
+    os.chmod(tmp, 0o644)
+    return Path(tmp)
+
+
+def _save_labels(out_dir: Path, names: list):
+    with open(out_dir / LABELS_FILENAME, "w", encoding="utf-8") as f:
+        json.dump(list(names), f, ensure_ascii=False)
+
+
+def load_labels(out_dir: Path) -> list:
+    with open(out_dir / LABELS_FILENAME, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def create_memmap(path: Path, n: int, dtype=np.float32) -> np.memmap:
+    """
+    Matriks n x n nol di file .npy sementara di folder `path` (memmap
+    tulis); jadikan `path` dengan commit_memmap.
+    """
+    return np.lib.format.open_memmap(temp_path_for(path), mode="w+", dtype=dtype, shape=(n, n))
+
+
+def commit_memmap(matrix: np.memmap, path: Path):
+    """Flush memmap dari create_memmap lalu ganti `path` dengannya (atomik)."""
+    if Path(matrix.filename) == Path(path):
+        return
+    matrix.flush()
+    os.replace(matrix.filename, path)
+
+
+def discard_memmap(matrix: np.memmap):
+    """Hapus file sementara memmap dari create_memmap yang belum di-commit_memmap."""
+    Path(matrix.filename).unlink(missing_ok=True)
+
+
+def iter_row_chunks(n: int, chunk_rows: int = MATRIX_CHUNK_ROWS):
+    for start in range(0, n, chunk_rows):
+        yield start, min(start + chunk_rows, n)
+
+
+def write_matrix(out_dir: Path, names: list, fill_rows, chunk_rows: int = MATRIX_CHUNK_ROWS):
+    """
+    Matriks similaritas float32 (.npy) + label nama file (.json). Baris
+    diisi langsung ke memmap per potongan: fill_rows(start, stop) -> array
+    (stop - start) x n, sehingga matriks tidak pernah utuh di memori.
+    """
+    out_dir = Path(out_dir)
+    path = out_dir / MATRIX_FILENAME
+    matrix = create_memmap(path, len(names))
+    try:
+        for start, stop in iter_row_chunks(len(names), chunk_rows):
+            matrix[start:stop] = fill_rows(start, stop)
+        commit_memmap(matrix, path)
+    finally:
+        if os.path.exists(matrix.filename):
+            os.unlink(matrix.filename)
+    (out_dir / PAIRS_FILENAME).unlink(missing_ok=True)
+    _save_labels(out_dir, names)
+
+
+def save_pairs(out_dir: Path, rows, cols, scores, diagonal, names: list):
+    """
+    Hasil jarang: skor float32 pasangan (rows[k], cols[k]) dengan rows < cols
+    dan diagonal per file; sel lain bernilai 0.
+    """
+    out_dir = Path(out_dir)
+    path = out_dir / PAIRS_FILENAME
+    tmp = temp_path_for(path)
+    np.savez_compressed(
+        tmp,
+        rows=np.asarray(rows, dtype=np.int32),
+        cols=np.asarray(cols, dtype=np.int32),
+        scores=np.asarray(scores, dtype=np.float32),
+        diagonal=np.asarray(diagonal, dtype=np.float32),
+    )
+    os.replace(tmp, path)
+    (out_dir / MATRIX_FILENAME).unlink(missing_ok=True)
+    _save_labels(out_dir, names)
+
+
+def load_pairs(out_dir: Path):
+    """(rows, cols, scores, diagonal, list nama file) dari hasil jarang."""
+    out_dir = Path(out_dir)
+    with np.load(out_dir / PAIRS_FILENAME, allow_pickle=False) as data:
+        pairs = data["rows"], data["cols"], data["scores"], data["diagonal"]
+    return (*pairs, load_labels(out_dir))
+
+
+def is_sparse_result(out_dir: Path) -> bool:
+    return (Path(out_dir) / PAIRS_FILENAME).exists()
+
+
+def load_matrix(out_dir: Path, mmap: bool = True):
+    """
+    (matriks float32, list nama file); dengan `mmap` (default) hanya
+    bagian yang diakses yang dibaca dari disk. Hasil jarang dibentangkan
+    menjadi matriks penuh (simetris); gunakan open_result agar tidak n x n.
+    """
+    out_dir = Path(out_dir)
+    if is_sparse_result(out_dir):
+        rows, cols, scores, diagonal, names = load_pairs(out_dir)
+        matrix = np.diag(diagonal)
+        matrix[rows, cols] = scores
+        matrix[cols, rows] = scores
+        return matrix, names
+    matrix = np.load(out_dir / MATRIX_FILENAME, mmap_mode="r" if mmap else None, allow_pickle=False)
+    return matrix, load_labels(out_dir)
+
+
+def open_result(out_dir: Path) -> dict:
+    """
+    Hasil job apa adanya: {"names", "matrix" (memmap, None bila jarang),
+    "pairs" (rows, cols, scores, diagonal; None bila matriks penuh)}.
+    """
+    out_dir = Path(out_dir)
+    if is_sparse_result(out_dir):
+        rows, cols, scores, diagonal, names = load_pairs(out_dir)
+        return {"names": names, "matrix": None, "pairs": (rows, cols, scores, diagonal)}
+    matrix, names = load_matrix(out_dir)
+    return {"names": names, "matrix": matrix, "pairs": None}
+
+
+class BlockMatchWriter:
+    """
+    Penampung hasil blok mirip yang diisi bertahap (per pasangan, urutan
+    bebas) lalu disimpan sebagai baris array: indeks file, jenis, skor, dan
+    indeks potongan kode. Tiap kecocokan hanya memakan beberapa byte di
+    array bertipe; potongan kode yang sama disimpan sekali dalam satu blob
+    UTF-8 + offset (dikenali lewat digest, teks tidak disimpan dua kali),
+    jadi ukurannya mengikuti jumlah blok, bukan jumlah kecocokan.
+
+    Dengan `spill_dir`, tiap `segment_rows` kecocokan ditulis ke file
+    segmen sementara di folder itu sehingga memori selama penilaian tidak
+    tumbuh dengan jumlah kecocokan; save() menggabung segmen langsung ke
+    memmap di disk (tidak pernah utuh di memori) dan menghapusnya, begitu
+    juga discard().
+    """
+
+    def __init__(self, spill_dir: Path | None = None, segment_rows: int = BLOCK_SEGMENT_ROWS):
+        self.spill_dir = spill_dir
+        self.segment_rows = segment_rows
+        self._segments = []
+        self._spilled = 0
+        self._reset_rows()
+        self._types = {}
+        self._snippets = {}
+        self._blob = bytearray()
+        self._offsets = array("q", [0])
+
+    def _reset_rows(self):
+        self.file_a = array("i")
+        self.file_b = array("i")
+        self.kind = array("B")
+        self.score = array("H")
+        self.snippet_a = array("i")
+        self.snippet_b = array("i")
+
+    def __len__(self):
+        return self._spilled + len(self.file_a)
+
+    def _rows(self) -> np.ndarray:
+        """Kecocokan yang masih di memori sebagai array m x 6 int32 (urutan BLOCK_COLUMNS)."""
+        values = (self.file_a, self.file_b, self.kind, self.score, self.snippet_a, self.snippet_b)
+        rows = np.empty((len(self.file_a), len(BLOCK_COLUMNS)), dtype=np.int32)
+        for k, (column, (_, dtype)) in enumerate(zip(values, BLOCK_COLUMNS)):
+            rows[:, k] = np.frombuffer(column, dtype=dtype)
+        return rows
+
+    def _spill(self):
+        path = temp_path_for(Path(self.spill_dir) / "blok_segmen.npy")
+        self._segments.append(path)
+        np.save(path, self._rows())
+        self._spilled += len(self.file_a)
+        self._reset_rows()
+
+    def _type_id(self, name):
+        t = self._types.get(name)
+        if t is None:
+            t = self._types[name] = len(self._types)
+        return t
+
+    def _snippet_id(self, text):
+        data = text.encode("utf-8", "surrogatepass")
+        key = hashlib.blake2b(data, digest_size=16).digest()
+        sid = self._snippets.get(key)
+        if sid is None:
+            sid = self._snippets[key] = len(self._offsets) - 1
+            self._blob += data
+            self._offsets.append(len(self._blob))
+        return sid
+
+    def add(self, a: int, b: int, blocks):
+        """Tambahkan kecocokan blok pasangan file (indeks a, b)."""
+        for blk in blocks:
+            self.file_a.append(a)
+            self.file_b.append(b)
+            self.kind.append(self._type_id(blk["type"]))
+            self.score.append(round(blk["score"] * SCORE_SCALE))
+            self.snippet_a.append(self._snippet_id(blk["snippet_a"]))
+            self.snippet_b.append(self._snippet_id(blk["snippet_b"]))
+        if self.spill_dir is not None and len(self.file_a) >= self.segment_rows:
+            self._spill()
+
+    def _parts(self) -> list:
+        """Segmen disk (memmap) lalu baris di memori, dalam urutan penambahan."""
+        parts = [np.load(path, mmap_mode="r", allow_pickle=False) for path in self._segments]
+        return [*parts, self._rows()]
+
+    def _snippet_columns(self) -> dict:
+        return {
+            "types": np.array(list(self._types), dtype=str),
+            "snippet_blob": np.frombuffer(bytes(self._blob), dtype=np.uint8),
+            "snippet_offsets": np.frombuffer(self._offsets, dtype=np.int64),
+        }
+
+    def columns(self) -> dict:
+        """
+        Semua kolom di memori, diurutkan per pasangan (a, b) secara stabil
+        (untuk hasil kecil, mis. API batch); hasil besar ditulis dengan save().
+        """
+        rows = np.concatenate(self._parts())
+        order = np.lexsort((rows[:, 1], rows[:, 0]))
+        return {
+            **{name: rows[order, k].astype(dtype) for k, (name, dtype) in enumerate(BLOCK_COLUMNS)},
+            **self._snippet_columns(),
+        }
+
+    def _write_sorted_rows(self, path: Path):
+        """
+        Urutan yang sama dengan columns(), tetapi ditulis langsung ke memmap
+        `path`: baris tiap segmen disebar ke rentang file_a-nya (counting
+        sort, stabil), lalu tiap rentang diurutkan per file_b. Memori puncak
+        = satu segmen atau kecocokan satu file_a, bukan seluruh hasil.
+        """
+        parts = self._parts()
+        n_files = max((int(part[:, 0].max()) + 1 for part in parts if len(part)), default=0)
+        counts = np.zeros(n_files, dtype=np.int64)
+        for part in parts:
+            counts += np.bincount(part[:, 0], minlength=n_files)
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        shape = (len(self), len(BLOCK_COLUMNS))
+        rows = np.lib.format.open_memmap(path, mode="w+", dtype=np.int32, shape=shape)
+        try:
+            fill = bounds[:-1].copy()
+            for part in parts:
+                if not len(part):
+                    continue
+                order = np.argsort(part[:, 0], kind="stable")
+                file_a = part[order, 0]
+                ids, first, sizes = np.unique(file_a, return_index=True, return_counts=True)
+                rank = np.arange(len(file_a)) - np.repeat(first, sizes)
+                rows[fill[file_a] + rank] = part[order]
+                fill[ids] += sizes
+            for a in np.nonzero(counts > 1)[0]:
+                group = np.asarray(rows[bounds[a]:bounds[a + 1]])
+                rows[bounds[a]:bounds[a + 1]] = group[np.argsort(group[:, 1], kind="stable")]
+            rows.flush()
+        finally:
+            del rows
+
+    def save(self, out_dir: Path):
+        out_dir = Path(out_dir)
+        rows_path = out_dir / BLOCK_ROWS_FILENAME
+        rows_tmp = temp_path_for(rows_path)
+        path = out_dir / BLOCKS_FILENAME
+        tmp = temp_path_for(path)
+        try:
+            self._write_sorted_rows(rows_tmp)
+            np.savez_compressed(tmp, **self._snippet_columns())
+            os.replace(rows_tmp, rows_path)
+            os.replace(tmp, path)
+        finally:
+            rows_tmp.unlink(missing_ok=True)
+            tmp.unlink(missing_ok=True)
+        self.discard()
+
+    def discard(self):
+        """Hapus file segmen sementara (setelah save atau bila analisis gagal)."""
+        for segment in self._segments:
+            Path(segment).unlink(missing_ok=True)
+
+
+def decode_snippets(blob: np.ndarray, offsets: np.ndarray) -> list:
+    data = blob.tobytes()
+    return [
+        data[offsets[k]:offsets[k + 1]].decode("utf-8", "surrogatepass")
+        for k in range(len(offsets) - 1)
+    ]
+
+
+def _block_rows(out_dir: Path, data) -> np.ndarray:
+    """Baris blok (memmap); hasil lama menyimpannya sebagai kolom di dalam npz."""
+    path = Path(out_dir) / BLOCK_ROWS_FILENAME
+    if path.exists():
+        return np.load(path, mmap_mode="r", allow_pickle=False)
+    return np.stack([data[name].astype(np.int32) for name, _ in BLOCK_COLUMNS], axis=1)
+
+
+def iter_pair_rows(rows: np.ndarray, chunk_rows: int = BLOCK_SEGMENT_ROWS):
+    """Baris blok per pasangan (a, b), dibaca per potongan `chunk_rows` baris."""
+    carry = np.empty((0, rows.shape[1]), dtype=rows.dtype)
+    for start, stop in iter_row_chunks(len(rows), chunk_rows):
+        chunk = np.concatenate([carry, rows[start:stop]])
+        changed = (chunk[1:, 0] != chunk[:-1, 0]) | (chunk[1:, 1] != chunk[:-1, 1])
+        cuts = [0, *(np.nonzero(changed)[0] + 1)]
+        for lo, hi in zip(cuts, cuts[1:]):
+            yield chunk[lo:hi]
+        # pasangan terakhir bisa berlanjut di potongan berikutnya
+        carry = chunk[cuts[-1]:]
+    if len(carry):
+        yield carry
+
+
+def iter_blocks(out_dir: Path, names: list):
+    """
+    Bangun ulang entri blok mirip satu per satu; baris dibaca dari memmap
+    per pasangan file, jadi konsumen yang berhenti lebih awal (mis. pratinjau)
+    tidak membaca seluruh hasil.
+    """
+    with np.load(Path(out_dir) / BLOCKS_FILENAME, allow_pickle=False) as data:
+        types = [str(t) for t in data["types"]]
+        blob = data["snippet_blob"].tobytes()
+        offsets = data["snippet_offsets"]
+        rows = _block_rows(out_dir, data)
+
+    def snippet(sid):
+        return blob[offsets[sid]:offsets[sid + 1]].decode("utf-8", "surrogatepass")
+
+    for pair in iter_pair_rows(rows):
+        yield {
+            "file1": names[pair[0, 0]],
+            "file2": names[pair[0, 1]],
+            "similar_blocks": [
+                {
+                    "type": types[kind],
+                    "score": int(score) / SCORE_SCALE,
+                    "snippet_a": snippet(snippet_a),
+                    "snippet_b": snippet(snippet_b),
+                }
+                for _, _, kind, score, snippet_a, snippet_b in pair
+            ],
+        }
+
+
+def result_file(out_dir: Path) -> Path:
+    """File skor hasil job: matriks penuh, atau pasangan jarang (mode LSH / pair_floor)."""
+    out_dir = Path(out_dir)
+    return out_dir / (PAIRS_FILENAME if is_sparse_result(out_dir) else MATRIX_FILENAME)
+
+
+def has_result(out_dir: Path) -> bool:
+    out_dir = Path(out_dir)
+    return result_file(out_dir).exists() and (out_dir / LABELS_FILENAME).exists()
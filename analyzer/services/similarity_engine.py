@@ -4,15 +4,39 @@ import ast
 import re
 import difflib
 import os
+import hashlib
+import heapq
+import itertools
+import json
+import pickle
+import textwrap
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 import matplotlib
 matplotlib.use("Agg")   # aman untuk server
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import seaborn as sns
 
+import numpy as np
 import pandas as pd
 from openpyxl import Workbook
 
+from .ast_features import (
+    AstFeatureVisitor, block_fingerprints, canonical_ast_hash, slice_block, visit_tree,
+)
+from .lsh import candidate_pairs, lsh_params
+from .pair_graph import (
+    PAIR_FLOOR_BATCH, SIMILAR_GROUPS_FILENAME, edges_above, save_similar_groups, similar_groups,
+)
+from .result_store import (
+    BLOCK_ROWS_FILENAME, BLOCKS_FILENAME, COMMENTS_FILENAME, LABELS_FILENAME, BlockMatchWriter,
+    commit_memmap, create_memmap, discard_memmap, is_sparse_result, iter_blocks, iter_row_chunks,
+    load_labels, load_matrix, load_pairs, result_file, save_pairs, temp_path_for, write_matrix,
+)
+
 logger = logging.getLogger(__name__)
 
 # =========================================================
@@ -28,6 +52,24 @@ DEFAULT_AST_WEIGHTS = {
     "logic_modification": 0.10,
 }
 
+# naikkan jika hasil analyze_code berubah (membatalkan cache fitur lama)
+FEATURE_EXTRACTOR_VERSION = "6"
+
+# aturan pencocokan blok engine ini (lihat engines.ENGINES):
+# nested_blocks = blok bersarang ikut dicocokkan (di-dedent dulu),
+# self_blocks = blok sebuah file juga dicocokkan dengan file itu sendiri
+DEFAULT_SCORING = {"nested_blocks": True, "self_blocks": False}
+
+# urutan kolom fitur numerik pada tabel fitur per file
+NUMERIC_FEATURES = (
+    "structure",
+    "execution_order",
+    "hierarchy",
+    "variable_names",
+    "logic_modification",
+    "formatting",
+)
+
 
 # =========================================================
 # UTIL DASAR
@@ -88,27 +130,40 @@ def extract_comment_strings(code: str) -> str:
 # =========================================================
 # EKSTRAKSI FITUR AST
 # =========================================================
+def _features_from_visitor(visitor, code: str) -> dict:
+    feats = visitor.features()
+    feats["formatting"] = code.count(" ") + code.count("\t")
+    feats["comment_text"] = extract_comment_strings(code)
+    return feats
+
+
 def get_ast_features(code: str) -> dict | None:
     try:
         tree = ast.parse(code)
     except SyntaxError:
         return None
+    return _features_from_visitor(visit_tree(tree), code)
 
-    functions = [n for n in ast.walk(tree) if isinstance(n, ast.FunctionDef)]
-    loops = [n for n in ast.walk(tree) if isinstance(n, (ast.For, ast.While))]
-    conditionals = [n for n in ast.walk(tree) if isinstance(n, ast.If)]
-    assignments = [n for n in ast.walk(tree) if isinstance(n, ast.Assign)]
-    names = {n.id for n in ast.walk(tree) if isinstance(n, ast.Name)}
 
-    return {
-        "structure": len(functions) + len(loops) + len(conditionals),
-        "execution_order": sum(1 for _ in ast.walk(tree)),
-        "hierarchy": sum(1 for f in functions if f.body),
-        "variable_names": len(names),
-        "logic_modification": len(assignments),
-        "formatting": code.count(" ") + code.count("\t"),
-        "comment_text": extract_comment_strings(code),
-    }
+def analyze_code(code: str):
+    """
+    Parse + satu traversal per file: mengembalikan (fitur, indeks blok).
+    Fitur None jika SyntaxError (indeks blok kosong). Fitur juga memuat
+    `canonical_hash` untuk deteksi klon struktural dan `fingerprints`
+    (fingerprint AST seluruh file, untuk kandidat LSH).
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None, EMPTY_BLOCK_INDEX
+    visitor = visit_tree(tree)
+    # satu token stream untuk fingerprint file (modul) dan semua bloknya
+    fingerprints = block_fingerprints(tree, [tree, *visitor.blocks])
+    block_index = build_block_index(visitor.blocks, code.splitlines(), fingerprints[1:], tree.body)
+    feats = _features_from_visitor(visitor, code)
+    feats["canonical_hash"] = canonical_ast_hash(tree)
+    feats["fingerprints"] = fingerprints[0]
+    return feats, block_index
 
 
 # =========================================================
@@ -133,6 +188,150 @@ def block_similarity(code1: str, code2: str, weights: dict) -> float:
     return sum(scores[k] * weights[k] for k in weights)
 
 
+# =========================================================
+# PRECOMPUTE FITUR PER FILE (SEKALI PARSE PER FILE)
+# =========================================================
+def file_record(code: str | None, cache=None, stats=None):
+    """
+    Record satu file = (fitur, indeks blok) dari analyze_code, atau None
+    untuk file kosong / gagal dibaca. Dengan `cache` (FeatureCache) record
+    diambil/disimpan berdasarkan hash isi file. Parse yang benar-benar
+    dijalankan dihitung di stats["parses"].
+    """
+    if not code:
+        return None
+    record = cache.get(code) if cache is not None else None
+    if record is None:
+        record = analyze_code(code)
+        if stats is not None:
+            stats["parses"] += 1
+        if cache is not None:
+            cache.put(code, record)
+    return record
+
+
+NO_FINGERPRINTS = np.zeros(0, dtype=np.uint64)
+
+
+def table_from_records(records: list, nested_blocks: bool = True) -> dict:
+    """
+    Satu record fitur per file: baris float untuk fitur numerik
+    (urutan NUMERIC_FEATURES), teks komentar, dan indeks blok dari parse
+    yang sama. File kosong / gagal
+    dibaca / SyntaxError ditandai valid=False dan skornya 0.
+    Tanpa `nested_blocks` indeks blok hanya memuat blok level atas.
+    """
+    n = len(records)
+    numeric = np.zeros((n, len(NUMERIC_FEATURES)), dtype=np.float64)
+    comments = [""] * n
+    fingerprints = [NO_FINGERPRINTS] * n
+    blocks = [EMPTY_BLOCK_INDEX] * n
+    valid = np.zeros(n, dtype=bool)
+
+    for i, record in enumerate(records):
+        if record is None:
+            continue
+        feats, blocks[i] = record
+        if not nested_blocks:
+            blocks[i] = top_level_block_index(blocks[i])
+        if not feats:
+            continue
+        numeric[i] = [feats[k] for k in NUMERIC_FEATURES]
+        comments[i] = feats["comment_text"]
+        fingerprints[i] = feats["fingerprints"]
+        valid[i] = True
+
+    return {
+        "numeric": numeric,
+        "comments": comments,
+        "fingerprints": fingerprints,
+        "blocks": blocks,
+        "valid": valid,
+    }
+
+
+def numeric_similarity_array(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """numeric_similarity elemen demi elemen (a dan b di-broadcast)."""
+    max_val = np.maximum(a, b)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sim = 1 - np.abs(a - b) / max_val
+    return np.where(max_val == 0, 1.0, sim)
+
+
+def numeric_similarity_matrix(values_a: np.ndarray, values_b: np.ndarray | None = None) -> np.ndarray:
+    """numeric_similarity untuk semua pasangan sekaligus (broadcast len(a) x len(b))."""
+    if values_b is None:
+        values_b = values_a
+    return numeric_similarity_array(values_a[:, None], values_b[None, :])
+
+
+def file_similarity_matrix(table: dict, weights: dict, comment_matrix: np.ndarray | None = None,
+                           rows: slice | None = None) -> np.ndarray:
+    """
+    Matriks similaritas antar file. Komponen numerik dihitung sebagai
+    satu operasi array; hanya komponen komentar (difflib) yang per pasangan
+    (atau diambil dari `comment_matrix` hasil worker paralel).
+    Penjumlahan mengikuti urutan `weights` agar hasil identik dengan
+    block_similarity. `rows` membatasi hasil ke potongan baris tersebut
+    (mis. untuk ditulis per potongan ke memmap).
+    """
+    valid = table["valid"]
+    numeric = table["numeric"]
+    if rows is None:
+        rows = slice(0, len(valid))
+
+    total = np.zeros((len(valid[rows]), len(valid)), dtype=np.float64)
+    for k in weights:
+        if k == "comments":
+            comp = comment_matrix
+            if comp is None:
+                comp = comment_similarity_matrix(table)
+            comp = comp[rows]
+        else:
+            col = NUMERIC_FEATURES.index(k)
+            comp = numeric_similarity_matrix(numeric[rows, col], numeric[:, col])
+        total += comp * weights[k]
+
+    total[~valid[rows], :] = 0.0
+    total[:, ~valid] = 0.0
+    return total
+
+
+def file_similarity_pairs(table: dict, weights: dict, rows: np.ndarray, cols: np.ndarray,
+                          comments: np.ndarray) -> np.ndarray:
+    """
+    Seperti file_similarity_matrix tetapi hanya untuk pasangan (rows[k],
+    cols[k]) dengan komponen komentar `comments[k]` (mode LSH/jarang).
+    """
+    total = np.zeros(len(rows), dtype=np.float64)
+    for k in weights:
+        if k == "comments":
+            comp = comments
+        else:
+            col = NUMERIC_FEATURES.index(k)
+            comp = numeric_similarity_array(table["numeric"][rows, col], table["numeric"][cols, col])
+        total += comp * weights[k]
+
+    valid = table["valid"]
+    total[~(valid[rows] & valid[cols])] = 0.0
+    return total
+
+
+def comment_similarity_matrix(table: dict) -> np.ndarray:
+    valid = table["valid"]
+    comments = table["comments"]
+    n = len(valid)
+
+    comp = np.zeros((n, n), dtype=np.float64)
+    idx = np.flatnonzero(valid)
+    for a_pos, i in enumerate(idx):
+        for j in idx[a_pos:]:
+            sim = comment_similarity(comments[i], comments[j])
+            comp[i, j] = sim
+            comp[j, i] = sim
+    return comp
+
+
 # =========================================================
 # EKSTRAKSI BLOK KODE
 # =========================================================
@@ -141,38 +340,485 @@ def extract_code_blocks(code: str):
     try:
         tree = ast.parse(code)
         lines = code.splitlines()
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.For, ast.While, ast.If)):
-                if hasattr(node, "lineno") and hasattr(node, "end_lineno"):
-                    block = "\n".join(lines[node.lineno - 1: node.end_lineno])
-                    blocks.append((type(node).__name__, block))
+        for node in visit_tree(tree).blocks:
+            if hasattr(node, "lineno") and hasattr(node, "end_lineno"):
+                blocks.append((type(node).__name__, slice_block(lines, node)))
     except Exception:
         pass
     return blocks
 
 
-def find_similar_blocks(code1: str, code2: str, threshold: float, weights: dict):
-    results = []
-    for t1, b1 in extract_code_blocks(code1):
-        for t2, b2 in extract_code_blocks(code2):
-            if t1 != t2:
+# =========================================================
+# INDEKS FITUR BLOK (DARI SUBTREE, TANPA PARSE ULANG)
+# =========================================================
+def build_block_index(nodes: list, lines: list, fingerprints: list, top_nodes=()) -> dict:
+    """
+    Fitur setiap blok dihitung sekali dari subtree yang sudah di-parse,
+    lalu dikelompokkan per jenis node. Teks blok hanya dipakai untuk
+    formatting, komentar, dan snippet; blok bersarang di-dedent dulu
+    agar setara dengan blok level atas. `fingerprints` = hasil
+    block_fingerprints untuk `nodes` (kandidat mode fingerprint).
+    `top_nodes` = statement level modul (tree.body); hanya blok di sana
+    yang ditandai top_level (elif level modul ber-col_offset 0 tetapi
+    bersarang di If sebelumnya).
+    """
+    types, comments, snippets = [], [], []
+    numeric = np.zeros((len(nodes), len(NUMERIC_FEATURES)), dtype=np.float64)
+    top_ids = {id(node) for node in top_nodes}
+    top_level = np.array([id(node) in top_ids for node in nodes], dtype=bool)
+
+    for pos, node in enumerate(nodes):
+        text = slice_block(lines, node)
+        snippets.append(text[:120])
+        if node.col_offset:
+            text = textwrap.dedent(text)
+        feats = _features_from_visitor(AstFeatureVisitor().run_block(node), text)
+        numeric[pos] = [feats[k] for k in NUMERIC_FEATURES]
+        comments.append(feats["comment_text"])
+        types.append(type(node).__name__)
+
+    return _block_index(types, numeric, comments, snippets, top_level, fingerprints)
+
+
+def _block_index(types, numeric, comments, snippets, top_level, fingerprints) -> dict:
+    groups = {}
+    for pos, t in enumerate(types):
+        groups.setdefault(t, []).append(pos)
+
+    return {
+        "types": types,
+        "numeric": numeric,
+        "comments": comments,
+        "snippets": snippets,
+        "top_level": top_level,
+        "fingerprints": fingerprints,
+        "groups": {t: np.array(p, dtype=np.intp) for t, p in groups.items()},
+    }
+
+
+EMPTY_BLOCK_INDEX = build_block_index([], [], [])
+
+
+def top_level_block_index(idx: dict) -> dict:
+    """Indeks blok yang hanya berisi blok level atas (statement di tree.body)."""
+    if idx["top_level"].all():
+        return idx
+    keep = np.flatnonzero(idx["top_level"])
+    return _block_index(
+        [idx["types"][p] for p in keep],
+        idx["numeric"][keep],
+        [idx["comments"][p] for p in keep],
+        [idx["snippets"][p] for p in keep],
+        idx["top_level"][keep],
+        [idx["fingerprints"][p] for p in keep],
+    )
+
+
+def block_index_from_code(code: str) -> dict:
+    try:
+        tree = ast.parse(code)
+    except Exception:
+        return EMPTY_BLOCK_INDEX
+    blocks = visit_tree(tree).blocks
+    return build_block_index(blocks, code.splitlines(), block_fingerprints(tree, blocks), tree.body)
+
+
+# margin aman untuk selisih pembulatan antara batas atas dan skor eksak
+BOUND_EPS = 1e-9
+
+
+def bounded_block_scores(idx1: dict, pos1, idx2: dict, pos2, weights: dict,
+                         threshold: float | None = None, stats=None,
+                         mask: np.ndarray | None = None) -> np.ndarray:
+    """
+    Komponen numerik dihitung dulu (murah, vektor). Jika `threshold`
+    diberikan, bobot komentar dipakai sebagai batas atas skor yang masih
+    mungkin dicapai; pasangan yang tetap di bawah threshold dipangkas
+    bertahap (batas 1.0 -> real_quick_ratio -> quick_ratio) dan hanya
+    sisanya yang memanggil ratio() penuh. Pasangan terpangkas bernilai NaN;
+    skor pasangan lain identik dengan block_similarity. Dengan `mask`
+    (bool, bentuk len(pos1) x len(pos2)) hanya sel True yang dinilai.
+    """
+    shape = (len(pos1), len(pos2))
+    comps = {}
+    numeric_part = np.zeros(shape, dtype=np.float64)
+    for k in weights:
+        if k == "comments":
+            continue
+        col = NUMERIC_FEATURES.index(k)
+        comps[k] = numeric_similarity_matrix(idx1["numeric"][pos1, col], idx2["numeric"][pos2, col])
+        numeric_part += comps[k] * weights[k]
+
+    alive = np.ones(shape, dtype=bool) if mask is None else mask.copy()
+    if stats is not None:
+        stats["block_pairs"] += int(alive.sum())
+
+    w_comment = weights.get("comments")
+    comment = np.zeros(shape, dtype=np.float64)
+
+    if w_comment is not None:
+        if threshold is not None:
+            before = int(alive.sum())
+            alive &= numeric_part + max(w_comment, 0.0) >= threshold - BOUND_EPS
+            if stats is not None:
+                stats["pruned_numeric"] += before - int(alive.sum())
+
+        for a, b in zip(*np.nonzero(alive)):
+            t1 = idx1["comments"][pos1[a]]
+            t2 = idx2["comments"][pos2[b]]
+            if not t1 and not t2:
+                comment[a, b] = 1.0
                 continue
-            score = block_similarity(b1, b2, weights)
-            if score >= threshold:
-                results.append({
-                    "type": t1,
-                    "score": round(score, 3),
-                    "snippet_a": b1[:120],
-                    "snippet_b": b2[:120],
-                })
-    return results
+
+            matcher = difflib.SequenceMatcher(None, t1, t2)
+            if threshold is not None and w_comment > 0:
+                need = (threshold - BOUND_EPS - numeric_part[a, b]) / w_comment
+                if matcher.real_quick_ratio() < need:
+                    alive[a, b] = False
+                    if stats is not None:
+                        stats["pruned_real_quick"] += 1
+                    continue
+                if matcher.quick_ratio() < need:
+                    alive[a, b] = False
+                    if stats is not None:
+                        stats["pruned_quick"] += 1
+                    continue
+
+            comment[a, b] = matcher.ratio()
+            if stats is not None:
+                stats["ratio_calls"] += 1
+        comps["comments"] = comment
+
+    # skor eksak dijumlah dengan urutan `weights` seperti block_similarity
+    total = np.zeros(shape, dtype=np.float64)
+    for k in weights:
+        total += comps[k] * weights[k]
+    total[~alive] = np.nan
+    return total
+
+
+def match_block_indexes(idx1: dict, idx2: dict, threshold: float, weights: dict,
+                        bounded: bool = True, stats=None, candidates=None):
+    """
+    Kecocokan blok sejenis antara dua indeks. `candidates` (posisi blok
+    idx1, posisi blok idx2) membatasi penilaian ke pasangan tersebut
+    (mode fingerprint); tanpa itu semua pasangan sejenis dinilai.
+    """
+    if candidates is None:
+        grids = [
+            (pos1, idx2["groups"][t], None)
+            for t, pos1 in idx1["groups"].items()
+            if t in idx2["groups"]
+        ]
+    else:
+        # kandidat sudah pasti sejenis (jenis blok bagian dari kunci indeks),
+        # jadi cukup satu grid bermask untuk semua jenis
+        cand_a, cand_b = candidates
+        pos1, pos2 = np.unique(cand_a), np.unique(cand_b)
+        mask = np.zeros((len(pos1), len(pos2)), dtype=bool)
+        mask[np.searchsorted(pos1, cand_a), np.searchsorted(pos2, cand_b)] = True
+        grids = [(pos1, pos2, mask)]
+
+    hits = []
+    for pos1, pos2, mask in grids:
+        scores = bounded_block_scores(
+            idx1, pos1, idx2, pos2, weights,
+            threshold=threshold if bounded else None, stats=stats, mask=mask,
+        )
+        for a, b in zip(*np.nonzero(scores >= threshold)):
+            hits.append((int(pos1[a]), int(pos2[b]), float(scores[a, b])))
+
+    # urutan sama dengan loop blok A lalu blok B seperti semula
+    hits.sort()
+    return [
+        {
+            "type": idx1["types"][a],
+            "score": round(score, 3),
+            "snippet_a": idx1["snippets"][a],
+            "snippet_b": idx2["snippets"][b],
+        }
+        for a, b, score in hits
+    ]
+
+
+def find_similar_blocks(code1: str, code2: str, threshold: float, weights: dict,
+                        bounded: bool = True, stats=None):
+    return match_block_indexes(
+        block_index_from_code(code1), block_index_from_code(code2), threshold, weights,
+        bounded=bounded, stats=stats,
+    )
+
+
+# =========================================================
+# KANDIDAT BLOK DARI INDEKS TERBALIK FINGERPRINT
+# =========================================================
+# fingerprint yang muncul di lebih dari sekian file dianggap boilerplate
+# (seperti cutoff frekuensi dokumen pada winnowing) dan tidak dipakai
+FINGERPRINT_MAX_DF = 50
+
+
+def block_signature(block_type: str, fingerprints: np.ndarray) -> np.uint64:
+    """Kunci seluruh blok: sama untuk blok sejenis dengan semua fingerprint sama."""
+    digest = hashlib.blake2b(block_type.encode() + fingerprints.tobytes(), digest_size=8).digest()
+    return np.frombuffer(digest, dtype=np.uint64)[0]
+
+
+def block_candidates(table: dict, rows, self_blocks: bool = False,
+                     max_df: int | None = FINGERPRINT_MAX_DF, stats=None) -> dict:
+    """
+    Indeks terbalik (jenis blok, fingerprint) -> blok atas file `rows`
+    (satu job). Hanya pasangan blok sejenis yang berbagi minimal satu
+    fingerprint yang menjadi kandidat, sehingga kerja pencocokan
+    sebanding dengan jumlah kecocokan, bukan semua pasangan blok.
+    Fingerprint yang muncul di lebih dari `max_df` file dibuang
+    (stats["fingerprints_dropped"]); blok yang seluruh fingerprint-nya
+    sama (block_signature) tetap selalu menjadi kandidat, sehingga blok
+    identik tidak pernah hilang.
+    -> {(i, j): (posisi blok i, posisi blok j)} untuk i <= j; pasangan
+    (i, i) hanya bila `self_blocks`.
+    """
+    keys, files, positions, exempt = [], [], [], []
+    for i in rows:
+        idx = table["blocks"][i]
+        for p, (t, fps) in enumerate(zip(idx["types"], idx["fingerprints"])):
+            keys.append(fps ^ np.uint64(zlib.crc32(t.encode())))
+            keys.append(np.array([block_signature(t, fps)], dtype=np.uint64))
+            files.append(np.full(len(fps) + 1, i, dtype=np.int64))
+            positions.append(np.full(len(fps) + 1, p, dtype=np.int64))
+            exempt.append(np.zeros(len(fps) + 1, dtype=bool))
+            exempt[-1][-1] = True
+    if not keys:
+        return {}
+
+    keys = np.concatenate(keys)
+    files = np.concatenate(files)
+    positions = np.concatenate(positions)
+    exempt = np.concatenate(exempt)
+    order = np.argsort(keys, kind="stable")
+    keys, files, positions, exempt = keys[order], files[order], positions[order], exempt[order]
+
+    found = []
+    bounds = np.flatnonzero(np.diff(keys)) + 1
+    for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(keys)]):
+        if end - start < 2:
+            continue
+        if (max_df is not None and not exempt[start:end].all()
+                and len(np.unique(files[start:end])) > max_df):
+            if stats is not None:
+                stats["fingerprints_dropped"] += 1
+            continue
+        u, v = np.triu_indices(end - start, k=1)
+        f1, p1 = files[start + u], positions[start + u]
+        f2, p2 = files[start + v], positions[start + v]
+        # orientasi i <= j; blok dari file yang sama dipakai dua arah
+        swap = f1 > f2
+        f1, f2 = np.where(swap, f2, f1), np.where(swap, f1, f2)
+        p1, p2 = np.where(swap, p2, p1), np.where(swap, p1, p2)
+        # baris (file i, file j, blok i, blok j) agar terurut per pasangan file
+        found.append(np.stack([f1, f2, p1, p2], axis=1))
+        same = f1 == f2
+        if same.any():
+            found.append(np.stack([f1, f2, p2, p1], axis=1)[same])
+
+    if self_blocks:
+        # setiap blok selalu kandidat terhadap dirinya sendiri
+        found.append(np.stack([files, files, positions, positions], axis=1))
+    if not found:
+        return {}
+
+    found = np.unique(np.concatenate(found), axis=0)
+    if not self_blocks:
+        found = found[found[:, 0] != found[:, 1]]
+
+    result = {}
+    pair_bounds = np.flatnonzero(np.any(np.diff(found[:, :2], axis=0) != 0, axis=1)) + 1
+    for chunk in np.split(found, pair_bounds):
+        if len(chunk):
+            result[int(chunk[0, 0]), int(chunk[0, 1])] = (chunk[:, 2], chunk[:, 3])
+    return result
+
+
+def pair_block_candidates(candidates: dict, i: int, j: int):
+    """Kandidat pasangan (i, j) dalam orientasi i -> j, atau None bila tidak ada."""
+    if i <= j:
+        return candidates.get((i, j))
+    found = candidates.get((j, i))
+    return None if found is None else (found[1], found[0])
+
+
+# =========================================================
+# KANDIDAT PASANGAN FILE (LSH, MODE PERKIRAAN)
+# =========================================================
+def lsh_file_pairs(table: dict, reps: list, params: dict) -> list:
+    """
+    Pasangan file (i, j), i < j, yang dinilai pada mode LSH: kandidat
+    lsh.candidate_pairs antar perwakilan valid disebar ke semua anggota
+    klonnya, ditambah pasangan sesama anggota klon (strukturnya identik).
+    """
+    members = {}
+    for i, r in enumerate(reps):
+        if table["valid"][i]:
+            members.setdefault(r, []).append(i)
+
+    rows, cols = candidate_pairs(table["fingerprints"], table["numeric"], sorted(members), params)
+    found = set()
+    for r, s in zip(rows.tolist(), cols.tolist()):
+        for i in members[r]:
+            for j in members[s]:
+                found.add((min(i, j), max(i, j)))
+    for group in members.values():
+        found.update(itertools.combinations(group, 2))
+    return sorted(found)
 
 
 # =========================================================
-# SIMPAN OUTPUT
+# PENJADWALAN PASANGAN (SERIAL / PARALEL)
 # =========================================================
-def save_similar_blocks_txt(data, out_dir: Path):
-    path = out_dir / "blok_kode_mirip.txt"
+def score_pairs(table: dict, pairs, threshold: float, weights: dict, stats: Counter):
+    """
+    Kerja per pasangan (i, j, with_blocks): komponen komentar level file dan,
+    bila with_blocks, pencocokan blok. Mengembalikan list (i, j, komentar, blok).
+    Waktu kedua bagian dicatat di stats (time_comments, time_blocks) beserta
+    jumlah panggilan difflib level file (comment_calls).
+    """
+    valid = table["valid"]
+    comments = table["comments"]
+    file_blocks = table["blocks"]
+    candidates = table.get("block_candidates")
+
+    results = []
+    for i, j, with_blocks in pairs:
+        comment = None
+        if valid[i] and valid[j]:
+            t0 = time.perf_counter()
+            comment = comment_similarity(comments[i], comments[j])
+            stats["time_comments"] += time.perf_counter() - t0
+            stats["comment_calls"] += 1
+        blocks = []
+        pair_candidates = None
+        if with_blocks and candidates is not None:
+            pair_candidates = pair_block_candidates(candidates, i, j)
+            with_blocks = pair_candidates is not None
+        if with_blocks:
+            t0 = time.perf_counter()
+            blocks = match_block_indexes(
+                file_blocks[i], file_blocks[j], threshold, weights, stats=stats,
+                candidates=pair_candidates,
+            )
+            stats["time_blocks"] += time.perf_counter() - t0
+        results.append((i, j, comment, blocks))
+    return results
+
+
+def estimate_pair_cost(table: dict, i: int, j: int) -> int:
+    """Perkiraan biaya pasangan: 1 (level file) + hasil kali jumlah blok."""
+    return 1 + len(table["blocks"][i]["types"]) * len(table["blocks"][j]["types"])
+
+
+# batas perkiraan biaya (pasangan blok) per potongan kerja paralel: hasil satu
+# potongan (kecocokan + snippet) ditampung utuh sebelum dikirim balik dari worker
+PAIR_CHUNK_MAX_COST = 50_000
+
+# jumlah tugas pasangan perwakilan per batch (pair_task_batches)
+PAIR_TASK_BATCH = 65536
+
+
+def balance_chunks(costs: list, n_chunks: int) -> list:
+    """
+    Bagi indeks pasangan ke `n_chunks` potongan dengan total biaya
+    seimbang (greedy LPT: pasangan termahal dulu ke potongan teringan).
+    """
+    heap = [(0, c) for c in range(n_chunks)]
+    chunks = [[] for _ in range(n_chunks)]
+    for p in sorted(range(len(costs)), key=lambda p: -costs[p]):
+        load, c = heapq.heappop(heap)
+        chunks[c].append(p)
+        heapq.heappush(heap, (load + costs[p], c))
+    return [sorted(c) for c in chunks if c]
+
+
+_WORKER_STATE = {}
+
+
+def _init_pair_worker(table: dict, threshold: float, weights: dict):
+    _WORKER_STATE.update(table=table, threshold=threshold, weights=weights)
+
+
+def _score_pair_chunk(pairs):
+    stats = Counter()
+    results = score_pairs(
+        _WORKER_STATE["table"], pairs, _WORKER_STATE["threshold"],
+        _WORKER_STATE["weights"], stats,
+    )
+    return results, stats
+
+
+def default_pairs(n: int) -> list:
+    return [(i, j, i != j) for i in range(n) for j in range(i, n)]
+
+
+def iter_pair_scoring(table: dict, threshold: float, weights: dict,
+                      workers: int = 1, stats: Counter | None = None, pairs=None,
+                      batches=None):
+    """
+    Generator (pasangan, hasil) untuk score_pairs, dikeluarkan begitu
+    selesai sehingga pemanggil dapat langsung menulis hasilnya tanpa
+    menampung semua kecocokan blok. Dengan workers > 1 pasangan dibagi ke
+    process pool per potongan berbiaya seimbang (masing-masing kira-kira
+    <= PAIR_CHUNK_MAX_COST) dan urutan keluarnya mengikuti potongan yang
+    selesai lebih dulu. Paling banyak 2 x workers potongan dijadwalkan
+    sekaligus, sehingga hasil yang menunggu dibaca tetap terbatas.
+    `batches` (iterable berisi list pasangan) menggantikan `pairs` agar
+    pasangan dapat dibuat bertahap: batch berikutnya baru diambil setelah
+    batch sebelumnya selesai, dengan process pool yang sama.
+    """
+    if stats is None:
+        stats = Counter()
+    if batches is None:
+        if pairs is None:
+            pairs = default_pairs(len(table["valid"]))
+        if len(pairs) < 2:
+            workers = 1
+        batches = [pairs]
+
+    if workers <= 1:
+        for batch in batches:
+            for pair in batch:
+                yield pair, score_pairs(table, [pair], threshold, weights, stats)[0]
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_pair_worker,
+        initargs=(table, threshold, weights),
+    ) as pool:
+        for batch in batches:
+            yield from _iter_pool_batch(pool, table, batch, workers, stats)
+
+
+def _iter_pool_batch(pool, table: dict, pairs: list, workers: int, stats: Counter):
+    if not pairs:
+        return
+    costs = [estimate_pair_cost(table, i, j) for i, j, _ in pairs]
+    n_chunks = max(workers * 4, -(-sum(costs) // PAIR_CHUNK_MAX_COST))
+    chunks = iter(balance_chunks(costs, min(len(pairs), n_chunks)))
+
+    futures = {}
+    for c in itertools.islice(chunks, workers * 2):
+        futures[pool.submit(_score_pair_chunk, [pairs[p] for p in c])] = c
+    while futures:
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for fut in done:
+            chunk = futures.pop(fut)
+            chunk_results, chunk_stats = fut.result()
+            stats.update(chunk_stats)
+            for c in itertools.islice(chunks, 1):
+                futures[pool.submit(_score_pair_chunk, [pairs[p] for p in c])] = c
+            for p, result in zip(chunk, chunk_results):
+                yield pairs[p], result
+
+
+def save_similar_blocks_txt(data, path: Path):
     with open(path, "w", encoding="utf-8") as f:
         for e in data:
             f.write(f"{e['file1']} vs {e['file2']}\n")
@@ -181,10 +827,10 @@ def save_similar_blocks_txt(data, out_dir: Path):
             f.write("-" * 40 + "\n")
 
 
-def save_similar_blocks_excel(data, out_dir: Path):
-    path = out_dir / "blok_kode_mirip.xlsx"
-    wb = Workbook()
-    ws = wb.active
+def save_similar_blocks_excel(data, path: Path):
+    # write-only: baris langsung di-stream ke file, tidak ditampung per sel
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
     ws.append(["File A", "File B", "Jenis", "Score", "Kode A", "Kode B"])
 
     for e in data:
@@ -200,64 +846,775 @@ def save_similar_blocks_excel(data, out_dir: Path):
     wb.save(path)
 
 
+# =========================================================
+# HEATMAP (SKALABEL, DAPAT DIBUAT SAAT DIMINTA)
+# =========================================================
+HEATMAP_FILENAME = "heatmap_similaritas.png"
+HEATMAP_CLUSTERED_FILENAME = "heatmap_similaritas_klaster.png"
+# di atas batas ini angka per sel tidak ditulis dan matriks digambar raster
+HEATMAP_ANNOT_LIMIT = 30
+# di atas batas ini label nama file tidak ditampilkan
+HEATMAP_LABEL_LIMIT = 100
+
+
+def cluster_order(values: np.ndarray) -> np.ndarray:
+    """Urutan baris hasil hierarchical clustering (average linkage, jarak 1 - skor)."""
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    n = len(values)
+    if n < 3:
+        return np.arange(n)
+    dist = 1.0 - (values + values.T) / 2.0
+    np.fill_diagonal(dist, 0.0)
+    dist = np.clip(dist, 0.0, None)
+    return leaves_list(linkage(squareform(dist, checks=False), method="average"))
+
+
+def render_heatmap(matrix: pd.DataFrame, png_path: Path, cluster: bool = False) -> Path:
+    """
+    Heatmap yang tetap cepat untuk ratusan file: anotasi angka hanya untuk
+    matriks kecil, matriks besar digambar sebagai satu gambar raster
+    (imshow), dan baris/kolom dapat diurutkan per klaster agar kelompok
+    salinan berdekatan. Memakai Figure langsung (tanpa state global pyplot).
+    """
+    values = matrix.to_numpy(dtype=np.float32)
+    labels = list(matrix.index)
+    n = len(labels)
+
+    if cluster:
+        order = cluster_order(values)
+        values = values[np.ix_(order, order)]
+        labels = [labels[i] for i in order]
+
+    if n <= HEATMAP_ANNOT_LIMIT:
+        fig = Figure(figsize=(10, 8))
+        ax = fig.add_subplot()
+        sns.heatmap(
+            pd.DataFrame(values, index=labels, columns=labels),
+            annot=True, fmt=".2f", cmap="coolwarm", ax=ax,
+        )
+    else:
+        side = min(8 + n * 0.12, 24)
+        fig = Figure(figsize=(side * 1.2, side))
+        ax = fig.add_subplot()
+        im = ax.imshow(values, cmap="coolwarm", interpolation="nearest", aspect="auto")
+        fig.colorbar(im, ax=ax)
+        if n <= HEATMAP_LABEL_LIMIT:
+            ax.set_xticks(range(n), labels, rotation=90, fontsize=6)
+            ax.set_yticks(range(n), labels, fontsize=6)
+        else:
+            ax.set_xticks([])
+            ax.set_yticks([])
+
+    title = "Heatmap Similaritas Kode Python"
+    if cluster:
+        title += " (urut klaster)"
+    ax.set_title(title)
+    fig.tight_layout()
+    fig.savefig(png_path)
+    return png_path
+
+
+# =========================================================
+# STATE ANALISIS (UNTUK APPEND / ANALISIS INKREMENTAL)
+# =========================================================
+STATE_FILENAME = "analysis_state.pkl"
+
+
+def content_hash(code: str | None) -> str | None:
+    if code is None:
+        return None
+    return hashlib.sha256(code.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def load_sources(src_dir: Path) -> dict:
+    """{nama file: isi} untuk semua *.py di `src_dir` (None jika gagal dibaca)."""
+    return {f.name: read_file(f) for f in sorted(Path(src_dir).glob("*.py"))}
+
+
+def clone_representatives(names: list, records: list) -> list:
+    """
+    Indeks perwakilan per file: file dengan canonical_hash sama (klon yang
+    hanya beda komentar/format) diwakili file dengan nama terkecil.
+    """
+    first = {}
+    reps = []
+    for i, record in enumerate(records):
+        feats = record[0] if record is not None else None
+        if not feats:
+            reps.append(i)
+            continue
+        reps.append(first.setdefault(feats["canonical_hash"], i))
+    return reps
+
+
+def clone_groups_from_state(state: dict) -> list:
+    groups = {}
+    for i, rep in enumerate(state["reps"]):
+        groups.setdefault(rep, []).append(state["names"][i])
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def representative_pairs(n: int, reps: list):
+    """
+    Semua pasangan file (i, j), i <= j, berurutan per perwakilan reps[i]
+    (generator, tanpa list n x n); urutan ini yang dibutuhkan pair_task_batches.
+    """
+    members = {}
+    for i, rep in enumerate(reps):
+        members.setdefault(rep, []).append(i)
+    for rep in sorted(members):
+        for i in members[rep]:
+            for j in range(i, n):
+                yield i, j
+
+
+def pair_task_batches(file_pairs, reps: list, self_blocks: bool, keep=None,
+                      batch_size: int = PAIR_TASK_BATCH):
+    """
+    Kelompokkan pasangan file (i, j) menjadi batch tugas
+    {(reps[i], reps[j], with_blocks): [(i, j), ...]}: satu tugas per
+    pasangan perwakilan (arah i -> j dipertahankan) yang disebar ke semua
+    pasangan anggotanya. `file_pairs` harus berurutan per reps[i]; batch
+    hanya dipotong di pergantian perwakilan sehingga satu tugas tidak
+    pernah muncul di dua batch. `keep(i, j)` menyaring pasangan.
+    """
+    targets = {}
+    current = None
+    for i, j in file_pairs:
+        if keep is not None and not keep(i, j):
+            continue
+        if reps[i] != current:
+            if len(targets) >= batch_size:
+                yield targets
+                targets = {}
+            current = reps[i]
+        targets.setdefault((reps[i], reps[j], i != j or self_blocks), []).append((i, j))
+    if targets:
+        yield targets
+
+
+def prepare_sources(sources: dict, stats: Counter | None = None, feature_cache=None,
+                    previous: dict | None = None) -> dict:
+    """
+    Tahap bersama semua engine: parse & ekstraksi fitur per file, sekali
+    per isi file. Dengan `previous` (state job sebelumnya) file lama yang
+    tidak berubah memakai record yang tersimpan. -> {"names", "hashes", "records"}.
+    """
+    if stats is None:
+        stats = Counter()
+
+    prev_pos = {}
+    if previous is not None:
+        prev_pos = {name: p for p, name in enumerate(previous["names"])}
+
+    names = sorted(set(sources) | set(prev_pos))
+
+    t0 = time.perf_counter()
+    if feature_cache is not None:
+        hits0, misses0 = feature_cache.hits, feature_cache.misses
+
+    # baca & parse hanya file baru/berubah (fitur + blok)
+    hashes, records = [], []
+    for name in names:
+        p = prev_pos.get(name)
+        if name in sources:
+            h = content_hash(sources[name])
+            if p is not None and previous["hashes"][p] == h:
+                record = previous["records"][p]
+            else:
+                record = file_record(sources[name], feature_cache, stats)
+        else:
+            h = previous["hashes"][p]
+            record = previous["records"][p]
+        hashes.append(h)
+        records.append(record)
+
+    if feature_cache is not None:
+        stats["cache_hits"] += feature_cache.hits - hits0
+        stats["cache_misses"] += feature_cache.misses - misses0
+        stats["cache_evicted"] += feature_cache.enforce_budget()
+        logger.info(
+            "Cache fitur: %d hit, %d miss, %d dihapus",
+            stats["cache_hits"], stats["cache_misses"], stats["cache_evicted"],
+        )
+
+    stats["files"] += len(names)
+    stats["time_features"] += time.perf_counter() - t0
+    return {"names": names, "hashes": hashes, "records": records}
+
+
+def score_prepared(prepared: dict, weights: dict, threshold: float,
+                   stats: Counter | None = None, workers: int = 1,
+                   previous: dict | None = None, dedup_clones: bool = False,
+                   previous_blocks=(), scoring: dict | None = None,
+                   fingerprint_blocks: bool = False, lsh: dict | None = None,
+                   out_dir: Path | None = None, pair_floor: float | None = None) -> dict:
+    """
+    Skor semua pasangan file dari hasil prepare_sources dengan bobot,
+    threshold, dan aturan blok (`scoring`, default DEFAULT_SCORING) satu
+    engine. Dengan `previous` (state job sebelumnya) dan `previous_blocks`
+    (entri blok job itu, mis. iter_blocks), komponen komentar dan hasil
+    blok file lama yang isinya tidak berubah dipakai ulang; hanya pasangan
+    yang melibatkan file baru/berubah (baru x lama dan baru x baru) yang
+    dihitung. Hasil akhirnya identik dengan analisis penuh.
+
+    Dengan `dedup_clones`, file dengan hash AST kanonik sama memakai satu
+    record (milik perwakilannya) sehingga tiap pasangan perwakilan hanya
+    dihitung sekali lalu disebar ke semua anggota klon.
+
+    Dengan `fingerprint_blocks`, hanya pasangan blok yang berbagi
+    fingerprint subtree AST (block_candidates) yang dinilai; pasangan
+    yang mirip menurut fitur tetapi tanpa potongan struktur yang sama
+    tidak dilaporkan.
+
+    Dengan `lsh` (parameter, lihat lsh.DEFAULT_LSH) hanya pasangan file
+    kandidat LSH (lsh_file_pairs) yang dinilai dan hasilnya disimpan
+    jarang di state["pairs"] (rows, cols, komentar untuk rows < cols)
+    sebagai ganti state["comment_matrix"]; pasangan lain bernilai 0.
+
+    Dengan `pair_floor` hasil juga disimpan jarang, tetapi hanya pasangan
+    yang skor filenya >= pair_floor (dinilai per PAIR_FLOOR_BATCH hasil),
+    sehingga memori dan ukuran hasil mengikuti jumlah pasangan mirip,
+    bukan n x n. Kecocokan blok pasangan di bawah pair_floor tidak disimpan.
+
+    Kecocokan blok di-stream ke BlockMatchWriter (state["blocks"]) begitu
+    tiap pasangan selesai, tanpa list berisi semua kecocokan. Dengan
+    `out_dir`, state["comment_matrix"] adalah memmap di folder tersebut
+    yang diisi di tempat (disimpan save_state), bukan array n x n di
+    memori.
+    """
+    if stats is None:
+        stats = Counter()
+    if scoring is None:
+        scoring = DEFAULT_SCORING
+
+    prev_pos = {}
+    if previous is not None:
+        prev_pos = {name: p for p, name in enumerate(previous["names"])}
+        dedup_clones = previous.get("dedup_clones", False)
+        scoring = previous.get("scoring", DEFAULT_SCORING)
+        fingerprint_blocks = previous.get("fingerprint_blocks", False)
+        lsh = previous.get("lsh")
+        pair_floor = previous.get("pair_floor")
+    if lsh is not None:
+        lsh = lsh_params(lsh)
+
+    names, hashes, records = prepared["names"], prepared["hashes"], prepared["records"]
+    n = len(names)
+
+    # waktu per fase (detik) ikut dicatat di stats: time_features, time_pairs
+    t0 = time.perf_counter()
+    reps = clone_representatives(names, records) if dedup_clones else list(range(n))
+
+    # file "segar" = record efektifnya (milik perwakilan) berbeda dari job lalu
+    fresh = [True] * n
+    if previous is not None:
+        prev_effective = {
+            previous["names"][p]: (previous["names"][r], previous["hashes"][r])
+            for p, r in enumerate(previous["reps"])
+        }
+        for i, name in enumerate(names):
+            fresh[i] = (names[reps[i]], hashes[reps[i]]) != prev_effective.get(name)
+
+    table = table_from_records([records[r] for r in reps], scoring["nested_blocks"])
+    stats["time_features"] += time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    if fingerprint_blocks:
+        t1 = time.perf_counter()
+        table["block_candidates"] = block_candidates(
+            table, sorted(set(reps)), scoring["self_blocks"], stats=stats
+        )
+        stats["block_candidates"] += sum(len(a) for a, _ in table["block_candidates"].values())
+        stats["time_candidates"] += time.perf_counter() - t1
+
+    comment_matrix = None
+    pair_comments = {}
+    # hasil pasangan (i, j, komentar) yang belum dinilai terhadap pair_floor
+    # beserta kecocokan bloknya
+    pending = []
+    pending_blocks = {}
+    blocks = BlockMatchWriter(out_dir)
+    # memmap komentar & segmen blok sementara dihapus bila penilaian gagal
+    try:
+        if lsh is None:
+            if pair_floor is None and out_dir is not None:
+                comment_matrix = create_memmap(Path(out_dir) / COMMENTS_FILENAME, n, np.float64)
+            elif pair_floor is None:
+                comment_matrix = np.zeros((n, n), dtype=np.float64)
+            file_pairs = representative_pairs(n, reps)
+        else:
+            t1 = time.perf_counter()
+            file_pairs = lsh_file_pairs(table, reps, lsh)
+            stats["lsh_candidates"] += len(file_pairs)
+            stats["time_lsh"] += time.perf_counter() - t1
+            if scoring["self_blocks"]:
+                file_pairs += [(i, i) for i in range(n)]
+            file_pairs.sort(key=lambda pair: reps[pair[0]])
+
+        if previous is not None:
+            kept = [i for i in range(n) if not fresh[i]]
+            old = np.array([prev_pos[names[i]] for i in kept], dtype=np.intp)
+            if comment_matrix is not None:
+                # disalin per potongan baris agar blok lama tidak utuh di memori
+                kept_ids = np.array(kept, dtype=np.intp)
+                for start, stop in iter_row_chunks(len(kept)):
+                    comment_matrix[np.ix_(kept_ids[start:stop], kept_ids)] = (
+                        previous["comment_matrix"][np.ix_(old[start:stop], old)]
+                    )
+            else:
+                new_pos = dict(zip(old.tolist(), kept))
+                prev_rows, prev_cols, prev_comments = previous["pairs"]
+                for a, b, comment in zip(prev_rows.tolist(), prev_cols.tolist(), prev_comments.tolist()):
+                    if a in new_pos and b in new_pos:
+                        pair_comments[new_pos[a], new_pos[b]] = comment
+            kept_pos = {names[i]: i for i in kept}
+            for e in previous_blocks:
+                a, b = kept_pos.get(e["file1"]), kept_pos.get(e["file2"])
+                if a is not None and b is not None:
+                    blocks.add(a, b, e["similar_blocks"])
+
+        # tugas pasangan perwakilan dibuat per batch (lihat pair_task_batches),
+        # tidak untuk seluruh n x n pasangan sekaligus
+        targets = {}
+
+        def task_batches():
+            for batch in pair_task_batches(
+                file_pairs, reps, scoring["self_blocks"],
+                keep=None if previous is None else (lambda i, j: fresh[i] or fresh[j]),
+            ):
+                targets.update(batch)
+                if dedup_clones:
+                    stats["clone_pairs_skipped"] += sum(len(t) for t in batch.values()) - len(batch)
+                yield sorted(batch)
+
+        def flush_pending():
+            # kecocokan blok pasangan di bawah pair_floor ikut dibuang
+            above = pairs_above_floor(table, weights, pending, pair_floor)
+            pair_comments.update(above)
+            for key in above:
+                if key in pending_blocks:
+                    blocks.add(*key, pending_blocks[key])
+            pending.clear()
+            pending_blocks.clear()
+
+        for task, (_, _, comment, found) in iter_pair_scoring(
+            table, threshold, weights, workers, stats, batches=task_batches()
+        ):
+            for i, j in targets.pop(task):
+                if comment is not None and comment_matrix is not None:
+                    comment_matrix[i, j] = comment
+                    comment_matrix[j, i] = comment
+                elif comment is not None and i != j and pair_floor is None:
+                    pair_comments[i, j] = comment
+                elif comment is not None and i != j:
+                    pending.append((i, j, comment))
+                    if found:
+                        pending_blocks[i, j] = found
+                    continue
+                if found:
+                    blocks.add(i, j, found)
+            if len(pending) >= PAIR_FLOOR_BATCH:
+                flush_pending()
+        if pending:
+            flush_pending()
+    except BaseException:
+        discard_state({"comment_matrix": comment_matrix, "blocks": blocks})
+        raise
+    stats["time_pairs"] += time.perf_counter() - t0
+
+    pairs = None
+    if comment_matrix is None:
+        keys = sorted(pair_comments)
+        pairs = (
+            np.array([i for i, _ in keys], dtype=np.int64),
+            np.array([j for _, j in keys], dtype=np.int64),
+            np.array([pair_comments[k] for k in keys], dtype=np.float64),
+        )
+
+    logger.info(
+        "Pencocokan blok: %d pasangan, terpangkas numerik=%d real_quick=%d quick=%d, ratio()=%d",
+        stats["block_pairs"], stats["pruned_numeric"], stats["pruned_real_quick"],
+        stats["pruned_quick"], stats["ratio_calls"],
+    )
+
+    return {
+        "version": FEATURE_EXTRACTOR_VERSION,
+        "names": names,
+        "hashes": hashes,
+        "records": records,
+        "reps": reps,
+        "dedup_clones": dedup_clones,
+        "scoring": scoring,
+        "fingerprint_blocks": fingerprint_blocks,
+        "lsh": lsh,
+        "pair_floor": pair_floor,
+        "comment_matrix": comment_matrix,
+        "pairs": pairs,
+        "blocks": blocks,
+        "weights": weights,
+        "threshold": threshold,
+    }
+
+
+def pairs_above_floor(table: dict, weights: dict, pending: list, pair_floor: float) -> dict:
+    """{(i, j): komentar} dari `pending` [(i, j, komentar)] yang skor filenya >= pair_floor."""
+    rows, cols, comments = (np.array(column) for column in zip(*pending))
+    scores = file_similarity_pairs(table, weights, rows, cols, comments)
+    return {
+        (int(rows[k]), int(cols[k])): float(comments[k])
+        for k in np.nonzero(scores >= pair_floor)[0]
+    }
+
+
+def analyze_sources(sources: dict, weights: dict, threshold: float,
+                    stats: Counter | None = None, workers: int = 1,
+                    feature_cache=None, previous: dict | None = None,
+                    dedup_clones: bool = False, previous_blocks=(),
+                    scoring: dict | None = None, fingerprint_blocks: bool = False,
+                    lsh: dict | None = None, out_dir: Path | None = None,
+                    pair_floor: float | None = None) -> dict:
+    """State analisis satu engine untuk `sources` ({nama: isi}); lihat score_prepared."""
+    prepared = prepare_sources(sources, stats, feature_cache, previous)
+    return score_prepared(
+        prepared, weights, threshold, stats=stats, workers=workers, previous=previous,
+        dedup_clones=dedup_clones, previous_blocks=previous_blocks, scoring=scoring,
+        fingerprint_blocks=fingerprint_blocks, lsh=lsh, out_dir=out_dir, pair_floor=pair_floor,
+    )
+
+
+def save_state(state: dict, out_dir: Path):
+    # hasil blok sudah tersimpan di file kolomnar (BlockMatchWriter) dan komponen
+    # komentar di komponen_komentar.npy (dibaca lewat mmap), tidak diduplikasi
+    out_dir = Path(out_dir)
+    comments = state.get("comment_matrix")
+    comments_path = out_dir / COMMENTS_FILENAME
+    if comments is None:
+        comments_path.unlink(missing_ok=True)
+    elif isinstance(comments, np.memmap):
+        commit_memmap(comments, comments_path)
+    else:
+        tmp = temp_path_for(comments_path)
+        np.save(tmp, comments)
+        os.replace(tmp, comments_path)
+
+    slim = {k: v for k, v in state.items() if k not in ("blocks", "comment_matrix")}
+    tmp = out_dir / (STATE_FILENAME + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(slim, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, out_dir / STATE_FILENAME)
+
+
+def discard_state(state: dict):
+    """Hapus file sementara state yang belum disimpan (bila analisis gagal)."""
+    if isinstance(state.get("comment_matrix"), np.memmap):
+        discard_memmap(state["comment_matrix"])
+    if state.get("blocks") is not None:
+        state["blocks"].discard()
+
+
+def load_state(out_dir: Path) -> dict:
+    path = Path(out_dir) / STATE_FILENAME
+    if not path.exists():
+        raise RuntimeError("State analisis job sebelumnya tidak ditemukan.")
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != FEATURE_EXTRACTOR_VERSION:
+        raise RuntimeError("State analisis dibuat oleh versi ekstraktor lain; jalankan ulang analisis penuh.")
+    if "comment_matrix" not in state:
+        state["comment_matrix"] = None
+        if state.get("pairs") is None:
+            state["comment_matrix"] = np.load(
+                Path(out_dir) / COMMENTS_FILENAME, mmap_mode="r", allow_pickle=False
+            )
+    return state
+
+
+def state_size(out_dir: Path) -> int:
+    """Ukuran file state job (pickle + komponen komentar) dalam byte."""
+    return sum(
+        path.stat().st_size
+        for path in (Path(out_dir) / STATE_FILENAME, Path(out_dir) / COMMENTS_FILENAME)
+        if path.exists()
+    )
+
+
+def similarity_rows_from_state(state: dict):
+    """fill_rows(start, stop) untuk write_matrix: potongan baris matriks similaritas."""
+    table = table_from_records([state["records"][r] for r in state["reps"]])
+
+    def fill_rows(start: int, stop: int) -> np.ndarray:
+        return file_similarity_matrix(
+            table, state["weights"], state["comment_matrix"], slice(start, stop)
+        )
+
+    return fill_rows
+
+
+def similarity_pairs_from_state(state: dict):
+    """Hasil jarang (mode LSH): (rows, cols, skor, diagonal) dari state["pairs"]."""
+    table = table_from_records([state["records"][r] for r in state["reps"]])
+    rows, cols, comments = state["pairs"]
+    scores = file_similarity_pairs(table, state["weights"], rows, cols, comments)
+    ids = np.arange(len(state["names"]))
+    diagonal = file_similarity_pairs(table, state["weights"], ids, ids, np.ones(len(ids)))
+    return rows, cols, scores, diagonal
+
+
+def pairs_frame(names: list, rows, cols, scores) -> pd.DataFrame:
+    return pd.DataFrame({
+        "file1": [names[i] for i in rows],
+        "file2": [names[j] for j in cols],
+        "similarity": scores,
+    })
+
+
+def write_outputs(state: dict, out_dir: Path, exports=(), stats: Counter | None = None):
+    """
+    Simpan hasil biner ringkas (matriks float32 yang ditulis per potongan
+    baris ke memmap + blok kolomnar), kelompok klon, dan kelompok kiriman
+    mirip (komponen terhubung pasangan skor >= threshold). CSV/TXT/XLSX/PNG
+    tidak ditulis di sini, melainkan dibuat saat pertama diunduh
+    (ensure_export), kecuali yang disebut di `exports`.
+    Ukuran file yang ditulis ditambahkan ke stats["bytes_written"].
+    Pada mode LSH / pair_floor hanya pasangan tersimpan yang ditulis (save_pairs) dan
+    yang dikembalikan adalah DataFrame pasangan (file1, file2, similarity),
+    bukan matriks.
+    """
+    if stats is None:
+        stats = Counter()
+
+    for filename in EXPORTS:
+        (out_dir / filename).unlink(missing_ok=True)
+
+    if state.get("pairs") is not None:
+        rows, cols, scores, diagonal = similarity_pairs_from_state(state)
+        save_pairs(out_dir, rows, cols, scores, diagonal, state["names"])
+        matrix = pairs_frame(state["names"], rows, cols, scores)
+    else:
+        write_matrix(out_dir, state["names"], similarity_rows_from_state(state))
+        matrix = result_matrix(out_dir)
+        rows, cols, scores = edges_above(matrix.to_numpy(), state["threshold"])
+    state["blocks"].save(out_dir)
+
+    groups_path = out_dir / SIMILAR_GROUPS_FILENAME
+    groups = similar_groups(len(state["names"]), rows, cols, scores, state["threshold"])
+    save_similar_groups(groups, state["names"], groups_path)
+
+    # Kelompok klon struktural (kosong jika dedup tidak aktif)
+    clones_path = out_dir / "klon_struktural.json"
+    with open(clones_path, "w", encoding="utf-8") as f:
+        json.dump(clone_groups_from_state(state), f, ensure_ascii=False)
+
+    stats["bytes_written"] += result_file(out_dir).stat().st_size + sum(
+        (out_dir / name).stat().st_size
+        for name in (
+            LABELS_FILENAME, BLOCKS_FILENAME, BLOCK_ROWS_FILENAME, clones_path.name, groups_path.name,
+        )
+    )
+    for filename in exports:
+        ensure_export(out_dir, filename, stats)
+
+    return matrix, {
+        "csv": out_dir / MATRIX_CSV_FILENAME,
+        "txt": out_dir / BLOCKS_TXT_FILENAME,
+        "xlsx": out_dir / BLOCKS_XLSX_FILENAME,
+        "png": out_dir / HEATMAP_FILENAME,
+        "clones": clones_path,
+        "groups": groups_path,
+    }
+
+
+# =========================================================
+# EKSPOR FORMAT UNDUHAN (DIBUAT SAAT DIMINTA, LALU DI-CACHE)
+# =========================================================
+MATRIX_CSV_FILENAME = "hasil_similaritas.csv"
+BLOCKS_TXT_FILENAME = "blok_kode_mirip.txt"
+BLOCKS_XLSX_FILENAME = "blok_kode_mirip.xlsx"
+
+
+def result_matrix(out_dir: Path) -> pd.DataFrame:
+    """Matriks hasil sebagai DataFrame di atas memmap (tanpa salinan)."""
+    matrix, names = load_matrix(out_dir)
+    return pd.DataFrame(matrix, index=names, columns=names, copy=False)
+
+
+def heatmap_matrix(out_dir: Path) -> pd.DataFrame:
+    """
+    Matriks untuk heatmap. Hasil jarang hanya dibentangkan atas file yang
+    punya pasangan tersimpan (file lain baris nol), bukan n x n.
+    """
+    if not is_sparse_result(out_dir):
+        return result_matrix(out_dir)
+    rows, cols, scores, diagonal, names = load_pairs(out_dir)
+    ids = np.unique(np.concatenate([rows, cols]))
+    if len(ids) == 0:
+        ids = np.arange(min(len(names), HEATMAP_LABEL_LIMIT))
+    pos = np.searchsorted(ids, rows), np.searchsorted(ids, cols)
+    keep = np.nonzero(np.isin(rows, ids) & np.isin(cols, ids))[0]
+    matrix = np.diag(diagonal[ids])
+    matrix[pos[0][keep], pos[1][keep]] = scores[keep]
+    matrix[pos[1][keep], pos[0][keep]] = scores[keep]
+    labels = [names[i] for i in ids]
+    return pd.DataFrame(matrix, index=labels, columns=labels, copy=False)
+
+
+def result_blocks(out_dir: Path):
+    return iter_blocks(out_dir, load_labels(out_dir))
+
+
+def save_matrix_csv(out_dir: Path, path: Path):
+    """Matriks penuh; untuk hasil jarang (mode LSH / pair_floor) daftar pasangan tersimpan."""
+    if is_sparse_result(out_dir):
+        rows, cols, scores, _, names = load_pairs(out_dir)
+        pairs_frame(names, rows, cols, scores).to_csv(path, index=False)
+    else:
+        # ditulis per potongan baris dari memmap
+        matrix, names = load_matrix(out_dir)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            for start, stop in iter_row_chunks(len(names)):
+                pd.DataFrame(
+                    matrix[start:stop], index=names[start:stop], columns=names, copy=False,
+                ).to_csv(f, header=start == 0)
+
+
+EXPORTS = {
+    MATRIX_CSV_FILENAME: save_matrix_csv,
+    BLOCKS_TXT_FILENAME: lambda out_dir, path: save_similar_blocks_txt(result_blocks(out_dir), path),
+    BLOCKS_XLSX_FILENAME: lambda out_dir, path: save_similar_blocks_excel(result_blocks(out_dir), path),
+    HEATMAP_FILENAME: lambda out_dir, path: render_heatmap(heatmap_matrix(out_dir), path),
+    HEATMAP_CLUSTERED_FILENAME: lambda out_dir, path: render_heatmap(
+        heatmap_matrix(out_dir), path, cluster=True
+    ),
+}
+
+
+def ensure_export(out_dir: Path, filename: str, stats: Counter | None = None) -> Path:
+    """
+    Buat file unduhan `filename` dari hasil biner bila belum ada di disk.
+    Bila dibuat, waktu & ukurannya dicatat di `stats` (time_export,
+    exports, bytes_written).
+    """
+    out_dir = Path(out_dir)
+    path = out_dir / filename
+    if path.exists():
+        return path
+
+    # tulis ke file sementara lalu rename, aman untuk permintaan bersamaan
+    t0 = time.perf_counter()
+    tmp = temp_path_for(path)
+    try:
+        EXPORTS[filename](out_dir, tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    if stats is not None:
+        stats["time_export"] += time.perf_counter() - t0
+        stats["exports"] += 1
+        stats["bytes_written"] += path.stat().st_size
+    return path
+
+
 # =========================================================
 # MAIN ENTRY (DIPANGGIL DARI views.py)
 # =========================================================
-def run_analysis(src_dir: Path, out_dir: Path, ast_weights=None, threshold: float = 0.75):
+def run_analysis(src_dir: Path | None, out_dir: Path, ast_weights=None, threshold: float = 0.75,
+                 stats: Counter | None = None, workers: int = 1, feature_cache=None,
+                 sources: dict | None = None, dedup_clones: bool = False,
+                 exports=(), scoring: dict | None = None, fingerprint_blocks: bool = False,
+                 lsh: dict | None = None, pair_floor: float | None = None):
+    """
+    Analisis semua *.py di `src_dir`, atau langsung dari `sources`
+    ({nama: isi}, mis. hasil read_py_sources) tanpa folder kerja.
+    `scoring` = aturan pencocokan blok engine (default DEFAULT_SCORING).
+    `fingerprint_blocks` membatasi pencocokan blok ke kandidat indeks
+    fingerprint (lihat score_prepared).
+    `lsh` (dict parameter, {} = DEFAULT_LSH) mengaktifkan mode perkiraan:
+    hanya pasangan kandidat LSH yang dinilai dan matriks disimpan jarang.
+    `pair_floor` (0..1) menyimpan hanya pasangan dengan skor >= pair_floor
+    sebagai daftar pasangan jarang, tanpa matriks n x n.
+    `dedup_clones` menggabungkan klon struktural (hash AST kanonik sama)
+    sehingga dihitung sekali; kelompoknya ditulis ke klon_struktural.json.
+    Hanya hasil biner ringkas yang ditulis; CSV/TXT/XLSX/PNG dibuat saat
+    diminta (ensure_export), kecuali nama file yang disebut di `exports`.
+    `stats` (opsional) diisi penghitung pencocokan blok: jumlah pasangan
+    blok, pasangan terpangkas per tahap, dan panggilan ratio() penuh,
+    jumlah file, parse, panggilan difflib level file, dan byte yang
+    ditulis, serta waktu per fase dalam detik (time_read, time_features,
+    time_pairs, time_write; time_candidates, time_comments & time_blocks
+    adalah rincian time_pairs (dua terakhir dijumlah dari semua worker),
+    time_export bagian dari time_write).
+    `workers` > 1 membagi pasangan file ke process pool; hasil identik
+    dengan jalur serial.
+    `feature_cache` (FeatureCache) dipakai bersama antar job; jumlah
+    hit/miss job ini ditambahkan ke `stats`.
+    """
     out_dir.mkdir(parents=True, exist_ok=True)
 
     weights = normalize_weights(ast_weights or DEFAULT_AST_WEIGHTS)
+    if stats is None:
+        stats = Counter()
 
-    files = sorted(Path(src_dir).glob("*.py"))
-    if len(files) < 2:
+    t0 = time.perf_counter()
+    if sources is None:
+        sources = load_sources(src_dir)
+    stats["time_read"] += time.perf_counter() - t0
+    if len(sources) < 2:
         raise RuntimeError("Minimal dua file .py diperlukan.")
 
-    names = [f.name for f in files]
-    matrix = pd.DataFrame(index=names, columns=names, data=0.0)
+    state = analyze_sources(
+        sources, weights, threshold, stats=stats, workers=workers,
+        feature_cache=feature_cache, dedup_clones=dedup_clones, scoring=scoring,
+        fingerprint_blocks=fingerprint_blocks, lsh=lsh, out_dir=out_dir, pair_floor=pair_floor,
+    )
+    t0 = time.perf_counter()
+    try:
+        result = write_outputs(state, out_dir, exports=exports, stats=stats)
+        save_state(state, out_dir)
+    except BaseException:
+        discard_state(state)
+        raise
+    stats["bytes_written"] += state_size(out_dir)
+    stats["time_write"] += time.perf_counter() - t0
+    return result
 
-    similar_blocks_all = []
 
-    for i in range(len(files)):
-        for j in range(i, len(files)):
-            f1, f2 = files[i], files[j]
-            c1, c2 = read_file(f1), read_file(f2)
-            if not c1 or not c2:
-                continue
+def append_analysis(src_dir: Path | None, out_dir: Path, stats: Counter | None = None,
+                    workers: int = 1, feature_cache=None, sources: dict | None = None,
+                    exports=()):
+    """
+    Tambahkan file *.py di `src_dir` (kiriman terlambat) ke job yang sudah
+    dianalisis di `out_dir`. Bobot & threshold mengikuti job semula; file
+    dengan nama sama menggantikan versi lama. Hanya pasangan baru x lama
+    dan baru x baru yang dihitung, lalu hasil ditulis ulang (ekspor lama dihapus).
+    `sources` ({nama: isi}) dapat menggantikan `src_dir`.
+    """
+    if stats is None:
+        stats = Counter()
 
-            sim = block_similarity(c1, c2, weights)
-            matrix.loc[f1.name, f2.name] = sim
-            matrix.loc[f2.name, f1.name] = sim
-
-            if i != j:
-                blocks = find_similar_blocks(c1, c2, threshold, weights)
-                if blocks:
-                    similar_blocks_all.append({
-                        "file1": f1.name,
-                        "file2": f2.name,
-                        "similar_blocks": blocks
-                    })
-
-    # CSV
-    csv_path = out_dir / "hasil_similaritas.csv"
-    matrix.to_csv(csv_path)
-
-    # TXT & XLSX
-    save_similar_blocks_txt(similar_blocks_all, out_dir)
-    save_similar_blocks_excel(similar_blocks_all, out_dir)
-
-    # Heatmap
-    plt.figure(figsize=(10, 8))
-    sns.heatmap(matrix.astype(float), annot=True, fmt=".2f", cmap="coolwarm")
-    plt.title("Heatmap Similaritas Kode Python")
-    plt.tight_layout()
-
-    png_path = out_dir / "heatmap_similaritas.png"
-    plt.savefig(png_path)
-    plt.close()
+    t0 = time.perf_counter()
+    previous = load_state(out_dir)
+    if sources is None:
+        sources = load_sources(src_dir)
+    stats["time_read"] += time.perf_counter() - t0
+    if not sources:
+        raise RuntimeError("Tidak ada file .py baru untuk ditambahkan.")
 
-    return matrix, {
-        "csv": csv_path,
-        "txt": out_dir / "blok_kode_mirip.txt",
-        "xlsx": out_dir / "blok_kode_mirip.xlsx",
-        "png": png_path,
-    }
+    state = analyze_sources(
+        sources, previous["weights"], previous["threshold"], stats=stats,
+        workers=workers, feature_cache=feature_cache, previous=previous,
+        previous_blocks=iter_blocks(out_dir, previous["names"]), out_dir=out_dir,
+    )
+    t0 = time.perf_counter()
+    try:
+        result = write_outputs(state, out_dir, exports=exports, stats=stats)
+        save_state(state, out_dir)
+    except BaseException:
+        discard_state(state)
+        raise
+    stats["bytes_written"] += state_size(out_dir)
+    stats["time_write"] += time.perf_counter() - t0
+    return result
@@ -1,3 +1,618 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import tempfile
+import zipfile
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import openpyxl
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from benchmarks.corpus import generate_corpus
+
+from .forms import UploadZipForm
+from .models import AnalysisJob
+from .services import job_runner, lsh
+from .services.feature_cache import FeatureCache
+from .services import pair_graph
+from .services.corpus_index import CorpusIndex
+from .services import result_store as rs
+from .services import similarity_engine as se
+from .utils.zip_utils import read_py_sources
+
+
+def _blocks(out_dir: Path) -> list:
+    return list(se.result_blocks(out_dir))
+
+
+def _block_map(out_dir: Path) -> dict:
+    """Kecocokan blok per pasangan nama file (tanpa bergantung urutan file)."""
+    return {(e["file1"], e["file2"]): e["similar_blocks"] for e in _blocks(out_dir)}
+
+
+class AnalysisTestCase(SimpleTestCase):
+    """Setiap tes mendapat folder hasil sementara sendiri."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+    def assertSameResult(self, a: Path, b: Path):
+        np.testing.assert_array_equal(se.result_matrix(a).to_numpy(), se.result_matrix(b).to_numpy())
+        self.assertEqual(list(se.result_matrix(a).index), list(se.result_matrix(b).index))
+        self.assertEqual(_blocks(a), _blocks(b))
+
+
+# =========================================================
+# SKOR BLOK TERBATAS (user-004)
+# =========================================================
+class BoundedBlockScoreTests(SimpleTestCase):
+    def test_bounded_matches_unbounded(self):
+        weights = se.normalize_weights(se.DEFAULT_AST_WEIGHTS)
+        corpus = generate_corpus(8, size=4, seed=11)
+        names = sorted(corpus)
+        stats = Counter()
+        for a, b in zip(names, names[1:]):
+            for threshold in (0.5, 0.75, 0.9):
+                bounded = se.find_similar_blocks(
+                    corpus[a], corpus[b], threshold, weights, bounded=True, stats=stats,
+                )
+                full = se.find_similar_blocks(corpus[a], corpus[b], threshold, weights, bounded=False)
+                self.assertEqual(bounded, full)
+        self.assertGreater(stats["pruned_numeric"] + stats["pruned_real_quick"] + stats["pruned_quick"], 0)
+
+
+# =========================================================
+# PROCESS POOL VS SERIAL (user-005)
+# =========================================================
+class ParallelScoringTests(AnalysisTestCase):
+    def test_workers_match_serial(self):
+        corpus = generate_corpus(16, size=4, seed=5)
+        se.run_analysis(None, self.tmp / "serial", sources=corpus, workers=1)
+        se.run_analysis(None, self.tmp / "pool", sources=corpus, workers=2)
+        self.assertSameResult(self.tmp / "serial", self.tmp / "pool")
+
+
+# =========================================================
+# CACHE FITUR LINTAS JOB (user-007)
+# =========================================================
+class FeatureCacheTests(AnalysisTestCase):
+    def test_budget_scan_only_when_over_estimate(self):
+        corpus = generate_corpus(6, size=3, seed=7)
+        cache = FeatureCache(self.tmp, max_bytes=10 ** 9, version="t")
+        stats = Counter()
+        se.prepare_sources(corpus, stats, cache)
+        self.assertEqual((stats["cache_misses"], stats["cache_evicted"]), (6, 0))
+        usage = int((self.tmp / "ukuran.txt").read_text())
+        self.assertEqual(usage, sum(p.stat().st_size for p in self.tmp.glob("*/*.pkl")))
+
+        # di bawah batas: cache tidak ditelusuri ulang
+        with mock.patch.object(Path, "glob", side_effect=AssertionError("cache ditelusuri")):
+            se.prepare_sources(corpus, stats, cache)
+        self.assertEqual(stats["cache_hits"], 6)
+
+    def test_evictions_reach_job_stats(self):
+        corpus = generate_corpus(6, size=3, seed=7)
+        se.prepare_sources(corpus, Counter(), FeatureCache(self.tmp, max_bytes=10 ** 9, version="t"))
+        stats = Counter()
+        small = FeatureCache(self.tmp, max_bytes=1, version="t")
+        se.prepare_sources({"baru.py": "x = 1\n"}, stats, small)
+        self.assertEqual(stats["cache_evicted"], 7)
+        self.assertEqual(list(self.tmp.glob("*/*.pkl")), [])
+        self.assertEqual((self.tmp / "ukuran.txt").read_text(), "0")
+
+
+# =========================================================
+# KIRIMAN TERLAMBAT (user-008)
+# =========================================================
+class AppendAnalysisTests(AnalysisTestCase):
+    def test_append_matches_full_run(self):
+        corpus = generate_corpus(16, size=4, seed=9)
+        names = sorted(corpus)
+        late = {name: corpus[name] for name in names[12:]}
+        # satu file lama diganti versi barunya
+        late[names[0]] = corpus[names[1]]
+        merged = {**corpus, **late}
+
+        se.run_analysis(None, self.tmp / "inc", sources={k: corpus[k] for k in names[:12]})
+        se.append_analysis(None, self.tmp / "inc", sources=late)
+        se.run_analysis(None, self.tmp / "full", sources=merged)
+
+        inc, full = se.result_matrix(self.tmp / "inc"), se.result_matrix(self.tmp / "full")
+        self.assertEqual(sorted(inc.index), sorted(full.index))
+        np.testing.assert_array_equal(inc.loc[full.index, full.index].to_numpy(), full.to_numpy())
+        self.assertEqual(_block_map(self.tmp / "inc"), _block_map(self.tmp / "full"))
+
+
+# =========================================================
+# ANTREAN JOB & HALAMAN STATUS/HASIL (user-006)
+# =========================================================
+class JobRunnerViewTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=tmp.name))
+        # job dijalankan langsung oleh tes, bukan oleh thread pool proses web
+        self.enqueued = []
+        self.enterContext(mock.patch("analyzer.views.enqueue_job", self.enqueued.append))
+        self.corpus = generate_corpus(6, size=3, seed=6)
+
+    def upload(self, files: dict) -> AnalysisJob:
+        weights = {f"{k}_weight": v for k, v in se.DEFAULT_AST_WEIGHTS.items()}
+        zip_file = SimpleUploadedFile("tugas.zip", _zip(files).getvalue())
+        response = self.client.post(reverse("index"), {"zip_file": zip_file, "threshold": 0.7, **weights})
+        job = AnalysisJob.objects.get()
+        self.assertRedirects(response, reverse("job_status", args=[job.job_id]), fetch_redirect_response=False)
+        self.assertEqual(self.enqueued, [job.job_id])
+        return job
+
+    def status(self, job: AnalysisJob) -> dict:
+        return self.client.get(reverse("job_status", args=[job.job_id]), {"format": "json"}).json()
+
+    def test_upload_process_and_result(self):
+        job = self.upload(self.corpus)
+        self.assertEqual(self.status(job)["status"], "queued")
+        self.assertTrue(job_runner.process_job(job.job_id))
+        # job yang sudah diambil tidak diproses dua kali
+        self.assertFalse(job_runner.process_job(job.job_id))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, AnalysisJob.STATUS_DONE)
+        self.assertIsNotNone(job.heartbeat_at)
+        self.assertEqual(self.status(job)["result_url"], reverse("job_result", args=[job.job_id]))
+        response = self.client.get(reverse("job_result", args=[job.job_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, sorted(self.corpus)[0])
+
+    def test_append_adds_late_files(self):
+        names = sorted(self.corpus)
+        job = self.upload({name: self.corpus[name] for name in names[:4]})
+        job_runner.process_job(job.job_id)
+        late = SimpleUploadedFile("telat.zip", _zip({name: self.corpus[name] for name in names[4:]}).getvalue())
+        self.client.post(reverse("job_append", args=[job.job_id]), {"zip_file": late})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.kind), (AnalysisJob.STATUS_QUEUED, AnalysisJob.KIND_APPEND))
+
+        self.assertTrue(job_runner.process_job(job.job_id))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (AnalysisJob.STATUS_DONE, ""))
+        out_dir = job_runner.job_paths(job.job_id)["out"]
+        self.assertEqual(sorted(rs.load_labels(out_dir)), names)
+
+    def test_failed_job_shows_error(self):
+        job = self.upload({"catatan.txt": "bukan kode"})
+        with self.assertLogs("analyzer.services.job_runner", "ERROR"):
+            job_runner.process_job(job.job_id)
+        state = self.status(job)
+        self.assertEqual(state["status"], "failed")
+        self.assertTrue(state["error"])
+        self.assertIsNone(state["result_url"])
+        response = self.client.get(reverse("job_result", args=[job.job_id]))
+        self.assertRedirects(response, reverse("job_status", args=[job.job_id]), fetch_redirect_response=False)
+
+    @override_settings(ANALYZER_JOB_STALE_MINUTES=5)
+    def test_requeue_uses_heartbeat(self):
+        now = timezone.now()
+        long_ago = now - timedelta(hours=3)
+        for job_id, heartbeat in (("hidup", now), ("mati", now - timedelta(minutes=10)), ("lama", None)):
+            AnalysisJob.objects.create(
+                job_id=job_id, zip_name="x.zip", status=AnalysisJob.STATUS_RUNNING,
+                started_at=long_ago, heartbeat_at=heartbeat,
+            )
+        with self.assertLogs("analyzer.services.job_runner", "WARNING"):
+            self.assertEqual(job_runner.requeue_stale_jobs(), 2)
+        statuses = dict(AnalysisJob.objects.values_list("job_id", "status"))
+        self.assertEqual(statuses, {"hidup": "running", "mati": "queued", "lama": "queued"})
+
+
+# =========================================================
+# PENJAGA ZIP BOMB (user-009)
+# =========================================================
+def _zip(members: dict, compression=zipfile.ZIP_DEFLATED) -> io.BytesIO:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    buf.seek(0)
+    return buf
+
+
+class ZipGuardTests(SimpleTestCase):
+    limits = {"max_member_bytes": 1000, "max_total_bytes": 1500, "max_ratio": 20, "max_members": 5}
+
+    def read(self, members: dict, compression=zipfile.ZIP_STORED, **limits):
+        return read_py_sources(_zip(members, compression), **{**self.limits, **limits})
+
+    def test_reads_top_level_py_only(self):
+        sources = self.read({"a.py": "x = 1\r\n", "sub/b.py": "y = 2\n", "c.txt": "z"})
+        self.assertEqual(sources, {"a.py": "x = 1\n"})
+
+    def test_oversized_member(self):
+        with self.assertRaisesRegex(RuntimeError, "terlalu besar"):
+            self.read({"a.py": "#" * 1001})
+
+    def test_total_size(self):
+        with self.assertRaisesRegex(RuntimeError, "Total ukuran"):
+            self.read({"a.py": "#" * 800, "b.py": "#" * 800})
+
+    def test_high_compression_ratio(self):
+        with self.assertRaisesRegex(RuntimeError, "Rasio kompresi"):
+            self.read({"a.py": "#" * 1000}, compression=zipfile.ZIP_DEFLATED)
+
+    def test_too_many_members(self):
+        # member non-.py ikut dihitung
+        with self.assertRaisesRegex(RuntimeError, "Jumlah file"):
+            self.read({f"f{i}.txt": "" for i in range(6)})
+
+
+# =========================================================
+# DEDUP KLON STRUKTURAL (user-010)
+# =========================================================
+class CloneDedupTests(AnalysisTestCase):
+    def test_exact_copies_match_no_dedup(self):
+        corpus = generate_corpus(12, size=4, seed=7)
+        names = sorted(corpus)
+        corpus["salinan_a.py"] = corpus[names[0]]
+        corpus["salinan_b.py"] = corpus[names[3]]
+        stats = Counter()
+        se.run_analysis(None, self.tmp / "dedup", sources=corpus, dedup_clones=True, stats=stats)
+        se.run_analysis(None, self.tmp / "plain", sources=corpus)
+        self.assertGreater(stats["clone_pairs_skipped"], 0)
+        self.assertSameResult(self.tmp / "dedup", self.tmp / "plain")
+
+    def test_clones_share_representative_scores(self):
+        corpus = generate_corpus(8, size=4, seed=7)
+        original = sorted(corpus)[0]
+        # hanya beda komentar & format -> hash AST kanonik sama
+        corpus["zz_klon.py"] = "# disalin\n" + corpus[original].replace("\n\n", "\n\n\n")
+        se.run_analysis(None, self.tmp / "dedup", sources=corpus, dedup_clones=True)
+
+        matrix = se.result_matrix(self.tmp / "dedup")
+        others = [name for name in matrix.index if name not in (original, "zz_klon.py")]
+        np.testing.assert_array_equal(
+            matrix.loc[original, others].to_numpy(), matrix.loc["zz_klon.py", others].to_numpy()
+        )
+        blocks = _block_map(self.tmp / "dedup")
+
+        def matches(a: str, b: str) -> list:
+            # arah pasangan (file1/file2) bisa berbeda untuk klon dan aslinya
+            found = blocks.get((a, b)) or blocks.get((b, a)) or []
+            return sorted(
+                (m["type"], m["score"], *sorted((m["snippet_a"], m["snippet_b"]))) for m in found
+            )
+
+        for other in others:
+            self.assertEqual(matches(original, other), matches("zz_klon.py", other))
+
+    def test_web_form_leaves_dedup_off(self):
+        # dedup mengubah skor klon tidak identik, jadi harus dipilih sendiri
+        self.assertNotIn("checked", str(UploadZipForm()["dedup_clones"]))
+
+
+# =========================================================
+# HASIL BINER & EKSPOR LAZY (user-012)
+# =========================================================
+class ExportRoundTripTests(AnalysisTestCase):
+    def setUp(self):
+        super().setUp()
+        self.corpus = generate_corpus(10, size=4, seed=2)
+        self.out = self.tmp / "job"
+        se.run_analysis(None, self.out, sources=self.corpus)
+
+    def test_only_binary_result_written(self):
+        for filename in se.EXPORTS:
+            self.assertFalse((self.out / filename).exists())
+
+    def test_lazy_export_matches_eager_export(self):
+        eager = self.tmp / "eager"
+        se.run_analysis(None, eager, sources=self.corpus, exports=tuple(se.EXPORTS))
+        for filename in (se.MATRIX_CSV_FILENAME, se.BLOCKS_TXT_FILENAME):
+            path = se.ensure_export(self.out, filename)
+            self.assertEqual(path.read_bytes(), (eager / filename).read_bytes())
+
+    def test_matrix_csv_round_trip(self):
+        path = se.ensure_export(self.out, se.MATRIX_CSV_FILENAME)
+        frame = pd.read_csv(path, index_col=0)
+        matrix = se.result_matrix(self.out)
+        self.assertEqual(list(frame.index), list(matrix.index))
+        np.testing.assert_array_equal(frame.to_numpy(dtype=np.float32), matrix.to_numpy())
+
+    def test_blocks_xlsx_round_trip(self):
+        path = se.ensure_export(self.out, se.BLOCKS_XLSX_FILENAME)
+        sheet = openpyxl.load_workbook(path, read_only=True).active
+        rows = list(sheet.iter_rows(min_row=2, values_only=True))  # tanpa baris header
+        self.assertEqual(len(rows), sum(len(e["similar_blocks"]) for e in _blocks(self.out)))
+
+
+# =========================================================
+# BLOK MIRIP DI-STREAM KE DISK (user-013)
+# =========================================================
+class BlockWriterTests(AnalysisTestCase):
+    def test_spilled_save_matches_in_memory_columns(self):
+        rng = np.random.default_rng(13)
+        spilled = rs.BlockMatchWriter(self.tmp, segment_rows=5)
+        memory = rs.BlockMatchWriter()
+        for _ in range(60):
+            a, b = (int(x) for x in rng.integers(0, 6, size=2))
+            blocks = [
+                {"type": "For", "score": 0.75 + k / 100, "snippet_a": f"a{a}{k}", "snippet_b": f"b{b}"}
+                for k in range(int(rng.integers(1, 4)))
+            ]
+            spilled.add(a, b, blocks)
+            memory.add(a, b, blocks)
+        spilled.save(self.tmp)
+        self.assertEqual(list(self.tmp.glob(".tmp-*")), [])
+
+        names = [f"f{i}.py" for i in range(6)]
+        expected = memory.columns()
+        entries = list(rs.iter_blocks(self.tmp, names))
+        self.assertEqual(sum(len(e["similar_blocks"]) for e in entries), len(expected["file_a"]))
+        pairs = [(e["file1"], e["file2"]) for e in entries]
+        self.assertEqual(pairs, sorted(set(pairs)))
+        # potongan baca kecil: pasangan yang terbelah antar potongan tetap utuh
+        rows = np.load(self.tmp / rs.BLOCK_ROWS_FILENAME, mmap_mode="r")
+        self.assertEqual([len(p) for p in rs.iter_pair_rows(rows, chunk_rows=3)],
+                         [len(e["similar_blocks"]) for e in entries])
+        for k, (name, _) in enumerate(rs.BLOCK_COLUMNS):
+            np.testing.assert_array_equal(rows[:, k], expected[name])
+
+
+# =========================================================
+# API BATCH JSON (user-016)
+# =========================================================
+class BatchApiTests(AnalysisTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(
+            ANALYZER_API_TOKEN="rahasia", ANALYZER_API_MAX_ASSIGNMENTS=5, MEDIA_ROOT=self.tmp,
+        ))
+        self.corpus = generate_corpus(4, size=3, seed=16)
+
+    def post(self, payload, token="rahasia"):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        body = payload if isinstance(payload, str) else json.dumps(payload)
+        return self.client.post(reverse("api_batch"), body, content_type="application/json", **headers)
+
+    def test_disabled_without_token_setting(self):
+        with override_settings(ANALYZER_API_TOKEN=""):
+            self.assertEqual(self.post({"assignments": []}).status_code, 404)
+
+    def test_rejects_missing_or_wrong_token(self):
+        payload = {"assignments": [{"sources": self.corpus}]}
+        self.assertEqual(self.post(payload, token=None).status_code, 401)
+        self.assertEqual(self.post(payload, token="salah").status_code, 401)
+
+    def test_malformed_batch_is_400(self):
+        for payload in ("{bukan json", {"tugas": []}, {"assignments": []},
+                        {"assignments": [{"sources": self.corpus}] * 6}):
+            self.assertEqual(self.post(payload).status_code, 400, payload)
+
+    def test_invalid_assignment_fails_alone(self):
+        buf = _zip(self.corpus)
+        response = self.post({"assignments": [
+            {"id": "zip", "zip_base64": base64.b64encode(buf.getvalue()).decode(), "threshold": 0.6},
+            {"id": "satu", "sources": {"a.py": "x = 1\n"}},
+            {"id": "bobot", "sources": self.corpus, "weights": {"Bukan": 1}},
+            {"id": "threshold", "sources": self.corpus, "threshold": 2},
+            {"id": "b64", "zip_base64": "!!"},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = {r["id"]: r for r in response.json()["results"]}
+        self.assertEqual(sorted(results["zip"]["names"]), sorted(self.corpus))
+        n = len(self.corpus)
+        self.assertEqual(len(results["zip"]["matrix"]), n * (n - 1) // 2)
+        self.assertEqual(results["zip"]["threshold"], 0.6)
+        for item_id in ("satu", "bobot", "threshold", "b64"):
+            self.assertIn("error", results[item_id])
+            self.assertNotIn("matrix", results[item_id])
+
+
+# =========================================================
+# KANDIDAT BLOK FINGERPRINT (user-021)
+# =========================================================
+def _match_set(out_dir: Path) -> set:
+    return {
+        (e["file1"], e["file2"], m["snippet_a"], m["snippet_b"], m["score"])
+        for e in _blocks(out_dir) for m in e["similar_blocks"]
+    }
+
+
+class FingerprintBlockTests(AnalysisTestCase):
+    def test_results_are_subset_of_exact_mode(self):
+        corpus = generate_corpus(16, size=4, seed=4)
+        se.run_analysis(None, self.tmp / "exact", sources=corpus)
+        se.run_analysis(None, self.tmp / "fp", sources=corpus, fingerprint_blocks=True)
+        exact, found = _match_set(self.tmp / "exact"), _match_set(self.tmp / "fp")
+        self.assertTrue(found)
+        self.assertLessEqual(found, exact)
+        identical = {m for m in exact if m[2] == m[3]}
+        self.assertTrue(identical)
+        self.assertLessEqual(identical, found)
+
+    def test_identical_blocks_survive_df_cutoff(self):
+        shared = "def total(xs):\n    s = 0\n    for x in xs:\n        if x > 3:\n            s += x\n    return s\n"
+        corpus = {f"f{i}.py": shared + f"\nprint({i})\n" for i in range(4)}
+        prepared = se.prepare_sources(corpus)
+        table = se.table_from_records(prepared["records"])
+        stats = Counter()
+        candidates = se.block_candidates(table, range(4), max_df=1, stats=stats)
+        self.assertGreater(stats["fingerprints_dropped"], 0)
+        for i in range(4):
+            for j in range(i + 1, 4):
+                self.assertIn((i, j), candidates)
+
+
+# =========================================================
+# KANDIDAT PASANGAN FILE LSH (user-022)
+# =========================================================
+class LshCandidateTests(AnalysisTestCase):
+    def test_colliding_pairs(self):
+        keys = np.array([[1, 7], [2, 8], [1, 9], [3, 8]], dtype=np.uint64)
+        ids = np.array([10, 11, 12, 13])
+        codes = lsh.colliding_pairs(keys, ids)
+        self.assertEqual(sorted(zip(codes // 14, codes % 14)), [(10, 12), (11, 13)])
+
+    def test_params_validation(self):
+        self.assertEqual(lsh.lsh_params(), lsh.DEFAULT_LSH)
+        for params in ({"band": 4}, {"rows": 0}, {"numeric_width": "lebar"}):
+            with self.assertRaises(RuntimeError):
+                lsh.lsh_params(params)
+
+    def test_exact_mode_is_default(self):
+        corpus = generate_corpus(12, size=4, seed=22)
+        stats = Counter()
+        se.run_analysis(None, self.tmp / "exact", sources=corpus, stats=stats)
+        self.assertFalse(rs.is_sparse_result(self.tmp / "exact"))
+        self.assertNotIn("lsh_candidates", stats)
+
+    def test_lsh_pairs_are_exact_scores(self):
+        corpus = generate_corpus(12, size=4, seed=22)
+        names = sorted(corpus)
+        corpus["salinan.py"] = corpus[names[4]]
+        stats = Counter()
+        se.run_analysis(None, self.tmp / "exact", sources=corpus)
+        se.run_analysis(None, self.tmp / "lsh", sources=corpus, lsh={}, stats=stats)
+        self.assertTrue(rs.is_sparse_result(self.tmp / "lsh"))
+        n = len(corpus)
+        self.assertLess(stats["lsh_candidates"], n * (n - 1) // 2)
+
+        exact = se.result_matrix(self.tmp / "exact")
+        rows, cols, scores, diagonal, labels = rs.load_pairs(self.tmp / "lsh")
+        a, b = [labels[i] for i in rows], [labels[j] for j in cols]
+        np.testing.assert_array_equal(scores, exact.to_numpy()[
+            exact.index.get_indexer(a), exact.index.get_indexer(b)
+        ])
+        # salinan identik selalu menjadi kandidat
+        self.assertIn(tuple(sorted((names[4], "salinan.py"))), {tuple(sorted(p)) for p in zip(a, b)})
+        # blok mirip hanya dari pasangan kandidat, skor sama dengan mode biasa
+        exact_blocks = _block_map(self.tmp / "exact")
+        for pair, found in _block_map(self.tmp / "lsh").items():
+            self.assertEqual(found, exact_blocks[pair])
+
+
+# =========================================================
+# INDEKS KORPUS HISTORIS (user-023)
+# =========================================================
+class CorpusIndexTests(AnalysisTestCase):
+    def setUp(self):
+        super().setUp()
+        self.index = CorpusIndex(self.tmp / "corpus")
+        self.weights = se.normalize_weights(se.DEFAULT_AST_WEIGHTS)
+        corpus = generate_corpus(12, size=4, seed=23)
+        self.names = sorted(corpus)
+        for source, part in (("kelas-a", self.names[:6]), ("kelas-b", self.names[6:])):
+            prepared = se.prepare_sources({name: corpus[name] for name in part})
+            self.index.add("alpro", "2024-1", source, prepared["names"], prepared["records"],
+                           prepared["hashes"])
+        self.query_set = se.prepare_sources({"baru.py": corpus[self.names[7]]})
+
+    def query(self, **kwargs):
+        q = self.query_set
+        return self.index.query(q["names"], q["records"], self.weights, "alpro",
+                                hashes=q["hashes"], **kwargs)
+
+    def test_query_finds_identical_copy(self):
+        [term] = self.index.terms("alpro")
+        self.assertEqual((term["term"], term["sources"], term["files"], term["stale"]), ("2024-1", 2, 12, False))
+        [result] = self.query()
+        best = result["matches"][0]
+        self.assertEqual(result["file"], "baru.py")
+        self.assertEqual((best["term"], best["source"], best["file"]), ("2024-1", "kelas-b", self.names[7]))
+        self.assertEqual(best["score"], 1.0)
+        self.assertTrue(best["identical"])
+        self.assertLessEqual(len(result["matches"]), 5)
+
+    def test_exclude_and_remove(self):
+        excluded = self.query(exclude=[("2024-1", "kelas-b")])
+        self.assertNotIn("kelas-b", {m["source"] for r in excluded for m in r["matches"]})
+
+        self.assertTrue(self.index.remove("alpro", "2024-1", "kelas-b"))
+        self.assertEqual(self.index.terms("alpro")[0]["files"], 6)
+        self.assertNotIn("kelas-b", {m["source"] for r in self.query() for m in r["matches"]})
+
+        self.assertTrue(self.index.remove("alpro", "2024-1"))
+        self.assertFalse(self.index.remove("alpro", "2024-1"))
+        self.assertEqual(self.index.terms(), [])
+        self.assertFalse((self.tmp / "corpus" / "alpro" / "2024-1").exists())
+
+    def test_other_extractor_version_is_ignored(self):
+        other = CorpusIndex(self.tmp / "corpus", version="lama")
+        self.assertTrue(other.terms("alpro")[0]["stale"])
+        q = self.query_set
+        with self.assertLogs("analyzer.services.corpus_index", "WARNING"):
+            self.assertEqual(other.query(q["names"], q["records"], self.weights, "alpro"), [])
+
+    def test_manifest_skips_unfinished_shards(self):
+        course_dir = self.tmp / "corpus" / "alpro"
+        self.assertTrue((course_dir / "manifest.json").exists())
+        # shard yang masih ditulis add() lain, dan korpus lama tanpa manifest
+        unfinished = course_dir / "2024-1" / ".tmp-abc"
+        unfinished.mkdir()
+        (unfinished / "meta.json").write_text("{}")
+        self.assertEqual(self.index.terms("alpro")[0]["sources"], 2)
+        (course_dir / "manifest.json").unlink()
+        self.assertEqual(self.index.terms("alpro")[0]["sources"], 2)
+        self.assertEqual(self.query()[0]["matches"][0]["source"], "kelas-b")
+
+    def test_rejects_unsafe_names(self):
+        with self.assertRaises(RuntimeError):
+            self.index.add("../luar", "2024-1", "x", [], [])
+
+
+# =========================================================
+# PAIR_FLOOR & KELOMPOK TERHUBUNG (user-025)
+# =========================================================
+class PairFloorTests(AnalysisTestCase):
+    def test_floor_keeps_dense_scores_above_floor(self):
+        corpus = generate_corpus(14, size=4, seed=25)
+        se.run_analysis(None, self.tmp / "dense", sources=corpus)
+        se.run_analysis(None, self.tmp / "floor", sources=corpus, pair_floor=0.8)
+        self.assertTrue(rs.is_sparse_result(self.tmp / "floor"))
+
+        dense = se.result_matrix(self.tmp / "dense").to_numpy()
+        rows, cols, scores, diagonal, _ = rs.load_pairs(self.tmp / "floor")
+        expected = np.nonzero(np.triu(dense >= 0.8, k=1))
+        self.assertTrue(0 < len(rows) < len(dense) * (len(dense) - 1) // 2)
+        self.assertEqual(list(zip(rows, cols)), list(zip(*expected)))
+        np.testing.assert_array_equal(scores, dense[expected])
+        np.testing.assert_array_equal(diagonal, np.diag(dense))
+
+        # blok hanya untuk pasangan yang tersimpan (plus blok di dalam satu file)
+        stored = {(a, b) for a, b in zip(rows.tolist(), cols.tolist())}
+        names = rs.load_labels(self.tmp / "floor")
+        pos = {name: i for i, name in enumerate(names)}
+        dense_blocks = _block_map(self.tmp / "dense")
+        floor_blocks = _block_map(self.tmp / "floor")
+        for (a, b), found in floor_blocks.items():
+            self.assertTrue(a == b or (pos[a], pos[b]) in stored)
+            self.assertEqual(found, dense_blocks[(a, b)])
+        for (a, b), found in dense_blocks.items():
+            if (pos[a], pos[b]) in stored:
+                self.assertEqual(floor_blocks[(a, b)], found)
+
+    def test_invalid_floor(self):
+        self.assertIsNone(pair_graph.check_pair_floor(None))
+        for value in ("tinggi", 1.5, -0.1):
+            with self.assertRaises(RuntimeError):
+                pair_graph.check_pair_floor(value)
+
+    def test_similar_groups_are_connected_components(self):
+        # 0-1-2 berantai lewat skor >= 0.8; 3-4 terhubung; 5-6 di bawah threshold
+        rows = np.array([0, 1, 3, 5, 0])
+        cols = np.array([1, 2, 4, 6, 4])
+        scores = np.array([0.9, 0.85, 0.95, 0.5, 0.79])
+        groups = pair_graph.similar_groups(7, rows, cols, scores, 0.8)
+        self.assertEqual(groups, [
+            {"members": [0, 1, 2], "pairs": 2, "max_score": 0.9},
+            {"members": [3, 4], "pairs": 1, "max_score": 0.95},
+        ])
+        self.assertEqual(pair_graph.similar_groups(7, rows, cols, scores, 0.99), [])
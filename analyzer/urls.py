@@ -3,6 +3,17 @@ from . import views
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('jobs/<str:job_id>/', views.job_status, name='job_status'),
+    path('jobs/<str:job_id>/result/', views.job_result, name='job_result'),
+    path('jobs/<str:job_id>/append/', views.job_append, name='job_append'),
+    path('jobs/<str:job_id>/pairs/', views.job_pairs, name='job_pairs'),
+    path('jobs/<str:job_id>/matrix/', views.job_matrix_tile, name='job_matrix_tile'),
+    path('api/batch/', views.api_batch, name='api_batch'),
+    path('metrics', views.metrics, name='metrics'),
     path('download/<str:job_id>/<str:filename>/', views.download_result, name='download_result'),
+    path(
+        'download/<str:job_id>/<str:engine>/<str:filename>/',
+        views.download_result, name='download_engine_result',
+    ),
 ]
 
@@ -9,3 +9,52 @@ def safe_extract(zip_path: Path, dest_dir: Path):
             if not str(extracted_path.resolve()).startswith(str(dest_dir.resolve())):
                 raise RuntimeError("Zip mengandung path tidak aman.")
             zf.extract(member, dest_dir)
+
+
+def _decode_source(data: bytes) -> str | None:
+    """Decode seperti open(..., "r", encoding="utf-8") (newline universal)."""
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def read_py_sources(zip_file, max_member_bytes: int, max_total_bytes: int,
+                    max_ratio: float, max_members: int) -> dict:
+    """
+    Baca member *.py level teratas ZIP langsung ke memori ({nama: isi}),
+    tanpa mengekstrak ke workspace. Sama seperti safe_extract + glob("*.py"),
+    file di dalam subfolder tidak ikut dianalisis.
+
+    Penjaga zip-bomb: batas jumlah member (termasuk folder dan file non-.py),
+    batas ukuran tak terkompres per member dan total, serta rasio kompresi
+    maksimum. Ukuran dicek dari header lalu ditegakkan
+    lagi saat membaca (header bisa dipalsukan).
+    """
+    sources = {}
+    total = 0
+    with zipfile.ZipFile(zip_file, 'r') as zf:
+        if len(zf.infolist()) > max_members:
+            raise RuntimeError("Jumlah file di dalam zip melebihi batas.")
+        for member in zf.infolist():
+            name = member.filename
+            if member.is_dir() or "/" in name or "\\" in name or not name.endswith(".py"):
+                continue
+
+            if member.file_size > max_member_bytes:
+                raise RuntimeError(f"File {name} di dalam zip terlalu besar.")
+            if member.file_size > max_ratio * max(member.compress_size, 1):
+                raise RuntimeError(f"Rasio kompresi {name} mencurigakan (zip bomb?).")
+
+            with zf.open(member) as f:
+                data = f.read(max_member_bytes + 1)
+            if len(data) > max_member_bytes:
+                raise RuntimeError(f"File {name} di dalam zip terlalu besar.")
+
+            total += len(data)
+            if total > max_total_bytes:
+                raise RuntimeError("Total ukuran file .py di dalam zip melebihi batas.")
+
+            sources[name] = _decode_source(data)
+    return sources
@@ -1,18 +1,55 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
+import time
 import uuid
+from collections import Counter
 from pathlib import Path
 from django.conf import settings
 from django.urls import reverse
-from .forms import UploadZipForm
-from .utils.zip_utils import safe_extract
-from .services.similarity_engine import run_analysis
-from django.http import FileResponse, Http404
+from .forms import AppendZipForm, UploadZipForm
+from .models import AnalysisJob, MetricTotal
+from .services.batch_api import run_batch
+from .services.corpus_index import load_corpus_matches
+from .services.engines import DEFAULT_ENGINE, ENGINES, engine_out_dir
+from .services.job_runner import enqueue_job, job_paths
+from .services.metrics import (
+    counter_rows, merge_stats, phase_rows, record_totals, render_prometheus, summary_from_totals,
+)
+from .services.pair_graph import load_similar_groups, rank_result, result_tile
+from .services.pair_ranking import TIERS
+from .services.result_store import has_result, open_result, result_file
+from .services.similarity_engine import (
+    BLOCKS_TXT_FILENAME, BLOCKS_XLSX_FILENAME, EXPORTS, HEATMAP_CLUSTERED_FILENAME,
+    MATRIX_CSV_FILENAME, ensure_export, result_blocks,
+)
+from django.db.models import Count
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_POST
+import numpy as np
+import pandas as pd
+import hmac
+import json
 import mimetypes
 import logging
-import shutil
 
 logger = logging.getLogger(__name__)
 
+# ukuran halaman tabel pasangan & batas matriks yang dirender sebagai HTML
+PAIRS_PAGE_SIZE = 50
+PAIRS_PAGE_MAX = 500
+
+# ubin matriks untuk viewer virtual (sel per sisi, skala nilai, cache browser)
+MATRIX_TILE_SIZE = 64
+MATRIX_TILE_MAX = 256
+MATRIX_TILE_SCALE = 1000
+MATRIX_TILE_MAX_AGE = 300
+
+# file dengan kecocokan korpus historis tertinggi yang ditampilkan di halaman hasil
+CORPUS_MATCHES_SHOWN = 50
+# kelompok kiriman mirip (terbesar dulu) yang ditampilkan di halaman hasil
+SIMILAR_GROUPS_SHOWN = 50
+
 
 # === Halaman utama: landing + upload zip ===
 def index(request):
@@ -57,181 +94,406 @@ def index(request):
             threshold = 0.75
         threshold = max(0.0, min(1.0, threshold))
 
-        # 3) Siapkan folder kerja
+        # 3) Simpan ZIP lalu daftarkan job; analisis berjalan di latar belakang
         job_id = uuid.uuid4().hex[:12]
-        upload_dir = Path(settings.MEDIA_ROOT) / "uploads" / job_id
-        work_dir = Path(settings.MEDIA_ROOT) / "workspaces" / job_id
-        out_dir = Path(settings.MEDIA_ROOT) / "results" / job_id
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        work_dir.mkdir(parents=True, exist_ok=True)
-        out_dir.mkdir(parents=True, exist_ok=True)
-
-        # Simpan file upload
-        zip_file = form.cleaned_data['zip_file']
-        zip_path = upload_dir / zip_file.name
-        with zip_path.open("wb") as f:
-            for chunk in zip_file.chunks():
-                f.write(chunk)
-
-        # Ekstrak dan jalankan analisis
-        safe_extract(zip_path, work_dir)
-        try:
-            zip_path.unlink(missing_ok=True)
-        except Exception:
-            logger.warning("Gagal menghapus ZIP: %s", zip_path)
-
-        # 4) Kirim bobot + threshold ke run_analysis
-        try:
-            df, outputs = run_analysis(work_dir, out_dir, ast_weights=weights, threshold=threshold)
-        except Exception as e:
-            logger.exception("run_analysis gagal")
-            return render(
-                request,
-                "index.html",
-                {"form": form, "error": f"Terjadi kesalahan saat menganalisis berkas: {e}"}
-            )
-        try:
-            shutil.rmtree(work_dir)
-        except Exception:
-            logger.warning("Gagal menghapus workspace: %s", work_dir)
-        # outputs expected: dict with Path or string values for keys 'txt','xlsx','csv','png'
-        # buka txt hasil (jika tersedia)
-        txt_preview = []
-        txt_path = outputs.get("txt")
-        if txt_path and Path(txt_path).exists():
-            with open(txt_path, encoding="utf-8") as f:
-                txt_lines = f.read().splitlines()
-            txt_preview = txt_lines[:5]
-
-        total_rows = len(df)
-        total_cols = len(df.columns)
-        total_cells = df.size  # rows * cols
+        zip_name, upload_stats = save_upload(form.cleaned_data['zip_file'], job_id)
+
+        AnalysisJob.objects.create(
+            job_id=job_id,
+            zip_name=zip_name,
+            weights=weights,
+            threshold=threshold,
+            options={
+                "dedup_clones": form.cleaned_data.get("dedup_clones", False),
+                "fingerprint_blocks": form.cleaned_data.get("fingerprint_blocks", False),
+                "lsh": {} if form.cleaned_data.get("lsh") else None,
+                "pair_floor": threshold if form.cleaned_data.get("sparse_pairs") else None,
+                "corpus": {
+                    "course": form.cleaned_data["corpus_course"],
+                    "term": form.cleaned_data["corpus_term"] or None,
+                } if form.cleaned_data.get("corpus_course") else None,
+                "engines": [DEFAULT_ENGINE, *form.cleaned_data.get("extra_engines", [])],
+            },
+            stats=upload_stats,
+        )
+        record_totals(upload_stats)
+        enqueue_job(job_id)
+
+        return redirect("job_status", job_id=job_id)
+
+
+def save_upload(zip_file, job_id):
+    """
+    Simpan ZIP upload ke MEDIA_ROOT/uploads/<job_id>/. Mengembalikan
+    (nama file, stats awal job: time_upload & bytes_uploaded).
+    """
+    t0 = time.perf_counter()
+    upload_dir = job_paths(job_id)["upload"]
+    upload_dir.mkdir(parents=True, exist_ok=True)
+
+    zip_name = Path(zip_file.name).name
+    zip_path = upload_dir / zip_name
+    size = 0
+    with zip_path.open("wb") as f:
+        for chunk in zip_file.chunks():
+            f.write(chunk)
+            size += len(chunk)
+    return zip_name, {"time_upload": time.perf_counter() - t0, "bytes_uploaded": size}
+
+
+# === Tambah kiriman terlambat ke job yang sudah selesai ===
+def job_append(request, job_id):
+    job = get_object_or_404(AnalysisJob, job_id=job_id)
+    if request.method != "POST" or job.status != AnalysisJob.STATUS_DONE:
+        return redirect("job_status", job_id=job.job_id)
+
+    form = AppendZipForm(request.POST, request.FILES)
+    if not form.is_valid():
+        return redirect("job_result", job_id=job.job_id)
+
+    # stats append ditambahkan ke stats job (total /metrics tidak boleh turun)
+    job.zip_name, upload_stats = save_upload(form.cleaned_data["zip_file"], job_id)
+    job.stats = merge_stats(job.stats, upload_stats)
+    record_totals(upload_stats)
+    job.kind = AnalysisJob.KIND_APPEND
+    job.status = AnalysisJob.STATUS_QUEUED
+    job.error = ""
+    job.save(update_fields=["zip_name", "kind", "status", "error", "stats"])
+    enqueue_job(job_id)
+
+    return redirect("job_status", job_id=job.job_id)
+
+
+# === Status job analisis (auto-refresh sampai selesai) ===
+def job_status(request, job_id):
+    job = get_object_or_404(AnalysisJob, job_id=job_id)
+
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "job_id": job.job_id,
+            "status": job.status,
+            "error": job.error,
+            "result_url": reverse("job_result", args=[job.job_id])
+            if job.status == AnalysisJob.STATUS_DONE else None,
+        })
+
+    if job.status == AnalysisJob.STATUS_DONE:
+        return redirect("job_result", job_id=job.job_id)
+
+    return render(request, "job_status.html", {"job": job})
+
+
+# === Halaman hasil job yang sudah selesai ===
+def job_result(request, job_id):
+    job = get_object_or_404(AnalysisJob, job_id=job_id)
+    if job.status != AnalysisJob.STATUS_DONE:
+        return redirect("job_status", job_id=job.job_id)
+
+    out_dir = job_paths(job_id)["out"]
+    outputs = {k: out_dir / name for k, name in job.outputs.items()}
+    result = load_job_result(job)
+    txt_preview = None
+    if has_result(out_dir):
+        txt_preview = blocks_txt_preview(result_blocks(out_dir))
+
+    context = build_result_context(job_id, result, outputs, job.weights, job.threshold, txt_preview)
+    context["job_id"] = job_id
+    context["job_error"] = job.error
+    context["append_form"] = AppendZipForm()
+    context["clone_groups"] = load_clone_groups(outputs.get("clones"))
+    context["similar_groups"] = load_similar_groups(outputs.get("groups"))[:SIMILAR_GROUPS_SHOWN]
+    context["corpus"] = job.options.get("corpus")
+    context["corpus_matches"] = load_corpus_matches(outputs.get("corpus"))[:CORPUS_MATCHES_SHOWN]
+    context["heatmap_clustered"] = HEATMAP_CLUSTERED_FILENAME
+    context["engine_results"] = extra_engine_results(job)
+    context["phase_rows"] = phase_rows(job.stats)
+    context["counter_rows"] = counter_rows(job.stats)
+    return render(request, "result.html", context)
+
+
+def extra_engine_results(job):
+    """Ringkasan hasil engine tambahan job: tautan unduhan & 3 pasangan teratas."""
+    engines = job.options.get("engines", [DEFAULT_ENGINE])
+    out_dir = job_paths(job.job_id)["out"]
+    results = []
+    for name in engines[1:]:
+        engine_dir = engine_out_dir(out_dir, name, engines)
+        if name not in ENGINES or not has_result(engine_dir):
+            continue
+        spec = ENGINES[name]
+        _, top_pairs = rank_result(open_result(engine_dir), spec["threshold"], limit=3)
+        results.append({
+            "name": name,
+            "label": spec["label"],
+            "threshold": spec["threshold"],
+            "top_pairs": top_pairs,
+            "files": [
+                {"label": "Blok Kode Mirip (.txt)", "filename": BLOCKS_TXT_FILENAME},
+                {"label": "Blok Kode Mirip (.xlsx)", "filename": BLOCKS_XLSX_FILENAME},
+                {"label": "Matriks Similaritas (.csv)", "filename": MATRIX_CSV_FILENAME},
+            ],
+        })
+    return results
+
+
+def load_job_result(job):
+    """
+    Hasil job seperti result_store.open_result (hasil jarang tetap berupa
+    daftar pasangan), atau matriks dari CSV untuk job lama.
+    """
+    out_dir = job_paths(job.job_id)["out"]
+    if has_result(out_dir):
+        return open_result(out_dir)
+    csv_name = job.outputs.get("csv")
+    if csv_name and (out_dir / csv_name).exists():
+        df = pd.read_csv(out_dir / csv_name, index_col=0)
+        return {"names": list(df.index), "matrix": df.to_numpy(), "pairs": None}
+    raise Http404("Hasil analisis tidak ditemukan")
+
+
+# === Daftar pasangan berperingkat (JSON, per halaman) ===
+def job_pairs(request, job_id):
+    """
+    Pasangan file urut skor menurun untuk tabel rekomendasi di halaman
+    hasil. Parameter: offset, limit (maks. PAIRS_PAGE_MAX), tier
+    (rendah/sedang/tinggi), file (nama file yang harus ada di pasangan).
+    """
+    job = get_object_or_404(AnalysisJob, job_id=job_id)
+    if job.status != AnalysisJob.STATUS_DONE:
+        return JsonResponse({"error": "Job belum selesai."}, status=409)
+
+    try:
+        offset = max(int(request.GET.get("offset", 0)), 0)
+        limit = min(max(int(request.GET.get("limit", PAIRS_PAGE_SIZE)), 1), PAIRS_PAGE_MAX)
+    except ValueError:
+        return JsonResponse({"error": "offset/limit harus bilangan bulat."}, status=400)
+
+    tier = request.GET.get("tier") or None
+    if tier is not None and tier not in TIERS:
+        return JsonResponse({"error": "tier tidak dikenal."}, status=400)
+    file = request.GET.get("file") or None
+
+    total, pairs = rank_result(
+        load_job_result(job), job.threshold, offset=offset, limit=limit, tier=tier, file=file,
+    )
+    return JsonResponse({"total": total, "offset": offset, "limit": limit, "pairs": pairs})
+
+
+def matrix_etag(request, job_id):
+    """ETag ubin = mtime & ukuran file matriks (berubah bila job di-append)."""
+    try:
+        st = result_file(job_paths(job_id)["out"]).stat()
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+# === Ubin matriks similaritas (JSON, untuk viewer virtual) ===
+@condition(etag_func=matrix_etag)
+def job_matrix_tile(request, job_id):
+    """
+    Satu ubin matriks mulai baris `row` & kolom `col` berukuran `size`
+    (maks. MATRIX_TILE_MAX). Nilai dikirim sebagai bilangan bulat
+    seperseribu, baris demi baris. Matriks dibaca lewat mmap sehingga
+    hanya ubin yang diminta yang disentuh; hasil jarang diisi dari daftar
+    pasangannya (sel lain 0).
+    """
+    job = get_object_or_404(AnalysisJob, job_id=job_id)
+    if job.status != AnalysisJob.STATUS_DONE:
+        return JsonResponse({"error": "Job belum selesai."}, status=409)
+
+    try:
+        row = int(request.GET.get("row", 0))
+        col = int(request.GET.get("col", 0))
+        size = int(request.GET.get("size", MATRIX_TILE_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "row/col/size harus bilangan bulat."}, status=400)
+
+    result = load_job_result(job)
+    n = len(result["names"])
+    if row < 0 or col < 0 or not 1 <= size <= MATRIX_TILE_MAX or (n and (row >= n or col >= n)):
+        return JsonResponse({"error": "Ubin di luar matriks."}, status=400)
+
+    tile = result_tile(result, row, col, size)
+    response = JsonResponse({
+        "n": n,
+        "row": row,
+        "col": col,
+        "rows": tile.shape[0],
+        "cols": tile.shape[1],
+        "scale": MATRIX_TILE_SCALE,
+        "values": np.rint(tile * MATRIX_TILE_SCALE).astype(int).ravel().tolist(),
+    })
+    patch_cache_control(response, private=True, max_age=MATRIX_TILE_MAX_AGE)
+    return response
 
-        # --- buat sample pasangan dari matriks (robust terhadap index/column mismatch) ---
-        index_names = list(df.index)
-        col_names = list(df.columns)
 
-        # jika index dan column berbeda format (mis. path penuh vs basename), gunakan union
-        if index_names != col_names:
-            names = sorted(set(index_names) | set(col_names))
-        else:
-            names = index_names
-
-        pairs = []
-        for i in range(len(names)):
-            for j in range(i + 1, len(names)):
-                a = names[i]
-                b = names[j]
-                score = 0.0
-                try:
-                    # coba ambil nilai dari df dengan beberapa guard
-                    if a in df.index and b in df.columns:
-                        score = float(df.loc[a, b] or 0.0)
-                    elif b in df.index and a in df.columns:
-                        score = float(df.loc[b, a] or 0.0)
-                except Exception:
-                    score = 0.0
-                pairs.append({
-                    "file_a": a,
-                    "file_b": b,
-                    "score": score,
-                })
-
-        # urutkan dari similarity tertinggi
-        pairs_sorted = sorted(pairs, key=lambda x: x["score"], reverse=True)
-
-        # ====== buat statistik skor dan tentukan tier (fixed atau percentile) ======
-        def _percentile(sorted_list, p):
-            """Simple percentile (p in 0..100) on a sorted list (returns value)."""
-            if not sorted_list:
-                return None
-            k = (len(sorted_list) - 1) * (p / 100.0)
-            f = int(k)
-            return sorted_list[f]
-
-        scores = [p["score"] for p in pairs_sorted]
-        percentiles = None
-        tier_mode = "fixed"
-        if len(scores) >= 5:
-            sorted_scores = sorted(scores)
-            p50 = float(_percentile(sorted_scores, 50))
-            p90 = float(_percentile(sorted_scores, 90))
-            percentiles = {"p50": p50, "p90": p90}
-            tier_mode = "percentile"
-
-        def map_score_to_tier_by_threshold(score, threshold):
-            """
-            Menentukan tingkat kemiripan berdasarkan threshold pengguna.
-            """
-            s = float(score)
-            t = float(threshold)
-
-            # batas atas kategori sedang
-            mid_high = t + (1.0 - t) / 2.0
-
-            if s < t:
-                return "Rendah", "Kemiripan di bawah threshold.", "badge-low"
-            elif s < mid_high:
-                return "Sedang", "Kemiripan melewati threshold, perlu ditinjau.", "badge-mid"
-            else:
-                return "Tinggi", "Kemiripan sangat tinggi, indikasi kuat.", "badge-high"
-
-
-        # buat list display_pairs yang berisi tier & pesan
-        display_pairs = []
-        for p in pairs_sorted:
-            label, msg, cls = map_score_to_tier_by_threshold(p["score"], threshold)
-            display_pairs.append({
-                "file_a": p["file_a"],
-                "file_b": p["file_b"],
-                "score": p["score"],
-                "tier_label": label,
-                "tier_message": msg,
-                "tier_class": cls,
-            })
-
-
-        # ambil hanya 3 contoh teratas (pakai display_pairs agar sudah berisi tier)
-        csv_pairs_preview = display_pairs[:3]
-
-        preview = {
-            "txt": txt_preview,
-            "csv_pairs": csv_pairs_preview,
-            "xlsx": f"Matriks {total_rows} × {total_cols} (total {total_cells} nilai similaritas).",
-            "png": Path(outputs.get("png")).name if outputs.get("png") else None,
-        }
+def load_clone_groups(path):
+    """Kelompok klon struktural dari klon_struktural.json (list nama file)."""
+    if not path or not Path(path).exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
 
 
-        df_info = {
-            "rows": int(total_rows),
-            "cols": int(total_cols),
-            "min_val": float(df.min().min()) if df.size else None,
-            "max_val": float(df.max().max()) if df.size else None,
-            "pairs_count": len(pairs_sorted),
-        }
+def blocks_txt_preview(entries, limit=5):
+    """Beberapa baris awal blok_kode_mirip.txt tanpa menulis file-nya."""
+    lines = []
+    for e in entries:
+        lines.append(f"{e['file1']} vs {e['file2']}")
+        lines.extend(f"  {b['type']} | {b['score']:.2f}" for b in e["similar_blocks"])
+        lines.append("-" * 40)
+        if len(lines) >= limit:
+            break
+    return lines[:limit]
 
-        context = {
-            "files": [
-                {"label": "Blok Kode Mirip (.txt)", "filename": Path(outputs.get('txt')).name if outputs.get('txt') else None, "job_id": job_id},
-                {"label": "Blok Kode Mirip (.xlsx)", "filename": Path(outputs.get('xlsx')).name if outputs.get('xlsx') else None, "job_id": job_id},
-                {"label": "Matriks Similaritas (.csv)", "filename": Path(outputs.get('csv')).name if outputs.get('csv') else None, "job_id": job_id},
-                {"label": "Heatmap Similaritas (.png)", "filename": Path(outputs.get('png')).name if outputs.get('png') else None, "job_id": job_id},
-            ],
-            "matrix": df.round(2).to_html(classes="table table-bordered", border=0),
-            "weights": weights,
-            "threshold": threshold,
-            "preview": preview,
-            "display_pairs": display_pairs,
-        }
 
+def build_result_context(job_id, result, outputs, weights, threshold, txt_preview=None):
+    # outputs expected: dict with Path or string values for keys 'txt','xlsx','csv','png'
+    # buka txt hasil (jika preview belum diberikan dan file tersedia)
+    txt_path = outputs.get("txt")
+    if txt_preview is None:
+        txt_preview = []
+        if txt_path and Path(txt_path).exists():
+            with open(txt_path, encoding="utf-8") as f:
+                txt_lines = f.read().splitlines()
+            txt_preview = txt_lines[:5]
 
-        return render(request, "result.html", context)
+    # `result` dari load_job_result; hasil jarang tidak pernah dibentangkan n x n
+    names = result["names"]
+    total = len(names)
+    if result["pairs"] is not None:
+        summary = f"{len(result['pairs'][0])} pasangan tersimpan dari {total} file (hasil jarang)."
+    else:
+        summary = f"Matriks {total} × {total} (total {total * total} nilai similaritas)."
+
+    # 3 pasangan tertinggi untuk preview; daftar lengkap diambil per halaman lewat job_pairs
+    _, top_pairs = rank_result(result, threshold, limit=3)
+
+    preview = {
+        "txt": txt_preview,
+        "csv_pairs": top_pairs,
+        "xlsx": summary,
+        "png": Path(outputs.get("png")).name if outputs.get("png") else None,
+    }
+
+    context = {
+        "files": [
+            {"label": "Blok Kode Mirip (.txt)", "filename": Path(outputs.get('txt')).name if outputs.get('txt') else None, "job_id": job_id},
+            {"label": "Blok Kode Mirip (.xlsx)", "filename": Path(outputs.get('xlsx')).name if outputs.get('xlsx') else None, "job_id": job_id},
+            {"label": "Matriks Similaritas (.csv)", "filename": Path(outputs.get('csv')).name if outputs.get('csv') else None, "job_id": job_id},
+            {"label": "Heatmap Similaritas (.png)", "filename": Path(outputs.get('png')).name if outputs.get('png') else None, "job_id": job_id},
+        ],
+        "file_names": names,
+        "sparse": result["pairs"] is not None,
+        "matrix_url": reverse("job_matrix_tile", args=[job_id]),
+        "tile_size": MATRIX_TILE_SIZE,
+        "pairs_url": reverse("job_pairs", args=[job_id]),
+        "page_size": PAIRS_PAGE_SIZE,
+        "weights": weights,
+        "threshold": threshold,
+        "preview": preview,
+    }
+    return context
+
+
+# === API batch JSON untuk integrasi LMS ===
+@csrf_exempt
+@require_POST
+def api_batch(request):
+    """
+    Analisis beberapa tugas sekaligus tanpa render template. Body JSON:
+    {"assignments": [{"id", "zip_base64" | "sources", "weights",
+    "threshold", "dedup_clones", "fingerprint_blocks", "lsh", "pair_floor"}, ...]}. Wajib header
+    "Authorization: Bearer <ANALYZER_API_TOKEN>"; tanpa token di settings endpoint ini nonaktif (404)
+    karena analisis berjalan sinkron di dalam request.
+    """
+    token = settings.ANALYZER_API_TOKEN
+    if not token:
+        return JsonResponse({"error": "API batch tidak diaktifkan."}, status=404)
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return JsonResponse({"error": "Token API tidak valid."}, status=401)
+
+    max_bytes = settings.ANALYZER_API_MAX_BODY_MB * 1024 * 1024
+    try:
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        length = 0
+    if length > max_bytes:
+        return JsonResponse({"error": "Body permintaan terlalu besar."}, status=413)
+
+    # dibaca langsung dari stream (bukan request.body) agar batas
+    # DATA_UPLOAD_MAX_MEMORY_SIZE untuk form tidak berlaku di sini
+    body = request.read(max_bytes + 1)
+    if len(body) > max_bytes:
+        return JsonResponse({"error": "Body permintaan terlalu besar."}, status=413)
+
+    try:
+        payload = json.loads(body)
+        results = run_batch(payload)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({"results": results})
+
+
+def record_export_stats(job_id, stats):
+    """Tambahkan waktu & ukuran ekspor yang dibuat saat diunduh ke stats job."""
+    job = AnalysisJob.objects.filter(job_id=job_id).first()
+    if job is None:
+        return
+    job.stats = merge_stats(job.stats, stats)
+    job.save(update_fields=["stats"])
+    record_totals(stats)
+
+
+# === Metrik Prometheus (agregat semua job) ===
+def metrics(request):
+    """
+    Waktu per fase dan penghitung total semua job, dalam format teks
+    Prometheus. Jika ANALYZER_METRICS_TOKEN diisi, wajib header
+    "Authorization: Bearer <token>".
+    """
+    token = settings.ANALYZER_METRICS_TOKEN
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse("Token metrik tidak valid.\n", status=401, content_type="text/plain")
+
+    # total berjalan (MetricTotal), tanpa membaca stats setiap job
+    status_counts = dict(
+        AnalysisJob.objects.order_by().values_list("status").annotate(n=Count("id"))
+    )
+    summary = summary_from_totals(status_counts, MetricTotal.objects.values_list("key", "value"))
+    statuses = [status for status, _ in AnalysisJob.STATUS_CHOICES]
+    return HttpResponse(
+        render_prometheus(summary, statuses),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 
 # === View untuk download file hasil dengan MIME type sesuai ===
-def download_result(request, job_id, filename):
-    """Melayani download file hasil analisis dengan MIME type sesuai."""
+def download_result(request, job_id, filename, engine=None):
+    """
+    Melayani download file hasil analisis dengan MIME type sesuai;
+    `engine` memilih hasil engine tambahan job.
+    """
     file_path = Path(settings.MEDIA_ROOT) / "results" / job_id / filename
+    if engine is not None:
+        job = get_object_or_404(AnalysisJob, job_id=job_id)
+        engines = job.options.get("engines", [DEFAULT_ENGINE])
+        if engine not in engines[1:]:
+            raise Http404("Engine tidak ada pada job ini")
+        file_path = engine_out_dir(file_path.parent, engine, engines) / filename
+
+    # CSV/TXT/XLSX/PNG dibuat dari hasil biner saat pertama diminta, lalu di-cache
+    if not file_path.exists() and filename in EXPORTS and has_result(file_path.parent):
+        stats = Counter()
+        try:
+            ensure_export(file_path.parent, filename, stats)
+        except OSError:
+            logger.exception("Gagal membuat %s untuk job %s", filename, job_id)
+        if stats:
+            record_export_stats(job_id, stats)
+
     if not file_path.exists():
         raise Http404("File tidak ditemukan")
 
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark ekstraksi fitur AST: enam kali ast.walk (versi lama)
+vs satu traversal AstFeatureVisitor.
+
+Jalankan dari root repo:
+    python -m benchmarks.bench_ast_features --lines 5000 --repeat 5
+"""
+import argparse
+import ast
+import time
+
+from analyzer.services.ast_features import visit_tree
+
+
+SNIPPET = '''
+def fungsi_{i}(data, batas={i}):
+    # proses data ke-{i}
+    hasil = []
+    for x in data:
+        if x > batas:
+            hasil.append(x * 2)
+        elif x == batas:
+            hasil.append(x)
+    total = 0
+    while total < len(hasil):
+        total = total + 1
+    return hasil
+'''
+
+
+def make_source(n_lines: int) -> str:
+    parts = []
+    i = 0
+    while sum(p.count("\n") for p in parts) < n_lines:
+        parts.append(SNIPPET.format(i=i))
+        i += 1
+    return "".join(parts)
+
+
+def legacy_walk(tree: ast.AST):
+    functions = [n for n in ast.walk(tree) if isinstance(n, ast.FunctionDef)]
+    loops = [n for n in ast.walk(tree) if isinstance(n, (ast.For, ast.While))]
+    conditionals = [n for n in ast.walk(tree) if isinstance(n, ast.If)]
+    assignments = [n for n in ast.walk(tree) if isinstance(n, ast.Assign)]
+    names = {n.id for n in ast.walk(tree) if isinstance(n, ast.Name)}
+    blocks = [
+        n for n in ast.walk(tree)
+        if isinstance(n, (ast.FunctionDef, ast.For, ast.While, ast.If))
+    ]
+    return {
+        "structure": len(functions) + len(loops) + len(conditionals),
+        "execution_order": sum(1 for _ in ast.walk(tree)),
+        "hierarchy": sum(1 for f in functions if f.body),
+        "variable_names": len(names),
+        "logic_modification": len(assignments),
+    }, blocks
+
+
+def single_pass(tree: ast.AST):
+    visitor = visit_tree(tree)
+    return visitor.features(), visitor.blocks
+
+
+def best_of(fn, tree, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(tree)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[500, 5000, 20000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'baris':>8} {'node':>8} {'6x walk (ms)':>14} {'1x visitor (ms)':>16} {'speedup':>8}")
+    for n_lines in args.lines:
+        tree = ast.parse(make_source(n_lines))
+        assert legacy_walk(tree) == single_pass(tree), "hasil fitur berbeda"
+        t_old = best_of(legacy_walk, tree, args.repeat)
+        t_new = best_of(single_pass, tree, args.repeat)
+        n_nodes = sum(1 for _ in ast.walk(tree))
+        print(f"{n_lines:>8} {n_nodes:>8} {t_old * 1e3:>14.1f} {t_new * 1e3:>16.1f} {t_old / t_new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
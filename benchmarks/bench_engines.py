@@ -0,0 +1,151 @@
+"""
+Benchmark per tahap similarity_engine.run_analysis (dan total waktu
+similarity_astfix.run_analysis) pada korpus sintetis berbagai ukuran.
+Dengan --lsh, mode perkiraan LSH ikut diukur sebagai engine "lsh".
+
+Hasil ditulis sebagai JSON agar bisa dibandingkan antar versi; dengan
+--baseline, keluar dengan status 1 bila ada tahap yang melambat melebihi
+--tolerance (relatif) dan --min-delta (detik).
+
+Jalankan dari root repo:
+    python -m benchmarks.bench_engines --files 10 100 500 1000 --out bench.json
+    python -m benchmarks.bench_engines --files 10 100 --baseline bench.json --tolerance 0.2
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from analyzer.services import similarity_astfix, similarity_engine
+from benchmarks.corpus import MUTATIONS, generate_corpus, write_corpus
+
+ENGINE_STAGES = ("read", "features", "pairs", "write")
+
+
+def bench_engine(src: Path, workers: int, lsh: dict | None = None) -> dict:
+    stats = Counter()
+    with tempfile.TemporaryDirectory() as out:
+        t0 = time.perf_counter()
+        similarity_engine.run_analysis(src, Path(out), stats=stats, workers=workers, lsh=lsh)
+        total = time.perf_counter() - t0
+    timings = {stage: stats[f"time_{stage}"] for stage in ENGINE_STAGES}
+    timings["total"] = total
+    return timings
+
+
+def bench_astfix(src: Path) -> dict:
+    with tempfile.TemporaryDirectory() as out:
+        t0 = time.perf_counter()
+        similarity_astfix.run_analysis(str(src), out)
+        return {"total": time.perf_counter() - t0}
+
+
+def best_of(fn, repeat: int) -> dict:
+    """Waktu minimum per tahap dari beberapa ulangan."""
+    best = {}
+    for _ in range(repeat):
+        for stage, seconds in fn().items():
+            best[stage] = min(best.get(stage, float("inf")), seconds)
+    return best
+
+
+def run_suite(args) -> list:
+    results = []
+    for n_files in args.files:
+        corpus = generate_corpus(
+            n_files, size=args.size, mutations=args.mutations,
+            copy_rate=args.copy_rate, seed=args.seed,
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            src = write_corpus(corpus, Path(tmp) / "kelas")
+
+            runs = [("engine", lambda: bench_engine(src, args.workers))]
+            if args.lsh:
+                runs.append(("lsh", lambda: bench_engine(src, args.workers, lsh={})))
+            if n_files <= args.astfix_max_files:
+                runs.append(("astfix", lambda: bench_astfix(src)))
+
+            for engine, fn in runs:
+                for stage, seconds in best_of(fn, args.repeat).items():
+                    results.append({
+                        "engine": engine, "files": n_files, "stage": stage, "seconds": seconds,
+                    })
+                    print(f"{engine:>7} {n_files:>6} {stage:>9} {seconds:>10.3f} dtk", flush=True)
+    return results
+
+
+def compare(results: list, baseline: list, tolerance: float, min_delta: float) -> list:
+    """Daftar tahap yang melambat dibanding baseline."""
+    old = {(r["engine"], r["files"], r["stage"]): r["seconds"] for r in baseline}
+    regressions = []
+    for r in results:
+        before = old.get((r["engine"], r["files"], r["stage"]))
+        if before is None:
+            continue
+        if r["seconds"] > before * (1 + tolerance) and r["seconds"] - before > min_delta:
+            regressions.append({**r, "baseline": before, "ratio": r["seconds"] / max(before, 1e-9)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, nargs="+", default=[10, 100, 500, 1000])
+    parser.add_argument("--size", type=int, default=6, help="Jumlah fungsi per file.")
+    parser.add_argument("--mutations", default=",".join(MUTATIONS))
+    parser.add_argument("--copy-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--lsh", action="store_true", help="Ukur juga mode perkiraan LSH.")
+    parser.add_argument(
+        "--astfix-max-files", type=int, default=1000,
+        help="Lewati astfix di atas jumlah file ini.",
+    )
+    parser.add_argument("--out", help="Simpan hasil ke file JSON.")
+    parser.add_argument("--baseline", help="File JSON hasil sebelumnya untuk dibandingkan.")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-delta", type=float, default=0.05)
+    args = parser.parse_args()
+    args.mutations = [m for m in args.mutations.split(",") if m]
+
+    results = run_suite(args)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "params": {
+                "size": args.size, "mutations": args.mutations, "copy_rate": args.copy_rate,
+                "seed": args.seed, "repeat": args.repeat, "workers": args.workers,
+                "lsh": args.lsh,
+            },
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        for r in regressions:
+            print(
+                f"REGRESI {r['engine']} {r['files']} file {r['stage']}: "
+                f"{r['baseline']:.3f} -> {r['seconds']:.3f} dtk ({r['ratio']:.2f}x)"
+            )
+        if regressions:
+            sys.exit(1)
+        print("Tidak ada regresi di atas toleransi.")
+
+
+if __name__ == "__main__":
+    main()
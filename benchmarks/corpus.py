@@ -0,0 +1,251 @@
+"""
+Generator korpus kelas sintetis untuk benchmark: sebagian file "asli"
+(gabungan acak fungsi dari pola), sebagian salinan file lain yang
+dimutasi seperti plagiarisme sungguhan.
+
+Mutasi yang tersedia:
+    rename    ganti nama variabel, parameter, dan fungsi
+    reorder   acak urutan fungsi/pernyataan tingkat atas
+    comments  sisipkan komentar baru
+    reformat  ubah indentasi, baris kosong, dan spasi operator
+
+Tulis korpus ke folder:
+    python -m benchmarks.corpus out/kelas --files 100 --size 6 --seed 1
+"""
+import argparse
+import ast
+import builtins
+import random
+import re
+from pathlib import Path
+
+MUTATIONS = ("rename", "reorder", "comments", "reformat")
+BUILTIN_NAMES = set(dir(builtins))
+
+TEMPLATES = [
+    '''
+def total_{i}(xs):
+    """Menjumlahkan nilai di atas batas."""
+    s = 0
+    for x in xs:
+        if x > {a}:
+            s += x
+    return s
+''',
+    '''
+def cari_{i}(data, target):
+    # cari indeks target
+    i = 0
+    while i < len(data):
+        if data[i] == target:
+            return i
+        i += {b}
+    return -1
+''',
+    '''
+def faktorial_{i}(n):
+    if n <= 1:
+        return 1
+    return n * faktorial_{i}(n - 1)
+''',
+    '''
+def klasifikasi_{i}(nilai):
+    if nilai >= {c}:
+        label = "A"
+    elif nilai >= {a}:
+        label = "B"
+    else:
+        label = "C"
+    return label
+''',
+    '''
+def rata_{i}(data):
+    jumlah = 0
+    hitung = 0
+    for d in data:
+        jumlah = jumlah + d
+        hitung = hitung + 1
+    if hitung == 0:
+        return 0
+    return jumlah / hitung
+''',
+    '''
+def matriks_{i}(n):
+    hasil = []
+    for r in range(n):
+        baris = []
+        for c in range(n):
+            baris.append(r * c + {a})
+        hasil.append(baris)
+    return hasil
+''',
+    '''
+def saring_{i}(kata, minimal={b}):
+    keluar = []
+    for k in kata:
+        if len(k) >= minimal and k.isalpha():
+            keluar.append(k.lower())
+    return keluar
+''',
+]
+
+NAME_POOL = [
+    "nilai", "angka", "temp", "data_baru", "hasil_akhir", "idx", "elemen", "wadah",
+    "penampung", "counter", "acc", "item", "buffer", "arr", "val", "res",
+]
+COMMENTS = [
+    "# cek kondisi", "# TODO: rapikan", "# loop utama", "# hitung hasil",
+    "# jangan diubah", "# sudah dites", "# bagian penting",
+]
+
+
+# =========================================================
+# PROGRAM ASLI
+# =========================================================
+def original_program(rng: random.Random, size: int) -> str:
+    parts = []
+    for i in range(size):
+        template = rng.choice(TEMPLATES)
+        parts.append(template.format(
+            i=i, a=rng.randint(0, 50), b=rng.randint(1, 3), c=rng.randint(60, 90),
+        ))
+    parts.append(f"\nhasil = {rng.randint(0, 9)}\nprint(hasil)\n")
+    return "".join(parts)
+
+
+# =========================================================
+# MUTASI
+# =========================================================
+class _Renamer(ast.NodeTransformer):
+    def __init__(self, mapping: dict):
+        self.mapping = mapping
+
+    def visit_Name(self, node):
+        node.id = self.mapping.get(node.id, node.id)
+        return node
+
+    def visit_arg(self, node):
+        node.arg = self.mapping.get(node.arg, node.arg)
+        return node
+
+    def visit_FunctionDef(self, node):
+        node.name = self.mapping.get(node.name, node.name)
+        self.generic_visit(node)
+        return node
+
+
+def mutate_rename(code: str, rng: random.Random) -> str:
+    tree = ast.parse(code)
+    names = sorted(
+        {n.id for n in ast.walk(tree) if isinstance(n, ast.Name)}
+        | {n.arg for n in ast.walk(tree) if isinstance(n, ast.arg)}
+        | {n.name for n in ast.walk(tree) if isinstance(n, ast.FunctionDef)}
+    )
+    names = [n for n in names if n not in BUILTIN_NAMES]
+    mapping = {n: f"{rng.choice(NAME_POOL)}_{k}" for k, n in enumerate(names) if rng.random() < 0.7}
+    return ast.unparse(_Renamer(mapping).visit(tree)) + "\n"
+
+
+def mutate_reorder(code: str, rng: random.Random) -> str:
+    tree = ast.parse(code)
+    defs = [n for n in tree.body if isinstance(n, ast.FunctionDef)]
+    rest = [n for n in tree.body if not isinstance(n, ast.FunctionDef)]
+    rng.shuffle(defs)
+    tree.body = defs + rest
+    return ast.unparse(tree) + "\n"
+
+
+def mutate_comments(code: str, rng: random.Random) -> str:
+    out = []
+    for line in code.splitlines():
+        if line.strip() and rng.random() < 0.2:
+            indent = line[: len(line) - len(line.lstrip())]
+            out.append(indent + rng.choice(COMMENTS))
+        out.append(line)
+    return "\n".join(out) + "\n"
+
+
+def mutate_reformat(code: str, rng: random.Random) -> str:
+    unit = rng.choice(["  ", "\t", "        "])
+    out = []
+    for line in code.splitlines():
+        stripped = line.lstrip(" ")
+        depth = (len(line) - len(stripped)) // 4
+        stripped = re.sub(r" ([=+\-*/<>]=?) ", r"\1", stripped) if rng.random() < 0.5 else stripped
+        out.append(unit * depth + stripped)
+        if stripped.startswith("def ") and rng.random() < 0.5:
+            out.append("")
+    return "\n".join(out) + "\n"
+
+
+MUTATORS = {
+    "rename": mutate_rename,
+    "reorder": mutate_reorder,
+    "comments": mutate_comments,
+    "reformat": mutate_reformat,
+}
+
+
+def plagiarise(code: str, rng: random.Random, mutations) -> str:
+    # mutasi berbasis AST dulu (ast.unparse membuang komentar), lalu teks
+    for name in MUTATIONS:
+        if name in mutations and rng.random() < 0.7:
+            code = MUTATORS[name](code, rng)
+    return code
+
+
+# =========================================================
+# KORPUS
+# =========================================================
+def generate_corpus(n_files: int, size: int = 6, mutations=MUTATIONS,
+                    copy_rate: float = 0.3, seed: int = 1) -> dict:
+    """
+    {nama file: isi} berisi `n_files` file dengan `size` fungsi per file.
+    Sekitar `copy_rate` bagian file adalah salinan termutasi dari file
+    asli sebelumnya. Deterministik untuk `seed` yang sama.
+    """
+    unknown = set(mutations) - set(MUTATIONS)
+    if unknown:
+        raise ValueError(f"Mutasi tidak dikenal: {', '.join(sorted(unknown))}")
+
+    rng = random.Random(seed)
+    corpus = {}
+    originals = []
+    for k in range(n_files):
+        if originals and rng.random() < copy_rate:
+            code = plagiarise(rng.choice(originals), rng, mutations)
+        else:
+            code = original_program(rng, size)
+            originals.append(code)
+        corpus[f"mhs_{k:04d}.py"] = code
+    return corpus
+
+
+def write_corpus(corpus: dict, out_dir: Path) -> Path:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, code in corpus.items():
+        (out_dir / name).write_text(code, encoding="utf-8")
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--size", type=int, default=6, help="Jumlah fungsi per file.")
+    parser.add_argument("--mutations", default=",".join(MUTATIONS))
+    parser.add_argument("--copy-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = generate_corpus(
+        args.files, size=args.size, mutations=[m for m in args.mutations.split(",") if m],
+        copy_rate=args.copy_rate, seed=args.seed,
+    )
+    write_corpus(corpus, args.out)
+    print(f"{len(corpus)} file ditulis ke {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -104,3 +104,28 @@ USE_I18N = True
 USE_TZ = True
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# ========================
+# ANALYZER
+# ========================
+# jumlah proses untuk skor pasangan file & pencocokan blok (1 = serial)
+ANALYZER_WORKERS = int(os.getenv("ANALYZER_WORKERS", "1"))
+# jumlah job analisis yang boleh berjalan bersamaan per proses web
+ANALYZER_JOB_WORKERS = int(os.getenv("ANALYZER_JOB_WORKERS", "1"))
+# worker memperbarui heartbeat job 'running' setiap sekian detik; job tanpa
+# heartbeat lebih lama dari STALE_MINUTES (mis. worker mati saat restart) diantrekan ulang
+ANALYZER_JOB_HEARTBEAT_SECONDS = float(os.getenv("ANALYZER_JOB_HEARTBEAT_SECONDS", "30"))
+ANALYZER_JOB_STALE_MINUTES = int(os.getenv("ANALYZER_JOB_STALE_MINUTES", "5"))
+# batas ukuran cache fitur per isi file (MEDIA_ROOT/cache/features), LRU
+ANALYZER_FEATURE_CACHE_MB = int(os.getenv("ANALYZER_FEATURE_CACHE_MB", "512"))
+# batas isi ZIP yang dibaca langsung ke memori (penjaga zip bomb)
+ANALYZER_ZIP_MAX_MEMBER_MB = int(os.getenv("ANALYZER_ZIP_MAX_MEMBER_MB", "5"))
+ANALYZER_ZIP_MAX_TOTAL_MB = int(os.getenv("ANALYZER_ZIP_MAX_TOTAL_MB", "200"))
+ANALYZER_ZIP_MAX_RATIO = float(os.getenv("ANALYZER_ZIP_MAX_RATIO", "100"))
+ANALYZER_ZIP_MAX_MEMBERS = int(os.getenv("ANALYZER_ZIP_MAX_MEMBERS", "10000"))
+# API batch JSON untuk LMS (/api/batch/); token kosong = endpoint nonaktif
+ANALYZER_API_TOKEN = os.getenv("ANALYZER_API_TOKEN", "")
+ANALYZER_API_MAX_BODY_MB = int(os.getenv("ANALYZER_API_MAX_BODY_MB", "50"))
+ANALYZER_API_MAX_ASSIGNMENTS = int(os.getenv("ANALYZER_API_MAX_ASSIGNMENTS", "20"))
+# endpoint /metrics (format Prometheus); token kosong = tanpa autentikasi
+ANALYZER_METRICS_TOKEN = os.getenv("ANALYZER_METRICS_TOKEN", "")